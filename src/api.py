@@ -1,29 +1,53 @@
 from __future__ import annotations
 
+import asyncio
 import time
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module
 from traceback import print_exc
-from typing import Any
-
-from src.constants import access_cnfg, logging
-
-
-def login() -> Any:
+from typing import Any, ClassVar
+
+from src import session
+from src.books import ACTIVE_BUCKETS, BookCache, OrderBook, PositionBook, Summary
+from src.breaker import CircuitBreaker, breakers_from_settings
+from src.brokerclient import AsyncBroker
+from src.candles import CandleCache
+from src.constants import access_cnfg, access_setg, logging
+from src.indicators import specs_from_settings
+from src.orders import accepted
+from src.ratelimit import RateLimiter
+from src.timeframes import TIMEFRAMES, CandleEngine
+
+HISTORY_WAIT = 5.0  # seconds a chart load may queue behind trading calls
+CANCEL_FANOUT = 4  # cancels in flight at once
+CANCEL_CONFIRM = 2.0  # seconds to wait for cancel confirmations
+POSITION_RECONCILE = 30  # seconds between broker position reconciles
+SUMMARY_REFRESH = 30  # seconds the summary trusts the order feed over the book
+
+
+def login(ttl: float = 7 * 3600) -> Any:
     O_CNFG = access_cnfg()
     broker_name = O_CNFG.get("broker", None)
     if not broker_name:
         raise ValueError("broker not specified in credential file")
 
-    module_path = f"stock_brokers.{broker_name}.{broker_name}"
-    broker_module = import_module(module_path)
+    if broker_name == "mock":
+        from src.mockbroker import Mock as BrokerClass
+    else:
+        module_path = f"stock_brokers.{broker_name}.{broker_name}"
+        broker_module = import_module(module_path)
 
-    logging.info(f"BrokerClass: {broker_module}")
-    BrokerClass = getattr(broker_module, broker_name.capitalize())
+        logging.info(f"BrokerClass: {broker_module}")
+        BrokerClass = getattr(broker_module, broker_name.capitalize())
 
     logging.debug(f"Broker credentials: {O_CNFG}")
     cnfg = access_cnfg()
     broker_object = BrokerClass(**cnfg)
+    if session.restore(broker_object, broker_name):
+        logging.info("api connected with saved session")
+        return broker_object
     if broker_object.authenticate():
+        session.save(broker_object, broker_name, ttl)
         logging.info("api connected")
         return broker_object
     logging.critical("failed to connect, exiting")
@@ -33,6 +57,29 @@ class Helper:
     _api: Any | None = None
     _created_at: float | None = None
     _session_ttl: int = 7 * 3600  # 7 hours - broker token rotation
+    _books: ClassVar[dict[str, BookCache]] = {}
+    _order_book: OrderBook = OrderBook()
+    _position_book: PositionBook = PositionBook()
+    _candles: CandleCache | None = None
+    _timeframes: tuple[int, ...] = tuple(access_setg().get("timeframes", TIMEFRAMES))
+    _indicators: tuple[dict[str, Any], ...] = specs_from_settings(
+        access_setg().get("ma")
+    )
+    _engine: CandleEngine | None = None
+    _summary: Summary = Summary()
+    _aclient: AsyncBroker | None = None
+    _aclient_key: tuple[int, int] | None = None
+    _aclient_loop: asyncio.AbstractEventLoop | None = None
+    _closing: ClassVar[set[Any]] = set()  # aclose() calls still running
+    _cancel_pool: ThreadPoolExecutor = ThreadPoolExecutor(
+        max_workers=CANCEL_FANOUT, thread_name_prefix="cancel"
+    )
+    _limiter: RateLimiter = RateLimiter.from_settings(
+        access_setg().get("ratelimit", {})
+    )
+    _breakers: dict[str, CircuitBreaker] = breakers_from_settings(
+        access_setg().get("breaker", {})
+    )
 
     @classmethod
     def api(cls) -> Any:
@@ -43,19 +90,210 @@ class Helper:
                 age = (now - cls._created_at) / 3600
                 logging.info(f"Session expired (age: {age:.1f}h), reconnecting...")
             cls.reset()
-            cls._api = login()
-            cls._created_at = time.time()
+            cls._api = login(cls._session_ttl)
+            # a restored token keeps the age it was issued with
+            cls._created_at = (
+                session.created_at(access_cnfg().get("broker", "")) or time.time()
+            )
             logging.info("Singleton session created")
         else:
             logging.debug("Using existing session")
         return cls._api
 
     @classmethod
-    def reset(cls) -> None:
+    def prelogin(cls) -> bool:
+        """Warm the session before the market opens, re-login if the broker dropped it."""
+        if cls._api is not None and not session.validate(cls._api):
+            logging.info("pre-login: session no longer valid")
+            cls.reset(forget=True)
+        return cls.api() is not None
+
+    @classmethod
+    def reset(cls, forget: bool = False) -> None:
+        if forget:
+            session.forget()
         cls._api = None
         cls._created_at = None
+        cls._close_aclient()
+        for book in cls._books.values():
+            book.clear()
+        cls._position_book.clear()
+        for breaker in cls._breakers.values():
+            breaker.reset()
         logging.info("Session reset")
 
+    @classmethod
+    def aclient(cls) -> AsyncBroker:
+        """Pooled async client on the running loop, rebuilt with the session."""
+        api = cls.api()
+        loop = asyncio.get_running_loop()
+        key = (id(api), id(loop))
+        if cls._aclient is None or cls._aclient.is_closed or cls._aclient_key != key:
+            cls._close_aclient()
+            cls._aclient = AsyncBroker.from_session(
+                api, **access_setg().get("http", {})
+            )
+            cls._aclient_key = key
+            cls._aclient_loop = loop
+            logging.info("Async broker client created")
+        return cls._aclient
+
+    @classmethod
+    def _close_aclient(cls) -> None:
+        """Drop the pooled client, its connections close on the loop it was made on."""
+        client, loop = cls._aclient, cls._aclient_loop
+        cls._aclient = cls._aclient_key = cls._aclient_loop = None
+        if client is None or client.is_closed or loop is None or loop.is_closed():
+            return
+        future = asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        cls._closing.add(future)
+        future.add_done_callback(cls._closing.discard)
+
+    @classmethod
+    def book(cls, name: str) -> BookCache:
+        if name not in cls._books:
+            cls._books[name] = BookCache(lambda: cls._fetch_book(name))
+        return cls._books[name]
+
+    @classmethod
+    def _fetch_book(cls, name: str) -> list[dict[str, Any]] | None:
+        breaker = cls._breakers["book"]
+        if not breaker.allow():
+            # the cache keeps serving the last book while the broker is down
+            return None
+        data = None
+        try:
+            cls.throttle("book")
+            data = getattr(cls.api(), name)
+        except Exception as e:
+            logging.error(f"helper error {e} while fetching {name}")
+        breaker.record(data is not None)
+        return data
+
+    @classmethod
+    def throttle(cls, priority: str, timeout: float | None = None) -> bool:
+        """Wait for a broker call slot, exits go ahead of entries, books and charts."""
+        return cls._limiter.acquire(priority, timeout)
+
+    @staticmethod
+    def side_priority(side: Any) -> str:
+        # the bot only buys to open, any sell closes a long
+        return "exit" if str(side)[:1].upper() == "S" else "entry"
+
+    @classmethod
+    def degraded(cls) -> list[str]:
+        """Broker endpoints whose breaker is not closed."""
+        return [name for name, b in cls._breakers.items() if not b.is_closed]
+
+    @classmethod
+    def can_enter(cls) -> bool:
+        """New entries wait out the order breaker cool-down, exits never do."""
+        return cls._breakers["order"].ready
+
+    @classmethod
+    def _record_order(cls, resp: Any) -> None:
+        cls._breakers["order"].record(resp is not None)
+
+    @classmethod
+    def broker_stats(cls) -> dict[str, Any]:
+        return {
+            "ratelimit": cls._limiter.stats(),
+            "breakers": {name: b.stats() for name, b in cls._breakers.items()},
+            "books": {name: book.stats() for name, book in cls._books.items()},
+            "candles": cls._candles.stats() if cls._candles else None,
+            "timeframes": cls._engine.stats() if cls._engine else None,
+            "async_client": cls._aclient.stats() if cls._aclient else None,
+        }
+
+    @classmethod
+    def invalidate_books(cls) -> None:
+        for book in cls._books.values():
+            book.invalidate()
+
+    @classmethod
+    def on_order_update(cls, update: dict[str, Any]) -> None:
+        record = cls._order_book.apply_event(update)
+        if record is not None:
+            cls._position_book.apply_fill(record, update)
+        cls.invalidate_books()
+
+    @classmethod
+    def on_tick(cls, key: str, price: float, message: dict[str, Any]) -> None:
+        cls._position_book.on_tick(key, price)
+        if cls._candles is not None:
+            cls._candles.on_tick(key, price)
+        if cls._engine is not None:
+            cls._engine.on_tick(key, price, message)
+
+    @classmethod
+    def engine(cls) -> CandleEngine:
+        if cls._engine is None:
+            cls._engine = CandleEngine(
+                cls.historical, cls._timeframes, indicators=cls._indicators
+            )
+        return cls._engine
+
+    @classmethod
+    def candles(cls, key: str, interval: int) -> bytes:
+        """Serialized intraday candles, newest first, fetched incrementally."""
+        if interval in cls._timeframes:
+            return cls.engine().payload(key, interval)
+        if cls._candles is None:
+            cls._candles = CandleCache(cls.historical)
+        return cls._candles.get(key, interval)
+
+    @classmethod
+    def frame(cls, key: str, minutes: int, bars: int | None = None) -> dict[str, Any]:
+        """Candle columns of a configured timeframe as numpy views, for strategies."""
+        return cls.engine().arrays(key, minutes, bars)
+
+    @classmethod
+    def indicator(cls, key: str, minutes: int, spec: dict[str, Any]) -> float | None:
+        """Latest value of an indicator spec, kept current by the ticks."""
+        return cls.engine().indicator(key, minutes, spec)
+
+    @classmethod
+    def indicator_values(
+        cls, key: str, minutes: int, stamp: int
+    ) -> dict[str, Any] | None:
+        """Indicators of one live bar for the candle stream, never fetches."""
+        if cls._engine is None:
+            return None
+        return cls._engine.values_at(key, minutes, stamp)
+
+    @classmethod
+    def forming_bar(cls, key: str, minutes: int) -> tuple[int, list[float]] | None:
+        """Newest bar of a loaded timeframe, the first one a live candle stream sends."""
+        if cls._engine is None:
+            return None
+        return cls._engine.forming(key, minutes)
+
+    @classmethod
+    def reconcile_positions(cls) -> dict[str, dict[str, float]]:
+        fetched_at = time.time()
+        cls.book("positions").invalidate()
+        drift = cls._position_book.reconcile(cls.positions(), fetched_at)
+        if drift:
+            logging.warning(f"positions drifted from broker: {drift}")
+        return drift
+
+    @classmethod
+    def position_book(cls) -> PositionBook:
+        """Local positions, reconciled with the broker once if never done."""
+        if not cls._position_book.reconciled_at:
+            cls.reconcile_positions()
+        return cls._position_book
+
+    @classmethod
+    def local_position_book(cls) -> PositionBook:
+        """Positions as fills and ticks left them, never calls the broker."""
+        return cls._position_book
+
+    @classmethod
+    def order_book(cls) -> OrderBook:
+        orders = cls.orders()
+        return cls._order_book.sync(orders, cls.book("orders").started_at(orders))
+
     @classmethod
     def one_side(cls, bargs: dict[str, Any]) -> str | None:
         order_type = bargs.get("order_type", "LIMIT")
@@ -66,8 +304,15 @@ class Helper:
         logging.debug(
             f"[one_side] >>> ORDER REQUEST: symbol={symbol}, side={side}, order_type={order_type}, price={price}, trigger={trigger_price}"
         )
+        priority = cls.side_priority(side)
+        if priority == "entry" and not cls._breakers["order"].allow():
+            logging.warning(f"[one_side] broker degraded, entry refused for {symbol}")
+            return None
+        resp = None
         try:
+            cls.throttle(priority)
             resp = cls.api().order_place(**bargs)
+            cls.invalidate_books()
             logging.debug(f"[one_side] <<< ORDER RESPONSE: {resp}")
             if not resp:
                 logging.error(f"[one_side] order_place returned None for {symbol}")
@@ -77,46 +322,97 @@ class Helper:
             logging.error(message)
             print_exc()
             return None
+        finally:
+            cls._record_order(resp)
 
     @classmethod
     def cancel_orders(
-        cls, symbol: str, keep_order_id: str | None = None, side: str | None = None
-    ) -> None:
+        cls,
+        symbol: str,
+        keep_order_id: str | None = None,
+        side: str | None = None,
+        confirm: float = 0.0,
+    ) -> dict[str, str]:
+        """
+        Cancel the open orders of a symbol concurrently, CANCEL_FANOUT at a
+        time. With confirm, wait up to that many seconds for the order
+        updates that close them. Returns order id to cancelled, filled,
+        requested (not yet confirmed) or failed.
+        """
+        results: dict[str, str] = {}
         try:
-            orders = cls.orders()
-            if not orders:
-                return
-            for o in orders:
-                if o.get("symbol") == symbol and o.get("status") in [
-                    "OPEN",
-                    "TRIGGER_PENDING",
-                    "PENDING",
-                ]:
-                    if keep_order_id and o.get("order_id") == keep_order_id:
-                        continue
-                    if side and o.get("side") != side:
-                        continue
-                    cls.api().order_cancel(order_id=o.get("order_id"))
-                    logging.debug(f"Cancelled order {o.get('order_id')} for {symbol}")
+            book = cls.order_book()
+            order_ids = [
+                o.order_id
+                for o in book.for_symbol(symbol, ACTIVE_BUCKETS)
+                if not (keep_order_id and o.order_id == keep_order_id)
+                # book rows carry B/S while callers pass BUY/SELL
+                and not (side and o.side[:1] != side[:1].upper())
+            ]
+            if not order_ids:
+                return results
+            responses = cls._cancel_pool.map(cls.order_cancel, order_ids)
+            for order_id, resp in zip(order_ids, responses, strict=True):
+                results[order_id] = "requested" if accepted(resp) else "failed"
+            requested = [k for k, v in results.items() if v == "requested"]
+            if confirm and requested:
+                if not book.wait_for(requested, confirm):
+                    # no order feed, fall back to one fresh book
+                    book = cls.order_book()
+                for order_id in requested:
+                    record = book.get(order_id)
+                    status = record.status if record else ""
+                    if status == "CANCELED":
+                        results[order_id] = "cancelled"
+                    elif status == "COMPLETE":
+                        results[order_id] = "filled"
+            logging.debug(f"cancel_orders {symbol}: {results}")
         except Exception as e:
             logging.error(f"Error cancelling orders: {e}")
+        return results
+
+    @classmethod
+    def order_cancel(cls, order_id: str) -> Any | None:
+        resp = None
+        try:
+            cls.throttle("exit")
+            resp = cls.api().order_cancel(order_id=order_id)
+            cls.invalidate_books()
+            logging.debug(f"Cancelled order {order_id}: {resp}")
+            return resp
+        except Exception as e:
+            logging.error(f"helper error {e} while cancelling order {order_id}")
+            return None
+        finally:
+            cls._record_order(resp)
 
     @classmethod
     def orders(cls) -> list[dict[str, Any]] | None:
-        return cls.api().orders
+        return cls.book("orders").get()
 
     @classmethod
     def positions(cls) -> list[dict[str, Any]] | None:
-        return cls.api().positions
+        return cls.book("positions").get()
 
     @classmethod
     def historical(
-        cls, exchange: str, token: str, interval: int = 1
+        cls, exchange: str, token: str, interval: int = 1, start: float | None = None
     ) -> list[dict[str, Any]]:
         logging.debug(f"historical: ENTER {exchange}|{token}")
+        breaker = cls._breakers["history"]
+        if not breaker.allow():
+            logging.debug(f"historical: broker degraded, skipped {exchange}|{token}")
+            return []
+        resp = None
+        attempted = False
         try:
+            if not cls.throttle("history", HISTORY_WAIT):
+                logging.warning(f"historical: rate limited {exchange}|{token}")
+                return []
+            kwargs = {} if start is None else {"starttime": start}
+            attempted = True
             resp = cls.api().broker.get_time_price_series(
-                exchange=exchange, token=token, interval=interval
+                exchange=exchange, token=token, interval=interval, **kwargs
             )
             if resp is None:
                 logging.error(
@@ -129,12 +425,25 @@ class Helper:
             logging.error(f"{e} in historical")
             print_exc()
             return []
+        finally:
+            # a call we never made says nothing about the broker
+            if attempted:
+                breaker.record(resp is not None)
+            else:
+                breaker.release()
 
     @classmethod
     def modify_order(cls, kwargs: dict[str, Any]) -> Any | None:
         try:
             if next((v for v in kwargs.values() if v is not None), None):
-                return cls.api().order_modify(**kwargs)
+                cls.throttle("exit")
+                resp = None
+                try:
+                    resp = cls.api().order_modify(**kwargs)
+                finally:
+                    cls._record_order(resp)
+                cls.invalidate_books()
+                return resp
         except Exception as e:
             message = f"helper error {e} while modifying order"
             logging.warning(message)
@@ -142,14 +451,120 @@ class Helper:
         return None
 
     @classmethod
-    def close_all_for_symbol(
-        cls, symbol: str, ltp: float, max_retries: int = 5
-    ) -> None:
+    async def one_side_async(cls, bargs: dict[str, Any]) -> str | None:
+        priority = cls.side_priority(bargs.get("side"))
+        if priority == "entry" and not cls._breakers["order"].allow():
+            logging.warning(
+                f"[one_side_async] broker degraded, entry refused for {bargs.get('symbol')}"
+            )
+            return None
+        resp = None
+        try:
+            await cls._limiter.acquire_async(priority)
+            resp = await cls.aclient().order_place(**bargs)
+            cls.invalidate_books()
+            if not resp:
+                logging.error(
+                    f"[one_side_async] order_place returned None for {bargs.get('symbol')}"
+                )
+            return resp
+        except Exception as e:
+            logging.error(f"helper error {e} while placing order {bargs}")
+            return None
+        finally:
+            cls._record_order(resp)
+
+    @classmethod
+    async def modify_order_async(cls, kwargs: dict[str, Any]) -> Any | None:
+        resp = None
+        try:
+            await cls._limiter.acquire_async("exit")
+            resp = await cls.aclient().order_modify(**kwargs)
+            cls.invalidate_books()
+            return resp
+        except Exception as e:
+            logging.warning(f"helper error {e} while modifying order")
+            return None
+        finally:
+            cls._record_order(resp)
+
+    @classmethod
+    async def order_cancel_async(cls, order_id: str) -> Any | None:
+        resp = None
+        try:
+            await cls._limiter.acquire_async("exit")
+            resp = await cls.aclient().order_cancel(order_id)
+            cls.invalidate_books()
+            logging.debug(f"Cancelled order {order_id}: {resp}")
+            return resp
+        except Exception as e:
+            logging.error(f"helper error {e} while cancelling order {order_id}")
+            return None
+        finally:
+            cls._record_order(resp)
+
+    @classmethod
+    async def _book_async(cls, name: str) -> list[dict[str, Any]] | None:
+        book = cls.book(name)
+        data = book.cached()
+        if data is not None:
+            return data
+        breaker = cls._breakers["book"]
+        if not breaker.allow():
+            return book.peek()
+        generation, started = book.generation, time.monotonic()
+        try:
+            await cls._limiter.acquire_async("book")
+            data = await getattr(cls.aclient(), name)()
+        except Exception as e:
+            breaker.record(False)
+            logging.error(f"helper error {e} while fetching {name}")
+            return book.peek()
+        breaker.record(True)
+        book.put(data, generation, started)
+        return data
+
+    @classmethod
+    async def orders_async(cls) -> list[dict[str, Any]] | None:
+        return await cls._book_async("orders")
+
+    @classmethod
+    async def positions_async(cls) -> list[dict[str, Any]] | None:
+        return await cls._book_async("positions")
+
+    @classmethod
+    async def historical_async(
+        cls, exchange: str, token: str, interval: int
+    ) -> list[dict[str, Any]]:
+        breaker = cls._breakers["history"]
+        if not breaker.allow():
+            return []
+        ok = True
+        attempted = False
+        try:
+            if not await cls._limiter.acquire_async("history", HISTORY_WAIT):
+                logging.warning(f"historical_async: rate limited {exchange}|{token}")
+                return []
+            attempted = True
+            return await cls.aclient().historical(exchange, token, interval)
+        except Exception as e:
+            ok = False
+            logging.error(f"{e} in historical_async")
+            return []
+        finally:
+            if attempted:
+                breaker.record(ok)
+            else:
+                breaker.release()
+
+    @classmethod
+    def close_all_for_symbol(cls, symbol: str, ltp: float) -> None:
+        """Cancel and flatten a symbol, blocks on confirmations, keep it off the loop."""
         logging.debug(f"close_all_for_symbol: {symbol}, ltp={ltp}")
         slippage = 0.50
-        cls.cancel_orders(symbol)
-        time.sleep(1)
-        positions = cls.positions()
+        cls.cancel_orders(symbol, confirm=CANCEL_CONFIRM)
+        # no book while the broker is degraded
+        positions = cls.positions() or []
         open_positions = [
             p
             for p in positions
@@ -159,7 +574,6 @@ class Helper:
             logging.info(f"No open positions for {symbol}")
             return
         for pos in open_positions:
-            time.sleep(1)
             quantity = abs(pos["quantity"])
             sell_price = ltp - slippage
             buy_price = ltp + slippage
@@ -176,7 +590,10 @@ class Helper:
                     "exchange": "NFO",
                     "tag": "closebuy",
                 }
+                cls.throttle("exit")
                 resp = cls.api().order_place(**args)
+                cls._record_order(resp)
+                cls.invalidate_books()
                 logging.info(f"Close BUY {symbol} qty={quantity} @ {buy_price}: {resp}")
             elif pos["quantity"] > 0:
                 args = {
@@ -191,7 +608,10 @@ class Helper:
                     "exchange": "NFO",
                     "tag": "closesell",
                 }
+                cls.throttle("exit")
                 resp = cls.api().order_place(**args)
+                cls._record_order(resp)
+                cls.invalidate_books()
                 logging.info(
                     f"Close SELL {symbol} qty={quantity} @ {sell_price}: {resp}"
                 )
@@ -200,11 +620,7 @@ class Helper:
     def mtm(cls) -> float:
         pnl: float = 0.0
         try:
-            positions = cls.api().positions
-            if any(positions):
-                for pos in positions:
-                    logging.debug(f"M2M: urmtom={pos['urmtom']}, rpnl={pos['rpnl']}")
-                    pnl += pos["urmtom"] + pos["rpnl"]
+            pnl = cls.position_book().snapshot()["total"]
         except Exception as e:
             message = f"while calculating {e}"
             logging.error(f"api responded with {message}")
@@ -213,74 +629,35 @@ class Helper:
 
     @classmethod
     def order_summary(cls):
-        orders = cls.orders()
-
-        active_orders_count = 0
-        valid_orders = [o for o in orders if o and o.get("order_id")]
-        total_orders = len(valid_orders)
-
-        if total_orders > 0:
-            active_orders_count = 0
-            for o in valid_orders:
-                status = o.get("status", "")
-                if status in ["OPEN", "PENDING", "TRIGGER_PENDING"]:
-                    active_orders_count += 1
-        return active_orders_count, total_orders
+        book = cls.order_book()
+        return book.count(*ACTIVE_BUCKETS), len(book)
 
     @classmethod
     def position_summary(cls):
-        positions = cls.positions()
-        display_positions = [p for p in positions if p and p.get("quantity", 0) != 0]
-
-        m2m = 0.0
-        realized = 0.0
-        for pos in positions:
-            qty = pos.get("quantity", 0)
-            if qty != 0:
-                m2m += pos.get("urmtom", 0)
-            realized += pos.get("rpnl", 0)
-
-        return positions, len(display_positions), round(m2m, 2), round(realized, 2)
+        book = cls.position_book()
+        positions = [p.to_dict() for p in book.records()]
+        pnl = book.snapshot()
+        return positions, pnl["open"], pnl["unrealized"], pnl["realized"]
 
     @classmethod
-    def summary(cls):
-        # Always get fresh data
-        orders = cls.orders()
-        positions = cls.positions()
-
-        valid_orders = [o for o in orders if o and o.get("order_id")]
-
-        closed_statuses = ["CANCELED", "REJECTED"]
-        total_orders = len(
-            [o for o in valid_orders if o.get("status", "") not in closed_statuses]
+    def summary_snapshot(cls) -> Summary:
+        """
+        Summary rebuilt only when a book changed. The order feed keeps the
+        book current, the broker book is read again after SUMMARY_REFRESH.
+        """
+        cache = cls.book("orders")
+        orders = cache.peek()
+        if orders is None or cache.age > SUMMARY_REFRESH:
+            orders = cls.orders()
+        return cls._summary.refresh(
+            cls._order_book.sync(orders, cache.started_at(orders)),
+            cls.position_book(),
+            degraded=cls.degraded(),
         )
 
-        active_orders_count = 0
-        for o in valid_orders:
-            status = o.get("status", "")
-            if status in ["OPEN", "PENDING", "TRIGGER_PENDING"]:
-                active_orders_count += 1
-
-        display_positions = [p for p in positions if p and p.get("quantity", 0) != 0]
-
-        m2m = 0.0
-        realized = 0.0
-        for pos in positions:
-            qty = pos.get("quantity", 0)
-            if qty != 0:
-                m2m += pos.get("urmtom", 0)
-            realized += pos.get("rpnl", 0)
-
-        cls._summary = {
-            "orders": valid_orders,
-            "active_orders": active_orders_count,
-            "order_count": total_orders,
-            "positions": positions,
-            "position_count": len(display_positions),
-            "m2m": round(m2m, 2),
-            "realized_pnl": round(realized, 2),
-        }
-        return cls._summary
+    @classmethod
+    def summary(cls) -> dict[str, Any]:
+        return cls.summary_snapshot().data
 
 
 if __name__ == "__main__":
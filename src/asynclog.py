@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import queue
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+DEBUG, INFO, WARNING, ERROR, CRITICAL = 10, 20, 30, 40, 50
+QUEUE_SIZE = 10_000  # records waiting for the writer, newer ones are dropped beyond
+DEDUP_WINDOW = 5.0  # quiet seconds after which a run of repeats has its count written
+
+
+class AsyncLogger:
+    """
+    The app's logger in front of a slow one, writes happen on a thread.
+
+    The calling thread checks the level, takes the call site and queues
+    the record; formatting, deduplication and the write to the wrapped
+    logger all happen on the writer thread. Messages may be lazy: with
+    args they are %-formatted there, a callable is only called there, so
+    pass values rather than objects that keep changing.
+
+        logging.info("TRADE CHECK: ltp=%s", ltp, every=5)
+        logging.debug(lambda: f"keys {sorted(keys)}")
+
+    every=seconds keeps at most one record per call site per interval. A
+    call site repeating the same text is written once, then a single
+    "repeated N times" line when the text changes or the run goes quiet.
+    """
+
+    def __init__(self, target: Any, level: int = INFO, dedup: bool = True) -> None:
+        self.target = target
+        self.level = level
+        self.dedup = dedup
+        self._queue: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._last_at: dict[Any, float] = {}  # call site -> time of its last record
+        # call site -> [level, text, count, last seen]
+        self._repeats: dict[Any, list[Any]] = {}
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.written = 0
+        self.limited = 0
+        self.deduped = 0
+        self.dropped = 0
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(
+        self, level: int, msg: Any, *args: Any, every: float = 0, key: Any = None
+    ) -> None:
+        self._log(level, msg, args, every, key)
+
+    def _log(
+        self, level: int, msg: Any, args: tuple[Any, ...], every: float, key: Any
+    ) -> None:
+        if level < self.level:
+            return
+        # the caller of the public method, two frames up
+        frame = sys._getframe(2)
+        site = key if key is not None else (frame.f_code, frame.f_lineno)
+        if every:
+            now = time.monotonic()
+            if now - self._last_at.get(site, -every) < every:
+                self.limited += 1
+                return
+            self._last_at[site] = now
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((level, site, msg, args))
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def debug(self, msg: Any, *args: Any, every: float = 0, key: Any = None) -> None:
+        self._log(DEBUG, msg, args, every, key)
+
+    def info(self, msg: Any, *args: Any, every: float = 0, key: Any = None) -> None:
+        self._log(INFO, msg, args, every, key)
+
+    def warning(self, msg: Any, *args: Any, every: float = 0, key: Any = None) -> None:
+        self._log(WARNING, msg, args, every, key)
+
+    def error(self, msg: Any, *args: Any, every: float = 0, key: Any = None) -> None:
+        self._log(ERROR, msg, args, every, key)
+
+    def critical(self, msg: Any, *args: Any, every: float = 0, key: Any = None) -> None:
+        self._log(CRITICAL, msg, args, every, key)
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="logwriter", daemon=True
+                )
+                self._thread.start()
+
+    def _write(self, level: int, text: str) -> None:
+        try:
+            method: Callable[[str], Any] = {
+                DEBUG: self.target.debug,
+                INFO: self.target.info,
+                WARNING: self.target.warning,
+                ERROR: self.target.error,
+            }.get(level, self.target.critical)
+            method(text)
+            self.written += 1
+        except Exception as e:
+            sys.stderr.write(f"{e} while writing log\n")
+
+    def _format(self, msg: Any, args: tuple[Any, ...]) -> str:
+        try:
+            if callable(msg):
+                msg = msg()
+            return str(msg) % args if args else str(msg)
+        except Exception as e:
+            return f"{msg} {args} ({e} while formatting)"
+
+    def _repeated(self, site: Any) -> None:
+        level, text, count, _ = self._repeats.pop(site)
+        if count:
+            self._write(level, f"{text} (repeated {count} times)")
+
+    def _handle(self, level: int, site: Any, msg: Any, args: tuple[Any, ...]) -> None:
+        text = self._format(msg, args)
+        if self.dedup:
+            run = self._repeats.get(site)
+            if run is not None and run[0] == level and run[1] == text:
+                run[2] += 1
+                run[3] = time.monotonic()
+                self.deduped += 1
+                return
+            if run is not None:
+                self._repeated(site)
+            self._repeats[site] = [level, text, 0, time.monotonic()]
+        self._write(level, text)
+
+    def _flush_repeats(self, older_than: float) -> None:
+        now = time.monotonic()
+        for site, run in list(self._repeats.items()):
+            if now - run[3] >= older_than:
+                self._repeated(site)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=DEDUP_WINDOW)
+            except queue.Empty:
+                self._flush_repeats(DEDUP_WINDOW)
+                continue
+            if item is None:
+                self._flush_repeats(0)
+                self._queue.task_done()
+                continue
+            try:
+                self._handle(*item)
+            finally:
+                self._queue.task_done()
+            if self._queue.empty():
+                self._flush_repeats(DEDUP_WINDOW)
+
+    def flush(self) -> None:
+        """Blocks until everything queued so far is written, repeat counts too."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=1.0)
+        except queue.Full:
+            return
+        self._queue.join()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": self.queued,
+            "written": self.written,
+            "rate_limited": self.limited,
+            "deduplicated": self.deduped,
+            "dropped": self.dropped,
+            "waiting": self._queue.qsize(),
+        }
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import re
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.trailing import ATR_PERIOD, TICK_SIZE, TrailingStop
+
+IST_OFFSET = 19800
+DAY_SECONDS = 86400
+# seconds into the bar at which the open, extremes and close are replayed
+TICK_OFFSETS = (0, 15, 40, 59)
+
+
+class Bars:
+    __slots__ = ("close", "high", "low", "open", "symbol", "time", "volume")
+
+    def __init__(
+        self,
+        symbol: str,
+        time: Any,
+        open_: Any,
+        high: Any,
+        low: Any,
+        close: Any,
+        volume: Any = None,
+    ) -> None:
+        self.symbol = symbol
+        self.time = np.asarray(time, dtype=np.int64)
+        self.open = np.asarray(open_, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = (
+            np.zeros(len(self.time), dtype=np.float64)
+            if volume is None
+            else np.asarray(volume, dtype=np.float64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @classmethod
+    def from_rows(cls, symbol: str, rows: list[dict[str, Any]]) -> Bars:
+        """Broker time price series rows, newest first like Helper.historical."""
+        rows = sorted(rows, key=lambda r: int(r.get("ssboe", r.get("ut", 0))))
+        return cls(
+            symbol,
+            [int(r.get("ssboe", r.get("ut", 0))) for r in rows],
+            [float(r.get("into", r.get("open", 0))) for r in rows],
+            [float(r.get("inth", r.get("high", 0))) for r in rows],
+            [float(r.get("intl", r.get("low", 0))) for r in rows],
+            [float(r.get("intc", r.get("close", 0))) for r in rows],
+            [float(r.get("intv", r.get("volume", 0)) or 0) for r in rows],
+        )
+
+
+def option_type(symbol: str) -> str:
+    match = re.search(r"(C|P|CE|PE)\d+$", symbol)
+    if not match:
+        return ""
+    return "CE" if match.group(1).startswith("C") else "PE"
+
+
+def load_chain(csvfile: str) -> dict[str, Bars]:
+    """Recorded bars with columns symbol, time, open, high, low, close[, volume]."""
+    df = pd.read_csv(csvfile).sort_values(["symbol", "time"])
+    chain: dict[str, Bars] = {}
+    for symbol, grp in df.groupby("symbol"):
+        chain[symbol] = Bars(
+            symbol,
+            grp["time"].to_numpy(),
+            grp["open"].to_numpy(),
+            grp["high"].to_numpy(),
+            grp["low"].to_numpy(),
+            grp["close"].to_numpy(),
+            grp["volume"].to_numpy() if "volume" in grp else None,
+        )
+    return chain
+
+
+def fetch_chain(tokens: dict[str, str], interval: int = 1) -> dict[str, Bars]:
+    """Historical bars for ws tokens like tokens_nearest, exchange|token -> symbol."""
+    from src.api import Helper
+
+    chain: dict[str, Bars] = {}
+    for ws_token, symbol in tokens.items():
+        exchange, token = ws_token.split("|")
+        rows = Helper.historical(exchange, token, interval=interval)
+        if rows:
+            chain[symbol] = Bars.from_rows(symbol, rows)
+    return chain
+
+
+def atr_series(bars: Bars, period: int = ATR_PERIOD) -> np.ndarray:
+    """Wilder ATR for every bar, NaN until there is a previous close."""
+    prev_close = np.concatenate(([np.nan], bars.close[:-1]))
+    true_range = np.nanmax(
+        np.vstack(
+            (
+                bars.high - bars.low,
+                np.abs(bars.high - prev_close),
+                np.abs(bars.low - prev_close),
+            )
+        ),
+        axis=0,
+    )
+    return pd.Series(true_range).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+
+class SimClock:
+    def __init__(self, start: int = 0) -> None:
+        self.now = start
+
+    def set(self, now: int) -> None:
+        self.now = now
+
+
+class SimOrder:
+    __slots__ = ("price", "side", "trigger", "triggered")
+
+    def __init__(self, side: str, price: float, trigger: float = 0.0) -> None:
+        self.side = side
+        self.price = price
+        self.trigger = trigger
+        self.triggered = not trigger
+
+
+class FillModel:
+    """
+    Limit and SL-limit fills, slippage in points.
+
+    Prices inside a bar are continuous so a move from prev to ltp crosses
+    every level in between, the bar open (prev None) may gap.
+    """
+
+    def __init__(self, slippage: float = 0.0) -> None:
+        self.slippage = slippage
+
+    def match(
+        self, order: SimOrder, ltp: float, prev: float | None = None
+    ) -> float | None:
+        # buy triggers at or above trigger and executes at or below price
+        sign = 1 if order.side == "BUY" else -1
+        start = ltp if prev is None else prev
+        if not order.triggered:
+            if sign * (ltp - order.trigger) < 0:
+                return None
+            order.triggered = True
+            if sign * (start - order.trigger) < 0:
+                start = order.trigger
+        if sign * (start - order.price) <= 0:
+            point = start
+        elif sign * (ltp - order.price) <= 0:
+            point = order.price
+        else:
+            return None
+        fill = point + sign * self.slippage
+        return min(fill, order.price) if sign > 0 else max(fill, order.price)
+
+
+class Trade(NamedTuple):
+    symbol: str
+    entry_time: int
+    entry_price: float
+    exit_time: int
+    exit_price: float
+    quantity: int
+    pnl: float
+    reason: str
+
+
+class BacktestResult:
+    def __init__(self, trades: list[Trade]) -> None:
+        self.trades = trades
+        pnl = np.array([t.pnl for t in trades], dtype=np.float64)
+        self.equity = np.cumsum(pnl)
+        peak = np.maximum.accumulate(np.concatenate(([0.0], self.equity)))[1:]
+        self.drawdown = peak - self.equity
+        self.pnl = float(self.equity[-1]) if len(trades) else 0.0
+        self.max_drawdown = float(self.drawdown.max()) if len(trades) else 0.0
+        self.wins = int((pnl > 0).sum())
+
+    def summary(self) -> dict[str, Any]:
+        count = len(self.trades)
+        return {
+            "trades": count,
+            "pnl": round(self.pnl, 2),
+            "max_drawdown": round(self.max_drawdown, 2),
+            "win_rate": round(self.wins / count, 4) if count else 0.0,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.trades, columns=Trade._fields)
+
+
+class Backtest:
+    """
+    Replays bars through the TickRunner trade cycle: create, is_trade, exit_trade.
+
+    Every completed bar of the CE and PE chosen for the day re-arms the entry
+    the High button sends, a buy SL above the bar high with the exit at its
+    low and the target at `profit` times the risk. One trade is open at a
+    time like the runner, the first entry to fill cancels the other. Each bar
+    is replayed as open, low, high, close ticks (open, high, low, close for a
+    down bar) so stop, target and trail are evaluated in tick order.
+
+    settings keys follow settings.yml: premium, profit, lots, lot_size,
+    trail, bracket; plus entry_offset, chase and slippage in points.
+    """
+
+    def __init__(
+        self,
+        chain: dict[str, Bars],
+        settings: dict[str, Any],
+        fill: FillModel | None = None,
+    ) -> None:
+        self.chain = chain
+        self.premium = float(settings.get("premium", 100))
+        self.profit = float(settings.get("profit", 1))
+        self.quantity = int(settings.get("lots", 1)) * int(settings.get("lot_size", 1))
+        self.trail_settings: dict[str, Any] = settings.get("trail") or {}
+        self.use_bracket = bool(settings.get("bracket", False))
+        self.entry_offset = float(settings.get("entry_offset", TICK_SIZE))
+        self.chase = float(settings.get("chase", 0.5))
+        self.fill = fill or FillModel(float(settings.get("slippage", 0.0)))
+        self.clock = SimClock()
+        self.fn: str = "create"
+        self.entries: dict[str, tuple[SimOrder, float, float]] = {}
+        self.position: dict[str, Any] = {}
+        self._atr_cache: dict[str, np.ndarray] = {}
+        self._atr_now: dict[str, float] = {}
+
+    def _atr(self, symbol: str) -> np.ndarray:
+        if symbol not in self._atr_cache:
+            self._atr_cache[symbol] = atr_series(self.chain[symbol])
+        return self._atr_cache[symbol]
+
+    def _days(self) -> np.ndarray:
+        times = np.concatenate([b.time for b in self.chain.values()])
+        return np.unique((times + IST_OFFSET) // DAY_SECONDS)
+
+    def _nearest(self, day: int) -> dict[str, slice]:
+        """Slices of the CE and PE whose first bar of the day is nearest premium."""
+        lo = day * DAY_SECONDS - IST_OFFSET
+        best: dict[str, tuple[float, str, slice]] = {}
+        for symbol, bars in self.chain.items():
+            start, stop = np.searchsorted(bars.time, [lo, lo + DAY_SECONDS])
+            kind = option_type(symbol)
+            if start == stop or not kind:
+                continue
+            diff = abs(bars.close[start] - self.premium)
+            if kind not in best or diff < best[kind][0]:
+                best[kind] = (diff, symbol, slice(start, stop))
+        return {symbol: sl for _, symbol, sl in best.values()}
+
+    def run(self) -> BacktestResult:
+        trades: list[Trade] = []
+        for day in self._days():
+            self._run_day(self._nearest(int(day)), trades)
+        return BacktestResult(trades)
+
+    def _run_day(self, day: dict[str, slice], trades: list[Trade]) -> None:
+        if not day:
+            return
+        symbols = list(day)
+        times = np.concatenate([self.chain[s].time[day[s]] for s in symbols])
+        owner = np.concatenate(
+            [np.full(day[s].stop - day[s].start, n) for n, s in enumerate(symbols)]
+        )
+        index = np.concatenate([np.arange(day[s].start, day[s].stop) for s in symbols])
+        order = np.argsort(times, kind="stable")
+
+        self.fn = "create"
+        self.entries = {}
+        self.position = {}
+        last_close: dict[str, float] = {}
+        for k in order:
+            symbol = symbols[owner[k]]
+            bars = self.chain[symbol]
+            i = int(index[k])
+            o, h, lo, c = bars.open[i], bars.high[i], bars.low[i], bars.close[i]
+            path = (o, lo, h, c) if c >= o else (o, h, lo, c)
+            prev = None
+            for offset, ltp in zip(TICK_OFFSETS, path, strict=True):
+                self.clock.set(int(bars.time[i]) + offset)
+                self._tick(symbol, float(ltp), prev, trades)
+                prev = float(ltp)
+            last_close[symbol] = float(c)
+            self._atr_now[symbol] = float(self._atr(symbol)[i])
+            if self.fn == "create":
+                self._arm_entry(symbol, float(h), float(lo))
+
+        if self.position:
+            symbol = self.position["symbol"]
+            self._close(last_close[symbol] - self.fill.slippage, "eod", trades)
+
+    def _arm_entry(self, symbol: str, high: float, low: float) -> None:
+        price = round(high + self.entry_offset, 2)
+        if price <= low:
+            return
+        target = price + (price - low) * self.profit
+        self.entries[symbol] = (SimOrder("BUY", price, trigger=high), low, target)
+
+    def _tick(
+        self, symbol: str, ltp: float, prev: float | None, trades: list[Trade]
+    ) -> None:
+        if self.fn == "create":
+            entry = self.entries.get(symbol)
+            if entry is None:
+                return
+            fill = self.fill.match(entry[0], ltp, prev)
+            if fill is not None:
+                self._enter(symbol, fill, entry[1], entry[2])
+        elif self.fn == "exit_trade" and symbol == self.position["symbol"]:
+            self._exit_trade(ltp, prev, trades)
+
+    def _enter(self, symbol: str, price: float, stop: float, target: float) -> None:
+        self.entries = {}
+        trail = None
+        if self.trail_settings.get("mode"):
+            trail = TrailingStop.from_settings(
+                self.trail_settings,
+                entry=price,
+                stop=stop,
+                atr=lambda: self._atr_now.get(symbol),
+            )
+        self.position = {
+            "symbol": symbol,
+            "entry_time": self.clock.now,
+            "entry_price": price,
+            "stop": SimOrder("SELL", stop, trigger=round(stop + TICK_SIZE, 2)),
+            "target": SimOrder("SELL", round(target, 2)) if self.use_bracket else None,
+            "exit_price": stop,
+            "target_price": target,
+            "trail": trail,
+        }
+        self.fn = "exit_trade"
+
+    def _exit_trade(self, ltp: float, prev: float | None, trades: list[Trade]) -> None:
+        pos = self.position
+        trail = pos["trail"]
+        if trail is not None and trail.update(ltp) is not None:
+            pos["stop"] = SimOrder(
+                "SELL", trail.stop, trigger=round(trail.stop + TICK_SIZE, 2)
+            )
+            pos["exit_price"] = trail.stop
+        fill = self.fill.match(pos["stop"], ltp, prev)
+        if fill is not None:
+            self._close(fill, "stop", trades)
+            return
+        if pos["target"] is not None:
+            fill = self.fill.match(pos["target"], ltp, prev)
+            if fill is not None:
+                self._close(fill, "target", trades)
+            return
+        # the runner's own check, it sees the first ltp beyond either level
+        for level, reason in (
+            (pos["target_price"], "target"),
+            (pos["exit_price"], "stop"),
+        ):
+            sign = 1 if reason == "target" else -1
+            if sign * (ltp - level) > 0:
+                seen = level if prev is not None and sign * (prev - level) <= 0 else ltp
+                self._close(
+                    max(seen - self.fill.slippage, seen - self.chase), reason, trades
+                )
+                return
+
+    def _close(self, price: float, reason: str, trades: list[Trade]) -> None:
+        pos = self.position
+        trades.append(
+            Trade(
+                symbol=pos["symbol"],
+                entry_time=pos["entry_time"],
+                entry_price=pos["entry_price"],
+                exit_time=self.clock.now,
+                exit_price=round(price, 2),
+                quantity=self.quantity,
+                pnl=round((price - pos["entry_price"]) * self.quantity, 2),
+                reason=reason,
+            )
+        )
+        self.position = {}
+        self.fn = "create"
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="backtest recorded option chain bars")
+    parser.add_argument("csvfile")
+    parser.add_argument("--premium", type=float, default=100)
+    parser.add_argument("--profit", type=float, default=1)
+    parser.add_argument("--lots", type=int, default=1)
+    parser.add_argument("--lot-size", type=int, default=75)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    args = parser.parse_args()
+
+    from src.constants import logging
+
+    started = time.perf_counter()
+    result = Backtest(
+        load_chain(args.csvfile),
+        {
+            "premium": args.premium,
+            "profit": args.profit,
+            "lots": args.lots,
+            "lot_size": args.lot_size,
+            "slippage": args.slippage,
+        },
+    ).run()
+    logging.info(f"\n{result.to_frame().to_string()}")
+    logging.info(f"{result.summary()} in {time.perf_counter() - started:.2f}s")
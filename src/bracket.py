@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from src.api import Helper
+from src.books import TERMINAL_STATUSES
+from src.constants import logging
+from src.orders import accepted
+from src.trailing import TICK_SIZE
+
+
+def round_to_tick(price: float, tick_size: float = TICK_SIZE) -> float:
+    return round(round(price / tick_size) * tick_size, 2)
+
+
+class Leg:
+    __slots__ = ("filled", "name", "order_id", "status")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.order_id: str = ""
+        self.status: str = ""
+        self.filled: int = 0
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+class Bracket:
+    """
+    Target (LMT) and stop (SL) exit legs of one long position, linked as OCO.
+
+    A fill on either leg cancels the sibling, a partial fill shrinks it to
+    the remaining quantity. Sibling actions run on the manager's executor
+    so the websocket thread that delivers the fill is never blocked.
+    stop_price and the legs' fills are the only record of the stop: a
+    trail moves it through move_stop, a resize reuses the trailed price.
+    """
+
+    def __init__(
+        self,
+        manager: BracketManager,
+        symbol: str,
+        exchange: str,
+        quantity: int,
+        tag: str,
+        target_price: float,
+        stop_price: float,
+    ) -> None:
+        self.manager = manager
+        self.symbol = symbol
+        self.exchange = exchange
+        self.quantity = quantity
+        self.tag = tag
+        self.target_price = round_to_tick(target_price)
+        self.stop_price = stop_price
+        self.target = Leg("target")
+        self.stop = Leg("stop")
+        self.filled_at: float | None = None
+        self.closed_at: float | None = None
+        self.closed_by: str = ""
+        self._sibling_qty: int = quantity
+        self._lock = threading.Lock()
+
+    def _args(self, leg: Leg) -> dict[str, Any]:
+        args = {
+            "symbol": self.symbol,
+            "exchange": self.exchange,
+            "quantity": self.quantity,
+            "disclosed_quantity": 0,
+            "side": "SELL",
+            "tag": self.tag,
+        }
+        if leg is self.target:
+            args.update(order_type="LMT", price=self.target_price, trigger_price=0)
+        else:
+            args.update(
+                order_type="SL",
+                price=self.stop_price,
+                trigger_price=round(self.stop_price + TICK_SIZE, 2),
+            )
+        return args
+
+    def place(self) -> bool:
+        futures = {
+            leg: self.manager.submit(self.manager.helper.one_side, self._args(leg))
+            for leg in (self.stop, self.target)
+        }
+        for leg, future in futures.items():
+            leg.order_id = future.result() or ""
+        if not self.stop.order_id:
+            logging.error(f"Bracket stop leg failed for {self.symbol}")
+            if self.target.order_id:
+                self.manager.helper.order_cancel(self.target.order_id)
+            return False
+        if not self.target.order_id:
+            logging.warning(f"Bracket target leg failed for {self.symbol}, stop only")
+        logging.info(
+            f"Bracket placed for {self.symbol}: target {self.target.order_id} @ {self.target_price}, stop {self.stop.order_id} @ {self.stop_price}"
+        )
+        return True
+
+    def leg(self, order_id: str) -> Leg | None:
+        if order_id and order_id == self.target.order_id:
+            return self.target
+        if order_id and order_id == self.stop.order_id:
+            return self.stop
+        return None
+
+    def sibling(self, leg: Leg) -> Leg:
+        return self.stop if leg is self.target else self.target
+
+    @property
+    def done(self) -> bool:
+        if not self.target.order_id:
+            return self.stop.is_terminal
+        return self.target.is_terminal and self.stop.is_terminal
+
+    def on_order_update(self, update: dict[str, Any]) -> None:
+        leg = self.leg(update.get("order_id", ""))
+        if leg is None:
+            return
+        received_at = update.get("received_at") or time.time()
+        action = None
+        with self._lock:
+            leg.status = update.get("status") or leg.status
+            filled = update.get("filled_quantity") or 0
+            if leg.status == "COMPLETE" and not filled:
+                filled = self.quantity
+            leg.filled = max(leg.filled, filled)
+            sibling = self.sibling(leg)
+
+            if leg.filled and not sibling.filled:
+                if self.filled_at is None:
+                    self.filled_at = received_at
+                    self.closed_by = leg.name
+                remaining = self.quantity - leg.filled
+                if sibling.order_id and not sibling.is_terminal:
+                    if remaining <= 0 and self._sibling_qty > 0:
+                        self._sibling_qty = 0
+                        action = (self._cancel, sibling)
+                    elif 0 < remaining < self._sibling_qty:
+                        self._sibling_qty = remaining
+                        action = (self._resize, sibling, remaining)
+
+            if (
+                self.closed_by
+                and leg.name != self.closed_by
+                and leg.is_terminal
+                and self.closed_at is None
+            ):
+                self.closed_at = received_at
+                self.manager.record(self, self.closed_at - self.filled_at)
+
+        if action:
+            self.manager.submit(*action)
+
+    def _modify_args(self, leg: Leg, quantity: int) -> dict[str, Any]:
+        kwargs = self._args(leg)
+        kwargs.pop("side")
+        kwargs.pop("tag")
+        kwargs.pop("disclosed_quantity")
+        kwargs.update(order_id=leg.order_id, quantity=quantity)
+        return kwargs
+
+    def move_stop(self, price: float) -> bool:
+        """Trail the stop leg to price at the quantity it still has open."""
+        with self._lock:
+            remaining = self.quantity - self.target.filled
+            if self.stop.is_terminal or remaining <= 0:
+                return False
+            previous, self.stop_price = self.stop_price, price
+            kwargs = self._modify_args(self.stop, remaining)
+        logging.info(
+            f"Bracket {self.symbol}: trailing stop {self.stop.order_id} to {price} qty {remaining}"
+        )
+        if accepted(self.manager.helper.modify_order(kwargs)):
+            return True
+        with self._lock:
+            # a resize sends the stop the broker still has
+            if self.stop_price == price:
+                self.stop_price = previous
+        return False
+
+    def _cancel(self, leg: Leg) -> None:
+        logging.info(
+            f"Bracket {self.symbol}: {self.closed_by} filled, cancelling {leg.name} {leg.order_id}"
+        )
+        self.manager.helper.order_cancel(leg.order_id)
+
+    def _resize(self, leg: Leg, quantity: int) -> None:
+        logging.info(
+            f"Bracket {self.symbol}: partial fill, {leg.name} {leg.order_id} to qty {quantity}"
+        )
+        # read at send time, so a stop trailed meanwhile keeps its price
+        with self._lock:
+            kwargs = self._modify_args(leg, quantity)
+        self.manager.helper.modify_order(kwargs)
+
+
+class BracketManager:
+    def __init__(self, max_workers: int = 4, helper: Any = Helper) -> None:
+        # Helper for live orders, a Paper broker for paper ones
+        self.helper = helper
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="bracket"
+        )
+        self._brackets: dict[str, Bracket] = {}
+        self._latencies: deque[float] = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Any, *args: Any) -> Any:
+        return self._executor.submit(fn, *args)
+
+    def open(
+        self,
+        symbol: str,
+        exchange: str,
+        quantity: int,
+        tag: str,
+        target_price: float,
+        stop_price: float,
+    ) -> Bracket | None:
+        bracket = Bracket(
+            self, symbol, exchange, quantity, tag, target_price, stop_price
+        )
+        if not bracket.place():
+            return None
+        with self._lock:
+            for leg in (bracket.target, bracket.stop):
+                if leg.order_id:
+                    self._brackets[leg.order_id] = bracket
+        return bracket
+
+    def on_order_update(self, update: dict[str, Any]) -> None:
+        bracket = self._brackets.get(update.get("order_id", ""))
+        if bracket is None:
+            return
+        bracket.on_order_update(update)
+        if bracket.done:
+            self.discard(bracket)
+
+    def discard(self, bracket: Bracket) -> None:
+        with self._lock:
+            for leg in (bracket.target, bracket.stop):
+                self._brackets.pop(leg.order_id, None)
+
+    def record(self, bracket: Bracket, latency: float) -> None:
+        self._latencies.append(latency)
+        logging.info(
+            f"Bracket {bracket.symbol} closed by {bracket.closed_by}, sibling done in {latency * 1000:.1f} ms"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        latencies = sorted(self._latencies)
+        count = len(latencies)
+        return {
+            "open": len({id(b) for b in self._brackets.values()}),
+            "closed": count,
+            "last_ms": round(self._latencies[-1] * 1000, 1) if count else None,
+            "avg_ms": round(sum(latencies) / count * 1000, 1) if count else None,
+            "p50_ms": round(latencies[count // 2] * 1000, 1) if count else None,
+            "max_ms": round(latencies[-1] * 1000, 1) if count else None,
+        }
+
+
+brackets = BracketManager()
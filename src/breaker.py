@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from src.constants import logging
+
+ENDPOINTS = ("order", "book", "history")
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Failure rate breaker for one group of broker calls.
+
+    Trips open when at least min_calls of the last window calls were made
+    and failure_rate of them failed. While open every call is refused
+    until the cool-down passes, then one probe is let through (half open):
+    success closes the breaker, failure opens it again with the cool-down
+    doubled up to max_cooldown.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        cooldown: float = 2.0,
+        max_cooldown: float = 60.0,
+    ) -> None:
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._results: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.refused = 0
+
+    @classmethod
+    def from_settings(cls, name: str, settings: dict[str, Any]) -> CircuitBreaker:
+        return cls(
+            name,
+            window=settings.get("window", 20),
+            min_calls=settings.get("min_calls", 5),
+            failure_rate=settings.get("failure_rate", 0.5),
+            cooldown=settings.get("cooldown", 2.0),
+            max_cooldown=settings.get("max_cooldown", 60.0),
+        )
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == CLOSED
+
+    @property
+    def ready(self) -> bool:
+        """Whether allow() would let a call through, without taking the probe."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self._opened_at >= self.cooldown
+        return not self._probing
+
+    def allow(self) -> bool:
+        """True when a call may go to the broker, record() its outcome after."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if (
+                self.state == OPEN
+                and time.monotonic() - self._opened_at >= self.cooldown
+            ):
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                logging.info(f"[breaker] {self.name} half open, probing")
+                return True
+            self.refused += 1
+            return False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if self.state == OPEN:
+                return
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok:
+                    self._close()
+                else:
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                    self._open()
+                return
+            self._results.append(ok)
+            if self.state == CLOSED and self._tripped():
+                self._open()
+
+    def release(self) -> None:
+        """Give back a probe that never reached the broker, it says nothing."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def _tripped(self) -> bool:
+        calls = len(self._results)
+        if calls < self.min_calls:
+            return False
+        return self._results.count(False) / calls >= self.failure_rate
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        logging.warning(f"[breaker] {self.name} open for {self.cooldown:.1f}s")
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self.cooldown = self.base_cooldown
+        self._results.clear()
+        logging.info(f"[breaker] {self.name} closed")
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.cooldown = self.base_cooldown
+            self._probing = False
+            self._results.clear()
+
+    def stats(self) -> dict[str, Any]:
+        calls = len(self._results)
+        return {
+            "state": self.state,
+            "failure_rate": round(self._results.count(False) / calls, 3)
+            if calls
+            else 0.0,
+            "cooldown": self.cooldown,
+            "trips": self.trips,
+            "refused": self.refused,
+        }
+
+
+def breakers_from_settings(settings: dict[str, Any]) -> dict[str, CircuitBreaker]:
+    """One breaker per endpoint, an endpoint section overrides the shared keys."""
+    shared = {k: v for k, v in settings.items() if k not in ENDPOINTS}
+    return {
+        name: CircuitBreaker.from_settings(name, {**shared, **settings.get(name, {})})
+        for name in ENDPOINTS
+    }
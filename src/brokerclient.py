@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.constants import logging
+from src.session import credentials
+
+ROUTES = {
+    "place": "PlaceOrder",
+    "modify": "ModifyOrder",
+    "cancel": "CancelOrder",
+    "orders": "OrderBook",
+    "positions": "PositionBook",
+    "historical": "TPSeries",
+}
+ORDER_TYPES = {
+    "LIMIT": "LMT",
+    "LMT": "LMT",
+    "MARKET": "MKT",
+    "MKT": "MKT",
+    "SL": "SL-LMT",
+    "SL-LMT": "SL-LMT",
+    "SL-L": "SL-LMT",
+    "SLM": "SL-MKT",
+    "SL-M": "SL-MKT",
+    "SL-MKT": "SL-MKT",
+}
+PRODUCTS = {"NRML": "M", "MIS": "I", "CNC": "C"}
+
+
+class BrokerError(Exception):
+    pass
+
+
+def _no_data(resp: Any) -> bool:
+    return isinstance(resp, dict) and "no data" in str(resp.get("emsg", "")).lower()
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def order_row(row: dict[str, Any]) -> dict[str, Any]:
+    """Noren order book row with the keys Helper callers read."""
+    return {
+        **row,
+        "order_id": row.get("norenordno"),
+        "symbol": row.get("tsym"),
+        "exchange": row.get("exch"),
+        "side": row.get("trantype"),
+        "order_type": row.get("prctyp"),
+        "product": row.get("prd"),
+        "quantity": _int(row.get("qty")),
+        "filled_quantity": _int(row.get("fillshares")),
+        "price": _float(row.get("prc")),
+        "trigger_price": _float(row.get("trgprc")),
+        "average_price": _float(row.get("avgprc")),
+        "tag": row.get("remarks", ""),
+        "broker_timestamp": row.get("norentm", ""),
+    }
+
+
+def position_row(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        **row,
+        "symbol": row.get("tsym"),
+        "exchange": row.get("exch"),
+        "quantity": _int(row.get("netqty")),
+        "urmtom": _float(row.get("urmtom")),
+        "rpnl": _float(row.get("rpnl")),
+        "last_price": _float(row.get("lp")),
+    }
+
+
+class AsyncBroker:
+    """
+    Awaitable Noren REST calls over one pooled keep-alive httpx client.
+
+    Requests to the same host share a semaphore so the order path, a
+    cancel loop and a book refresh can overlap without opening more than
+    per_host connections. Every request carries its own timeout.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        uid: str,
+        token: str,
+        actid: str | None = None,
+        max_connections: int = 10,
+        per_host: int = 4,
+        timeout: float = 5.0,
+        http2: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.host = host.rstrip("/")
+        self.uid = uid
+        self.actid = actid or uid
+        self.token = token
+        self.per_host = per_host
+        self.timeout = timeout
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(timeout),
+            http2=http2,
+            transport=transport,
+        )
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.errors = 0
+
+    @classmethod
+    def from_session(cls, api: Any, **options: Any) -> AsyncBroker:
+        """Reuse the token of a logged in stock_brokers session."""
+        creds = credentials(api)
+        if creds is None or not creds["host"]:
+            raise BrokerError("broker session has no noren host, user or token")
+        return cls(
+            creds["host"], creds["uid"], creds["token"], actid=creds["actid"], **options
+        )
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client.is_closed
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        netloc = urlsplit(url).netloc
+        if netloc not in self._semaphores:
+            self._semaphores[netloc] = asyncio.Semaphore(self.per_host)
+        return self._semaphores[netloc]
+
+    async def post(
+        self, route: str, jdata: dict[str, Any], timeout: float | None = None
+    ) -> Any:
+        url = f"{self.host}/{ROUTES[route]}"
+        body = "jData=" + json.dumps(jdata) + f"&jKey={self.token}"
+        async with self._semaphore(url):
+            started = time.perf_counter()
+            self.requests += 1
+            try:
+                resp = await self._client.post(
+                    url,
+                    content=body,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                    timeout=timeout or self.timeout,
+                )
+                resp.raise_for_status()
+                data = resp.json()
+            except (httpx.HTTPError, ValueError) as e:
+                self.errors += 1
+                raise BrokerError(f"{route}: {e!r}") from e
+            finally:
+                logging.debug(
+                    f"[brokerclient] {route} in {(time.perf_counter() - started) * 1000:.1f} ms"
+                )
+        return data
+
+    async def order_place(self, **kwargs: Any) -> str | None:
+        order_type = str(kwargs.get("order_type", "LMT")).upper()
+        product = str(kwargs.get("product", "M")).upper()
+        jdata = {
+            "uid": self.uid,
+            "actid": self.actid,
+            "exch": kwargs.get("exchange", "NFO"),
+            "tsym": kwargs["symbol"],
+            "qty": str(kwargs["quantity"]),
+            "dscqty": str(kwargs.get("disclosed_quantity", 0)),
+            "prc": str(kwargs.get("price", 0)),
+            "trgprc": str(kwargs.get("trigger_price", 0)),
+            "prd": PRODUCTS.get(product, product),
+            "trantype": str(kwargs.get("side", "B"))[:1].upper(),
+            "prctyp": ORDER_TYPES.get(order_type, order_type),
+            "ret": "DAY",
+            "remarks": kwargs.get("tag", ""),
+        }
+        resp = await self.post("place", jdata)
+        if resp.get("stat") != "Ok":
+            logging.error(f"[brokerclient] order_place rejected {resp}")
+            return None
+        return resp.get("norenordno")
+
+    async def order_modify(self, **kwargs: Any) -> Any:
+        order_type = str(kwargs.get("order_type", "LMT")).upper()
+        jdata = {
+            "uid": self.uid,
+            "exch": kwargs.get("exchange", "NFO"),
+            "norenordno": kwargs["order_id"],
+            "tsym": kwargs["symbol"],
+            "qty": str(kwargs["quantity"]),
+            "prctyp": ORDER_TYPES.get(order_type, order_type),
+            "prc": str(kwargs.get("price", 0)),
+            "trgprc": str(kwargs.get("trigger_price", 0)),
+            "ret": "DAY",
+        }
+        return await self.post("modify", jdata)
+
+    async def order_cancel(self, order_id: str) -> Any:
+        return await self.post("cancel", {"uid": self.uid, "norenordno": order_id})
+
+    async def orders(self) -> list[dict[str, Any]]:
+        resp = await self.post("orders", {"uid": self.uid})
+        if _no_data(resp):
+            return []
+        if not isinstance(resp, list):
+            raise BrokerError(f"orders: {resp}")
+        return [order_row(row) for row in resp]
+
+    async def positions(self) -> list[dict[str, Any]]:
+        resp = await self.post("positions", {"uid": self.uid, "actid": self.actid})
+        if _no_data(resp):
+            return []
+        if not isinstance(resp, list):
+            raise BrokerError(f"positions: {resp}")
+        return [position_row(row) for row in resp]
+
+    async def historical(
+        self,
+        exchange: str,
+        token: str,
+        interval: int,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[dict[str, Any]]:
+        if start is None:
+            start = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+        jdata = {
+            "uid": self.uid,
+            "exch": exchange,
+            "token": str(token),
+            "st": str(int(start)),
+            "intrv": str(interval),
+        }
+        if end is not None:
+            jdata["et"] = str(int(end))
+        resp = await self.post("historical", jdata)
+        if _no_data(resp):
+            return []
+        if not isinstance(resp, list):
+            raise BrokerError(f"historical: {resp}")
+        return resp
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": {
+                host: self.per_host - sem._value
+                for host, sem in self._semaphores.items()
+            },
+        }
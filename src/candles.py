@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from src.constants import logging
+
+if TYPE_CHECKING:
+    from src.timeframes import Frame
+
+
+def day_start(now: float | None = None) -> int:
+    """Local midnight, the start the broker uses when none is given."""
+    return int(time.mktime(time.localtime(now)[:3] + (0, 0, 0, 0, 0, -1)))
+
+
+def _bar(row: dict[str, Any]) -> tuple[int, list[float]] | None:
+    try:
+        return int(row.get("ssboe", row.get("ut", 0))), [
+            float(row.get("into", row.get("open", 0))),
+            float(row.get("inth", row.get("high", 0))),
+            float(row.get("intl", row.get("low", 0))),
+            float(row.get("intc", row.get("close", 0))),
+        ]
+    except (TypeError, ValueError):
+        return None
+
+
+def volume_delta(
+    totals: dict[str, float], key: str, message: dict[str, Any] | None
+) -> float:
+    """Traded since the last tick of key, from the feed's cumulative day volume."""
+    try:
+        total = float((message or {})["v"])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+    last = totals.get(key)
+    totals[key] = total
+    return total - last if last is not None and total > last else 0.0
+
+
+def _fragment(stamp: int, bar: list[float]) -> str:
+    o, h, lo, c = bar
+    return json.dumps({"time": stamp, "open": o, "high": h, "low": lo, "close": c})
+
+
+class CandleSeries:
+    """
+    One token at one interval: bars from the broker plus the live bar from
+    ticks.
+
+    Every bar but the newest is closed, so their json is joined once and
+    reused; a payload is only rebuilt when the newest bar changes. Bars are
+    served newest first, the order the broker and chart.js use.
+    """
+
+    def __init__(self, interval: int, day: int) -> None:
+        self.seconds = max(int(interval), 1) * 60
+        self.day = day
+        self.bars: dict[int, list[float]] = {}
+        self.newest: int = 0
+        self.fetched_at: float = 0.0
+        self._closed: str = ""
+        self._payload: bytes | None = None
+        self.lock = threading.Lock()
+        # one broker fetch at a time without holding ticks back
+        self.loading = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    def merge(self, rows: list[dict[str, Any]]) -> int:
+        """Broker bars win over live ones except for the bar still forming."""
+        merged = 0
+        for row in rows:
+            parsed = _bar(row)
+            if parsed is None or parsed[0] < self.day:
+                continue
+            stamp, bar = parsed
+            live = self.bars.get(stamp)
+            if live is not None and stamp == self.newest:
+                bar = [bar[0], max(bar[1], live[1]), min(bar[2], live[2]), live[3]]
+            self.bars[stamp] = bar
+            merged += 1
+        if merged:
+            self.newest = max(self.bars)
+            self._rebuild()
+        return merged
+
+    def on_tick(self, price: float, now: float) -> bool:
+        stamp = int(now // self.seconds * self.seconds)
+        if stamp < self.newest or stamp < self.day:
+            return False
+        bar = self.bars.get(stamp)
+        if bar is None:
+            previous = self.bars.get(self.newest)
+            if previous is not None:
+                closed = _fragment(self.newest, previous)
+                self._closed = f"{closed},{self._closed}" if self._closed else closed
+            self.bars[stamp] = [price, price, price, price]
+            self.newest = stamp
+        elif bar[3] == price:
+            return False
+        else:
+            bar[1] = max(bar[1], price)
+            bar[2] = min(bar[2], price)
+            bar[3] = price
+        self._payload = None
+        return True
+
+    def _rebuild(self) -> None:
+        self._closed = ",".join(
+            _fragment(stamp, self.bars[stamp])
+            for stamp in sorted(self.bars, reverse=True)
+            if stamp != self.newest
+        )
+        self._payload = None
+
+    def payload(self) -> bytes:
+        if self._payload is None:
+            parts = (
+                [_fragment(self.newest, self.bars[self.newest])] if self.bars else []
+            )
+            if self._closed:
+                parts.append(self._closed)
+            self._payload = ('{"data":[' + ",".join(parts) + "]}").encode()
+        return self._payload
+
+
+class CandleCache:
+    """
+    Intraday candles per (token, interval) kept for the session.
+
+    The first load fetches the day from the broker, ticks keep the newest
+    bar current and a load older than one interval only asks the broker for
+    bars from the newest cached one on. Series roll over at local midnight.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[..., list[dict[str, Any]]],
+        now: Callable[[], float] = time.time,
+    ) -> None:
+        self._fetch = fetch
+        self._now = now
+        self._series: dict[tuple[str, int], CandleSeries] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+
+    def series(self, key: str, interval: int) -> CandleSeries:
+        today = day_start(self._now())
+        with self._lock:
+            series = self._series.get((key, interval))
+            if series is None or series.day != today:
+                series = self._series[(key, interval)] = CandleSeries(interval, today)
+            return series
+
+    def get(self, key: str, interval: int) -> bytes:
+        series = self.series(key, interval)
+        with series.loading:
+            if self._now() - series.fetched_at < series.seconds:
+                self.hits += 1
+            else:
+                start = series.newest or series.day
+                exchange, token = key.split("|", 1)
+                rows = self._fetch(exchange, token, interval=interval, start=start)
+                self.fetches += 1
+                with series.lock:
+                    if rows:
+                        series.merge(rows)
+                        series.fetched_at = self._now()
+                logging.debug(
+                    f"[candles] {key} {interval}m from {start}: {len(rows or ())} rows, {len(series)} cached"
+                )
+        with series.lock:
+            return series.payload()
+
+    def on_tick(self, key: str, price: float, now: float | None = None) -> None:
+        """Ticks only extend series that a chart has loaded."""
+        if not self._series:
+            return
+        now = self._now() if now is None else now
+        for (series_key, _), series in list(self._series.items()):
+            if series_key == key and series.fetched_at:
+                with series.lock:
+                    series.on_tick(price, now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "series": {f"{k}@{i}m": len(s) for (k, i), s in self._series.items()},
+            "hits": self.hits,
+            "fetches": self.fetches,
+        }
+
+
+def _candle(
+    stamp: int, bar: list[float], indicators: dict[str, Any] | None = None
+) -> str:
+    o, h, lo, c, v = bar
+    candle = {"open": o, "high": h, "low": lo, "close": c, "volume": v, "time": stamp}
+    if indicators:
+        candle["indicators"] = indicators
+    return json.dumps(candle)
+
+
+class Subscription:
+    """
+    Pending candle payloads of one client, a newer update of a bar replaces
+    the older. Raw subscriptions get (time, bar, indicators) to encode
+    themselves instead of the shared json.
+    """
+
+    def __init__(self, slot: tuple[str, int], raw: bool = False, seq: int = 0) -> None:
+        self.slot = slot
+        self.raw = raw
+        self.seq = seq  # hub ticks already in the first payload
+        self._pending: deque[tuple[int, Any]] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, stamp: int, payload: Any) -> None:
+        if self._pending and self._pending[-1][0] == stamp:
+            self._pending[-1] = (stamp, payload)
+        else:
+            self._pending.append((stamp, payload))
+        self._ready.set()
+
+    async def get(self) -> list[Any]:
+        return [payload for _, payload in await self.items()]
+
+    async def items(self) -> list[tuple[int, Any]]:
+        """Pending (bar time, payload) pairs, oldest first."""
+        await self._ready.wait()
+        self._ready.clear()
+        items = list(self._pending)
+        self._pending.clear()
+        return items
+
+
+class CandleHub:
+    """
+    Live candles per (token, timeframe) shared by every chart stream.
+
+    The CandleEngine's frames are the only aggregation: after each tick
+    the engine hands over the frames it moved and the hub queues the bars
+    of the ones somebody watches, a closed bar ahead of the new one.
+    Updates are handed to the event loop in one callback; each changed
+    bar is serialized once there and the same string goes to every
+    subscriber. A new subscriber starts from the frame's forming bar.
+    """
+
+    def __init__(
+        self,
+        extras: Callable[[str, int, int], dict[str, Any] | None] | None = None,
+        forming: Callable[[str, int], tuple[int, list[float]] | None] | None = None,
+    ) -> None:
+        # (key, minutes, bar time) -> indicator values sent along with the bar
+        self.extras = extras
+        # (key, minutes) -> time and ohlcv of the forming bar
+        self.forming = forming
+        self._subscribers: dict[tuple[str, int], set[Subscription]] = {}
+        self._outbox: dict[tuple[str, int], dict[int, list[float]]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._scheduled = False
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.sent = 0
+
+    def on_frames(self, key: str, frames: list[tuple[Frame, bool]]) -> None:
+        """CandleEngine listener: the frames of key one tick moved, and if each rolled."""
+        with self._lock:
+            for frame, rolled in frames:
+                slot = (key, frame.seconds)
+                if self._subscribers.get(slot):
+                    outbox = self._outbox.setdefault(slot, {})
+                    for stamp, bar in frame.changed(rolled):
+                        outbox[stamp] = bar
+            self.ticks += 1
+            schedule = (
+                bool(self._outbox) and not self._scheduled and self._loop is not None
+            )
+            if schedule:
+                self._scheduled = True
+        if schedule:
+            try:
+                self._loop.call_soon_threadsafe(self._flush)
+            except RuntimeError:
+                # loop closed, the next subscribe binds the new one
+                self._scheduled = False
+
+    def _flush(self) -> None:
+        with self._lock:
+            outbox, self._outbox = self._outbox, {}
+            self._scheduled = False
+            subscribers = {
+                slot: list(self._subscribers.get(slot, ())) for slot in outbox
+            }
+        for slot, bars in outbox.items():
+            for stamp in sorted(bars):
+                self._deliver(slot, stamp, bars[stamp], subscribers[slot])
+
+    def _deliver(
+        self,
+        slot: tuple[str, int],
+        stamp: int,
+        bar: list[float],
+        subscriptions: list[Subscription],
+    ) -> None:
+        indicators = self._indicators(slot, stamp)
+        payload = None
+        for subscription in subscriptions:
+            if subscription.raw:
+                subscription.put(stamp, (stamp, bar, indicators))
+            else:
+                if payload is None:
+                    payload = _candle(stamp, bar, indicators)
+                subscription.put(stamp, payload)
+            self.sent += 1
+
+    def _current(self, slot: tuple[str, int]) -> tuple[int, list[float]] | None:
+        # outside the hub's lock, the engine calls in holding its own
+        if self.forming is None:
+            return None
+        try:
+            return self.forming(slot[0], slot[1] // 60)
+        except Exception as e:
+            logging.error(f"{e} while reading the forming bar of {slot}")
+            return None
+
+    def _indicators(self, slot: tuple[str, int], stamp: int) -> dict[str, Any] | None:
+        if self.extras is None:
+            return None
+        try:
+            return self.extras(slot[0], slot[1] // 60, stamp)
+        except Exception as e:
+            logging.error(f"{e} while reading indicators of {slot}")
+            return None
+
+    def snapshot(self, key: str, seconds: int) -> tuple[int, str | None]:
+        """
+        The hub's tick count and the json of the forming bar. The count
+        is read first, the bar includes at least the ticks it counts.
+        """
+        slot = (key, seconds)
+        ticks = self.ticks
+        current = self._current(slot)
+        if current is None:
+            return ticks, None
+        stamp, bar = current
+        return ticks, _candle(stamp, bar, self._indicators(slot, stamp))
+
+    def subscribe(self, key: str, seconds: int, raw: bool = False) -> Subscription:
+        """Call from the event loop; the forming bar, if any, is queued at once."""
+        slot = (key, seconds)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            subscription = Subscription(slot, raw, self.ticks)
+            self._subscribers.setdefault(slot, set()).add(subscription)
+        current = self._current(slot)
+        if current is not None:
+            self._deliver(slot, *current, [subscription])
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.get(subscription.slot, set()).discard(subscription)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._outbox.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "live": {
+                f"{k}@{s}s": len(subs) for (k, s), subs in self._subscribers.items()
+            },
+            "ticks": self.ticks,
+            "sent": self.sent,
+        }
+
+
+candle_hub = CandleHub()
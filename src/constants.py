@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import atexit
 import logging as _py_logging
 from os import path
 from typing import Any
@@ -7,11 +8,15 @@ from typing import Any
 from toolkit.fileutils import Fileutils
 from toolkit.logger import Logger
 
+from src.asynclog import AsyncLogger
+
 O_FUTL = Fileutils()
 S_DATA = str(path.abspath("./data"))
 S_LOG = str(path.abspath("./data/log.txt"))
 HTPASSWD_FILE = str(path.abspath("./data/.htpasswd"))
 TRADE_JSON = str(path.abspath("./data/trade.json"))
+PAPER_TRADE_JSON = str(path.abspath("./data/paper_trade.json"))
+SESSION_JSON = str(path.abspath("./data/session.json"))
 
 
 def yml_to_obj(arg: str | None = None) -> dict[str, Any]:
@@ -31,6 +36,7 @@ def yml_to_obj(arg: str | None = None) -> dict[str, Any]:
         O_FUTL.copy_file("./factory/", "./data/", "settings.yml")
     elif not flag and arg is None:
         import sys
+
         sys.exit()
 
     return O_FUTL.get_lst_fm_yml(file)
@@ -42,8 +48,10 @@ def read_yml() -> tuple[dict[str, Any], dict[str, Any]]:
         O_SETG = yml_to_obj("settings.yml")
     except Exception:
         from traceback import print_exc
+
         print_exc()
         import sys
+
         sys.exit(1)
     else:
         return O_CNFG, O_SETG
@@ -107,15 +115,31 @@ _log_level = 20  # default INFO
 if O_SETG.get("log"):
     _log_level = O_SETG["log"].get("level", 20)
     if O_SETG["log"].get("show"):
-        logging: Logger = Logger(_log_level, S_LOG)
+        _logger = Logger(_log_level, S_LOG)
     else:
-        logging: Logger = Logger(_log_level)
+        _logger = Logger(_log_level)
 else:
-    logging: Logger = Logger(20)
+    _logger = Logger(20)
+
+# the toolkit logger writes on a background thread, callers only queue
+logging: AsyncLogger = AsyncLogger(_logger, _log_level)
+atexit.register(logging.flush)
 
-_py_logging.getLogger('websocket').setLevel(_py_logging.WARNING)
+_py_logging.getLogger("websocket").setLevel(_py_logging.WARNING)
 
 dct_sym: dict[str, dict[str, Any]] = {
-    "NIFTY": {"diff": 50, "index": "Nifty 50", "exchange": "NSE", "token": "26000", "depth": 9},
-    "BANKNIFTY": {"diff": 100, "index": "Nifty Bank", "exchange": "NSE", "token": "26009", "depth": 25},
+    "NIFTY": {
+        "diff": 50,
+        "index": "Nifty 50",
+        "exchange": "NSE",
+        "token": "26000",
+        "depth": 9,
+    },
+    "BANKNIFTY": {
+        "diff": 100,
+        "index": "Nifty Bank",
+        "exchange": "NSE",
+        "token": "26009",
+        "depth": 25,
+    },
 }
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.trailing import ATR_PERIOD
+
+COLUMNS = {"open": 0, "high": 1, "low": 2, "close": 3}
+DEFAULTS = ({"type": "vwap"}, {"type": "atr", "period": ATR_PERIOD})
+
+
+def indicator_name(spec: dict[str, Any]) -> str:
+    """ema3_low, sma9_close, vwap, atr14: the key charts and strategies use."""
+    kind = str(spec.get("type", "sma")).lower()
+    if kind == "vwap":
+        return "vwap"
+    period = int(spec.get("period", ATR_PERIOD if kind == "atr" else 9))
+    if kind == "atr":
+        return f"atr{period}"
+    return f"{kind}{period}_{spec.get('price', 'close')}"
+
+
+def specs_from_settings(ma: list[dict[str, Any]] | None) -> tuple[dict[str, Any], ...]:
+    """The ma list of settings.yml plus vwap and atr, one spec per name."""
+    specs: dict[str, dict[str, Any]] = {}
+    for spec in [*(ma or []), *DEFAULTS]:
+        if str(spec.get("type", "sma")).lower() in KINDS:
+            specs.setdefault(indicator_name(spec), spec)
+    return tuple(specs.values())
+
+
+class Indicator(ABC):
+    """
+    One indicator over the bars of a frame.
+
+    State only ever covers closed bars: update() values the forming bar
+    on top of it without changing it, commit() folds a bar in once it has
+    closed. backfill() computes a whole frame at once and leaves the state
+    as if every bar but the last had been committed.
+    """
+
+    def __init__(self, spec: dict[str, Any]) -> None:
+        self.name = indicator_name(spec)
+        self.period = int(
+            spec.get("period", ATR_PERIOD if self.name.startswith("atr") else 9)
+        )
+        self.column = COLUMNS.get(spec.get("price", "close"), 3)
+
+    @abstractmethod
+    def update(self, bar: np.ndarray) -> float | None: ...
+
+    @abstractmethod
+    def commit(self, bar: np.ndarray) -> None: ...
+
+    @abstractmethod
+    def backfill(self, bars: np.ndarray) -> np.ndarray: ...
+
+
+class EMA(Indicator):
+    """Seeded with the SMA of the first period bars, as chart.js did."""
+
+    def __init__(self, spec: dict[str, Any]) -> None:
+        super().__init__(spec)
+        self.alpha = 2 / (self.period + 1)
+        self.count = 0
+        self.seed = 0.0
+        self.ema = 0.0
+
+    def update(self, bar: np.ndarray) -> float | None:
+        x = bar[self.column]
+        count = self.count + 1
+        if count < self.period:
+            return None
+        if count == self.period:
+            return (self.seed + x) / self.period
+        return self.ema + self.alpha * (x - self.ema)
+
+    def commit(self, bar: np.ndarray) -> None:
+        value = self.update(bar)
+        self.count += 1
+        if value is None:
+            self.seed += bar[self.column]
+        else:
+            self.ema = value
+
+    def backfill(self, bars: np.ndarray) -> np.ndarray:
+        x = bars[:, self.column]
+        values = np.full(len(x), np.nan)
+        if len(x) >= self.period:
+            series = x[self.period - 1 :].copy()
+            series[0] = x[: self.period].mean()
+            values[self.period - 1 :] = (
+                pd.Series(series).ewm(alpha=self.alpha, adjust=False).mean().to_numpy()
+            )
+        self.count = max(len(x) - 1, 0)
+        self.seed = float(x[: self.count].sum()) if self.count < self.period else 0.0
+        self.ema = float(values[self.count - 1]) if self.count >= self.period else 0.0
+        return values
+
+
+class SMA(Indicator):
+    def __init__(self, spec: dict[str, Any]) -> None:
+        super().__init__(spec)
+        self.window: deque[float] = deque(maxlen=max(self.period - 1, 0))
+        self.total = 0.0
+
+    def update(self, bar: np.ndarray) -> float | None:
+        if len(self.window) < self.period - 1:
+            return None
+        return (self.total + bar[self.column]) / self.period
+
+    def commit(self, bar: np.ndarray) -> None:
+        if self.window.maxlen == 0:
+            return
+        if len(self.window) == self.window.maxlen:
+            self.total -= self.window[0]
+        x = float(bar[self.column])
+        self.window.append(x)
+        self.total += x
+
+    def backfill(self, bars: np.ndarray) -> np.ndarray:
+        x = bars[:, self.column]
+        values = np.full(len(x), np.nan)
+        if len(x) >= self.period:
+            sums = np.cumsum(np.r_[0.0, x])
+            values[self.period - 1 :] = (
+                sums[self.period :] - sums[: -self.period]
+            ) / self.period
+        committed = x[: max(len(x) - 1, 0)]
+        self.window.clear()
+        self.window.extend(committed.tolist())
+        self.total = float(sum(self.window))
+        return values
+
+
+class VWAP(Indicator):
+    """Session VWAP of the typical price, frames hold a single day."""
+
+    def __init__(self, spec: dict[str, Any]) -> None:
+        super().__init__(spec)
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def update(self, bar: np.ndarray) -> float | None:
+        volume = self.volume + bar[4]
+        if volume <= 0:
+            return None
+        return (self.pv + (bar[1] + bar[2] + bar[3]) / 3 * bar[4]) / volume
+
+    def commit(self, bar: np.ndarray) -> None:
+        self.pv += (bar[1] + bar[2] + bar[3]) / 3 * bar[4]
+        self.volume += bar[4]
+
+    def backfill(self, bars: np.ndarray) -> np.ndarray:
+        pv = np.cumsum(bars[:, 1:4].sum(axis=1) / 3 * bars[:, 4])
+        volume = np.cumsum(bars[:, 4])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(volume > 0, pv / volume, np.nan)
+        committed = len(bars) - 1
+        self.pv = float(pv[committed - 1]) if committed > 0 else 0.0
+        self.volume = float(volume[committed - 1]) if committed > 0 else 0.0
+        return values
+
+
+class ATR(Indicator):
+    """Wilder ATR, the mean of the true ranges so far until period of them exist."""
+
+    def __init__(self, spec: dict[str, Any]) -> None:
+        super().__init__(spec)
+        self.prev_close: float | None = None
+        self.count = 0
+        self.atr = 0.0
+
+    def _true_range(self, bar: np.ndarray) -> float:
+        high, low = bar[1], bar[2]
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def update(self, bar: np.ndarray) -> float | None:
+        if self.prev_close is None:
+            return None
+        tr = self._true_range(bar)
+        if self.count < self.period:
+            return (self.atr * self.count + tr) / (self.count + 1)
+        return (self.atr * (self.period - 1) + tr) / self.period
+
+    def commit(self, bar: np.ndarray) -> None:
+        value = self.update(bar)
+        if value is not None:
+            self.atr = value
+            self.count += 1
+        self.prev_close = float(bar[3])
+
+    def backfill(self, bars: np.ndarray) -> np.ndarray:
+        values = np.full(len(bars), np.nan)
+        if len(bars) >= 2:
+            high, low, close = bars[1:, 1], bars[1:, 2], bars[:-1, 3]
+            tr = np.maximum(
+                high - low, np.maximum(np.abs(high - close), np.abs(low - close))
+            )
+            warm = min(self.period, len(tr))
+            values[1 : warm + 1] = np.cumsum(tr[:warm]) / np.arange(1, warm + 1)
+            if len(tr) > self.period:
+                series = tr[self.period - 1 :].copy()
+                series[0] = values[self.period]
+                values[self.period :] = (
+                    pd.Series(series)
+                    .ewm(alpha=1 / self.period, adjust=False)
+                    .mean()
+                    .to_numpy()
+                )
+        committed = len(bars) - 1
+        self.prev_close = float(bars[committed - 1, 3]) if committed > 0 else None
+        self.count = max(committed - 1, 0)
+        self.atr = float(values[committed - 1]) if committed > 1 else 0.0
+        return values
+
+
+KINDS = {"ema": EMA, "sma": SMA, "vwap": VWAP, "atr": ATR}
+
+
+class IndicatorSet:
+    """
+    Indicator values of one frame, one preallocated column per indicator.
+
+    Rows line up with the frame's bars. Ticks revalue only the forming
+    row, a rollover commits the bar that just closed first.
+    """
+
+    def __init__(
+        self, specs: list[dict[str, Any]] | tuple[dict[str, Any], ...], capacity: int
+    ) -> None:
+        self.capacity = capacity
+        self.indicators: dict[str, Indicator] = {}
+        self.values: dict[str, np.ndarray] = {}
+        for spec in specs:
+            self.add(spec)
+
+    def add(self, spec: dict[str, Any], bars: np.ndarray | None = None) -> str:
+        name = indicator_name(spec)
+        kind = KINDS.get(str(spec.get("type", "sma")).lower())
+        if kind is None:
+            raise ValueError(
+                f"unknown indicator {spec}, expected one of {tuple(KINDS)}"
+            )
+        if name not in self.indicators:
+            self.indicators[name] = kind(spec)
+            self.values[name] = np.full(self.capacity, np.nan)
+            if bars is not None and len(bars):
+                self.values[name][: len(bars)] = self.indicators[name].backfill(bars)
+        return name
+
+    def backfill(self, bars: np.ndarray) -> None:
+        for name, indicator in self.indicators.items():
+            column = self.values[name]
+            column[:] = np.nan
+            if len(bars):
+                column[: len(bars)] = indicator.backfill(bars)
+
+    def on_tick(self, ohlcv: np.ndarray, count: int, rolled: bool) -> None:
+        current = ohlcv[count - 1]
+        for name, indicator in self.indicators.items():
+            if rolled and count >= 2:
+                indicator.commit(ohlcv[count - 2])
+            value = indicator.update(current)
+            self.values[name][count - 1] = np.nan if value is None else value
+
+    def row(self, index: int) -> dict[str, float | None]:
+        return {name: _number(column[index]) for name, column in self.values.items()}
+
+    def columns(self, count: int) -> dict[str, list[float | None]]:
+        """Values newest first, None before an indicator has enough bars."""
+        return {
+            name: [_number(v) for v in column[:count][::-1].tolist()]
+            for name, column in self.values.items()
+        }
+
+
+def _number(value: float) -> float | None:
+    return None if math.isnan(value) else round(float(value), 4)
@@ -9,7 +9,10 @@ from typing import Any
 from fastapi import APIRouter
 
 from src.api import Helper
-from src.constants import O_FUTL, TRADE_JSON, logging
+from src.candles import candle_hub
+from src.constants import PAPER_TRADE_JSON, TRADE_JSON, logging
+from src.market import order_feed
+from src.orders import build_templates, file_writer
 from src.state import _logic_state
 
 IST_OFFSET = timedelta(hours=5, minutes=30)
@@ -44,7 +47,8 @@ def on_stop(app_data: dict) -> None:
 
 
 def get_settings() -> dict[str, Any]:
-    from src.constants import get_settings as get_settings_const, dct_sym
+    from src.constants import dct_sym
+    from src.constants import get_settings as get_settings_const
 
     _, O_SETG = get_settings_const()
     base = O_SETG.get("base", "NIFTY")
@@ -64,7 +68,7 @@ async def trading_session_start(app: Any) -> None:
         logging.info("Already running, skipping start")
         return
 
-    O_FUTL.write_file(TRADE_JSON, {"entry_id": ""})
+    file_writer.write(TRADE_JSON, {"entry_id": ""})
 
     try:
         logging.info("📡 Creating broker API session...")
@@ -82,13 +86,13 @@ async def trading_session_start(app: Any) -> None:
 
         max_wait = 60
         waited = 0
-        logging.info(f"⏳ Waiting for LTP (max {max_wait/2} seconds)...")
+        logging.info(f"⏳ Waiting for LTP (max {max_wait / 2} seconds)...")
         while not ws.ltp and waited < max_wait:
             await asyncio.sleep(0.5)
             waited += 1
             if waited % 10 == 0:
                 logging.info(
-                    f"⏳ Still waiting... waited={waited/2}s, ltp={ws.ltp}, socket_opened={ws.socket_opened}"
+                    f"⏳ Still waiting... waited={waited / 2}s, ltp={ws.ltp}, socket_opened={ws.socket_opened}"
                 )
 
         if not ws.ltp:
@@ -127,14 +131,51 @@ async def trading_session_start(app: Any) -> None:
             symbol_nearest_to_premium
         )
 
+        from src.bracket import BracketManager, brackets
         from src.tickrunner import TickRunner
 
-        runner = TickRunner(ws, tokens_nearest)
+        ws.add_order_listener(Helper.on_order_update)
+        ws.add_tick_listener(Helper.on_tick)
+        # the engine's frames are the one aggregation, the hub streams them
+        Helper.engine().listener = candle_hub.on_frames
+        candle_hub.extras = Helper.indicator_values
+        candle_hub.forming = Helper.forming_bar
+        Helper.position_book().watch(tokens_nearest)
+        helper, bracket_manager, trade_file = Helper, brackets, TRADE_JSON
+        if settings.get("paper"):
+            from src.paper import Paper
+
+            helper = Paper.from_settings(settings["paper"])
+            helper.watch(tokens_nearest)
+            # fills before the runner sees the tick
+            ws.add_tick_listener(helper.on_tick)
+            bracket_manager = BracketManager(helper=helper)
+            # a paper trade never replaces the live one a restart resumes
+            trade_file = PAPER_TRADE_JSON
+            helper.add_order_listener(bracket_manager.on_order_update)
+            helper.add_order_listener(order_feed.on_order_update)
+            logging.info("📝 Paper trading, orders fill against live ticks in memory")
+        else:
+            ws.add_order_listener(brackets.on_order_update)
+            ws.add_order_listener(order_feed.on_order_update)
+        runner = TickRunner(
+            ws,
+            tokens_nearest,
+            trail=settings.get("trail"),
+            bracket=settings.get("bracket", False),
+            helper=helper,
+            bracket_manager=bracket_manager,
+            trade_file=trade_file,
+        )
 
         _logic_state.ws = ws
         _logic_state.runner = runner
+        _logic_state.helper = None if helper is Helper else helper
         _logic_state.tokens_nearest = tokens_nearest
         _logic_state.quantity = settings.get("lots", 1) * sgy.sym.get_lot_size()
+        _logic_state.templates = build_templates(
+            tokens_nearest, settings, _logic_state.quantity
+        )
         _logic_state.startup_data = settings
         _logic_state.app_data = {}
         _logic_state.running = True
@@ -142,6 +183,7 @@ async def trading_session_start(app: Any) -> None:
 
         task = asyncio.create_task(runner.run())
         _logic_state.runner_task = task
+        _logic_state.reconcile_task = asyncio.create_task(reconcile_positions())
 
         on_start(_logic_state.startup_data, _logic_state.app_data)
 
@@ -155,11 +197,25 @@ async def trading_session_start(app: Any) -> None:
         logging.error(traceback.format_exc())
 
 
+async def reconcile_positions() -> None:
+    from src.api import POSITION_RECONCILE
+
+    while True:
+        await asyncio.sleep(POSITION_RECONCILE)
+        try:
+            await asyncio.to_thread(Helper.reconcile_positions)
+        except Exception as e:
+            logging.error(f"{e} while reconciling positions")
+
+
 async def trading_session_stop(app: Any) -> None:
     logging.info("Stopping trading session...")
 
     on_stop(_logic_state.app_data if hasattr(_logic_state, "app_data") else {})
 
+    if _logic_state.reconcile_task:
+        _logic_state.reconcile_task.cancel()
+
     if _logic_state.runner_task:
         _logic_state.runner_task.cancel()
         try:
@@ -179,6 +235,7 @@ async def trading_session_stop(app: Any) -> None:
             logging.error(f"Error closing websocket: {e}")
 
     _logic_state.reset()
+    candle_hub.clear()
 
     from src.api import Helper
 
@@ -270,7 +327,7 @@ def create_logic_router() -> APIRouter:
     async def reset_all():
         from src.api import Helper
 
-        Helper.reset()
+        Helper.reset(forget=True)
         _logic_state.startup_data = None
         _logic_state.reset()
         return {"status": "reset_all_done"}
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+BLOCK = 64 * 1024  # bytes read per step when walking back from the end
+MAX_SCAN = 8 * 1024 * 1024  # most a filtered tail reads before giving up
+FOLLOW_INTERVAL = 0.5  # how often a follower looks for new lines
+FOLLOW_BATCH = 256 * 1024  # most bytes one follow step sends
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+_LEVEL = re.compile(r"\b(DEBUG|INFO|WARNING|ERROR|CRITICAL)\b")
+
+
+def parse_level(level: str | int | None) -> int:
+    """A level by name or number, 0 lets everything through."""
+    if not level:
+        return 0
+    if isinstance(level, int) or str(level).isdigit():
+        return int(level)
+    return LEVELS.get(str(level).upper(), 0)
+
+
+class LineFilter:
+    """
+    Keeps lines at or above a level that contain a substring.
+
+    Lines without a level of their own, tracebacks and wrapped messages,
+    take the level of the line above them.
+    """
+
+    def __init__(self, level: str | int | None = None, contains: str = "") -> None:
+        self.level = parse_level(level)
+        self.contains = contains
+        self._last = 0
+
+    def __call__(self, line: str) -> bool:
+        if self.level:
+            found = _LEVEL.search(line)
+            if found:
+                self._last = LEVELS[found.group(1)]
+            if self._last < self.level:
+                return False
+        return not self.contains or self.contains in line
+
+
+def tail(
+    path: str | Path,
+    lines: int = 200,
+    level: str | int | None = None,
+    contains: str = "",
+    max_scan: int = MAX_SCAN,
+) -> tuple[list[str], int]:
+    """
+    The last matching lines of a file and its size, read block by block
+    backwards from the end so the cost follows what is asked for, not
+    the size of the file.
+    """
+    minimum = parse_level(level)
+    matched: list[str] = []  # newest first
+    group: list[str] = []  # lines under the nearest line with a level, newest first
+
+    def take(line_level: int) -> None:
+        if line_level >= minimum:
+            matched.extend(line for line in group if not contains or contains in line)
+        group.clear()
+
+    try:
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            position = size
+            carry = b""  # start of the line the block boundary cut
+            while position and len(matched) < lines and size - position < max_scan:
+                step = min(BLOCK, position)
+                position -= step
+                f.seek(position)
+                parts = (f.read(step) + carry).split(b"\n")
+                if position + step == size and parts[-1] == b"":
+                    parts.pop()  # the newline that ends the file
+                carry = parts.pop(0) if position else b""
+                for raw in reversed(parts):
+                    line = raw.decode(errors="replace").rstrip("\r")
+                    group.append(line)
+                    found = _LEVEL.search(line) if minimum else None
+                    if not minimum:
+                        take(0)
+                    elif found:
+                        take(LEVELS[found.group(1)])
+            if not position:
+                take(0)
+    except FileNotFoundError:
+        return [], 0
+    return matched[:lines][::-1] if lines else [], size
+
+
+def _size(path: str | Path) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _read_from(path: str | Path, offset: int) -> tuple[int, bytes]:
+    """The file's size and at most FOLLOW_BATCH bytes from offset, none once it shrank."""
+    size = _size(path)
+    if size <= offset:
+        return size, b""
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return size, f.read(min(size - offset, FOLLOW_BATCH))
+    except FileNotFoundError:
+        return 0, b""
+
+
+async def follow(
+    path: str | Path,
+    offset: int | None = None,
+    level: str | int | None = None,
+    contains: str = "",
+    interval: float = FOLLOW_INTERVAL,
+) -> AsyncIterator[list[str]]:
+    """
+    Complete lines appended after offset (the current end by default),
+    one batch per step. A file that shrank was rotated, reading starts
+    over from its beginning. The file is read in a worker thread.
+    """
+    keep = LineFilter(level, contains)
+    partial = b""
+    if offset is None:
+        offset = await asyncio.to_thread(_size, path)
+    while True:
+        size, data = await asyncio.to_thread(_read_from, path, offset)
+        if size < offset:
+            offset, partial = 0, b""
+            continue
+        if data:
+            offset += len(data)
+            data = partial + data
+            complete, _, partial = data.rpartition(b"\n")
+            if complete:
+                matched = [
+                    line
+                    for line in complete.decode(errors="replace").splitlines()
+                    if keep(line)
+                ]
+                if matched:
+                    yield matched
+            if size > offset:
+                continue
+        await asyncio.sleep(interval)
@@ -3,37 +3,47 @@ from __future__ import annotations
 
 import asyncio
 import gc
+import gzip
 import json
 import logging
 import os
 import sys
+import time
 from base64 import b64decode
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
+from urllib.parse import urlsplit
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from fastapi import Body, FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import Body, FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pytz import timezone as tz
 from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 
+from src.candles import candle_hub
 from src.constants import (
-    O_FUTL,
     S_DATA,
     TRADE_JSON,
 )
-from src.state import _logic_state
-
+from src.indicators import indicator_name
 from src.logic_app import (
     create_logic_router,
     get_settings,
     start_logic,
     stop_logic,
 )
+from src.logtail import follow, tail
+from src.market import MarketSession, order_feed
+from src.orders import OrderTemplate, file_writer
+from src.state import _logic_state
+from src.stream import Producer, StreamSession
+from src.timeframes import TIMEFRAMES
 
 # ============================================================
 # Constants
@@ -42,8 +52,13 @@ from src.logic_app import (
 IST = tz("Asia/Kolkata")
 SCHEDULER = AsyncIOScheduler()
 STATIC_DIR = Path(__file__).parent / "static"
-HISTORY_INTERVAL = 3
-CANDLESTICK_TIMEFRAME_SECONDS = HISTORY_INTERVAL * 60
+HISTORY_INTERVAL = 3  # minutes the chart opens with unless settings say otherwise
+PRELOGIN_MINUTES = 5  # broker login this long before the schedule starts
+PNL_INTERVAL = 0.25  # fastest the p&l stream repeats a changed snapshot
+STREAM_INTERVAL = 1.0  # summary and status reads behind /sse/stream
+LOG_LINES = 200  # lines the logs modal opens with
+MAX_LOG_LINES = 5000  # most one tail request returns
+BOOTSTRAP_GZIP_LEVEL = 5  # the histories shrink ~10x, higher levels gain little
 
 
 # ============================================================
@@ -103,7 +118,7 @@ def get_auth_credentials() -> tuple[str, str] | None:
         return None
 
 
-def verify_basic_auth(request: Request) -> bool:
+def verify_basic_auth(request: Request | WebSocket) -> bool:
     credentials = get_auth_credentials()
     if credentials is None:
         return True
@@ -119,6 +134,14 @@ def verify_basic_auth(request: Request) -> bool:
         return False
 
 
+def same_origin(websocket: WebSocket) -> bool:
+    """Browsers always send Origin on websockets, it must be this host."""
+    origin = websocket.headers.get("origin")
+    if origin is None:
+        return True
+    return urlsplit(origin).netloc == websocket.headers.get("host", "")
+
+
 # ============================================================
 # Schedule Configuration
 # ============================================================
@@ -157,6 +180,18 @@ class ScheduleConfig:
                 return f"{_logic_state.pause_reason} ({int(remaining)}s)"
         return ""
 
+    def prelogin_trigger(self, minutes: int = PRELOGIN_MINUTES) -> CronTrigger:
+        start = self.start_hour * 60 + self.start_minute - minutes
+        days = self.trading_days
+        if start < 0:
+            start += 1440
+            days = [(d - 1) % 7 for d in days]
+        return CronTrigger(
+            day_of_week=",".join(str(d) for d in days),
+            hour=start // 60,
+            minute=start % 60,
+        )
+
     def can_start(self) -> bool:
         return self.is_within_schedule() and not _logic_state.is_running()
 
@@ -209,6 +244,16 @@ async def scheduled_stop():
         await stop_logic()
 
 
+async def scheduled_prelogin():
+    from src.api import Helper
+
+    try:
+        await asyncio.to_thread(Helper.prelogin)
+        logging.info("pre-login done, session warm for the open")
+    except Exception as e:
+        logging.error(f"pre-login failed: {e}")
+
+
 async def watchdog_check():
     if schedule_config.is_within_schedule() and not _logic_state.is_running():
         await start_logic()
@@ -254,11 +299,6 @@ def load_page_template(name: str) -> str:
 async def lifespan(app: FastAPI):
     app.state.logic = _logic_state
 
-    from src.api import Helper
-
-    Helper.reset()
-    logging.info("Session reset on startup - forcing fresh broker login")
-
     if _is_lock_enabled:
         if not check_pid_lock():
             logging.error("Another instance is running. Exiting.")
@@ -269,10 +309,16 @@ async def lifespan(app: FastAPI):
         SCHEDULER.add_job(
             watchdog_check, trigger=IntervalTrigger(seconds=60), id="watchdog_check"
         )
+        SCHEDULER.add_job(
+            scheduled_prelogin,
+            trigger=schedule_config.prelogin_trigger(),
+            id="prelogin",
+        )
         SCHEDULER.start()
 
     yield
 
+    file_writer.flush()
     if SCHEDULER.running:
         SCHEDULER.shutdown()
     release_pid_lock()
@@ -305,6 +351,19 @@ async def auth_middleware(request: Request, call_next):
 app.mount("/static", StaticFiles(directory=STATIC_DIR, html=True), name="static")
 
 
+def trading_helper() -> Any:
+    """Broker surface of the running session, the Paper broker when paper trading."""
+    from src.api import Helper
+
+    return _logic_state.helper or Helper
+
+
+def resolve_symbol(symbol: str) -> str | None:
+    """Token of a symbol the session trades."""
+    tokens = _logic_state.tokens_nearest
+    return next((k for k, v in tokens.items() if v == symbol), None)
+
+
 # ============================================================
 # Routes - Page Routing
 # ============================================================
@@ -366,20 +425,40 @@ async def memory_info():
 
 
 @app.get("/api/admin/logs")
-async def get_logs():
+async def get_logs(lines: int = LOG_LINES, level: str = "", q: str = ""):
+    """The last lines of the log, read from the end; offset is where /sse/logs follows on."""
     try:
         log_path = Path(S_DATA) / "log.txt"
         if log_path.exists():
-            content = log_path.read_text()[-5000:]
+            tailed, offset = await asyncio.to_thread(
+                tail, log_path, min(max(lines, 0), MAX_LOG_LINES), level, q
+            )
+            content = "\n".join(tailed)
         else:
-            content = "No logs found"
-        return JSONResponse(content={"content": content, "status": "ok"})
+            content, offset = "No logs found", 0
+        return JSONResponse(
+            content={"content": content, "offset": offset, "status": "ok"}
+        )
     except Exception as e:
         return JSONResponse(
             content={"content": f"Error: {e}", "status": "error"}, status_code=500
         )
 
 
+@app.get("/sse/logs")
+async def stream_logs(
+    request: Request, offset: int | None = None, level: str = "", q: str = ""
+) -> EventSourceResponse:
+    """Log lines as they are written, filtered here rather than in the browser."""
+    log_path = Path(S_DATA) / "log.txt"
+
+    async def event_generator():
+        async for lines in follow(log_path, offset, level, q):
+            yield {"event": "log", "data": "\n".join(lines)}
+
+    return EventSourceResponse(event_generator())
+
+
 @app.get("/api/admin/settings")
 async def get_settings_file():
     try:
@@ -428,14 +507,72 @@ async def get_admin_status():
     )
 
 
+def chart_settings() -> dict[str, Any]:
+    settings = get_settings()
+    # names match the indicator columns /api/historical and the stream carry
+    ma = [{**spec, "name": indicator_name(spec)} for spec in settings.get("ma", [])]
+    return {
+        "ma": ma,
+        "profit": settings.get("profit", 5),
+        "timeframe": settings.get("chart_timeframe", HISTORY_INTERVAL),
+        "timeframes": settings.get("timeframes", list(TIMEFRAMES)),
+    }
+
+
 @app.get("/api/chart/settings")
 async def get_chart_settings():
     try:
-        settings = get_settings()
-        ma = settings.get("ma", [])
-        profit = settings.get("profit", 5)
-        return JSONResponse(content={"ma": ma, "profit": profit})
+        return JSONResponse(content=chart_settings())
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@app.get("/api/bootstrap")
+async def get_bootstrap(request: Request, tf: int = 0) -> Response:
+    """
+    Everything the logic page needs before its stream, in one gzipped
+    response: chart settings, symbols, each symbol's history with the
+    indicator columns and the exact bar still forming. seq is the candle
+    hub's tick count at the snapshot; a stream whose ready event carries
+    an equal or later seq starts from bars that already include it.
+    """
+    try:
+        from src.api import Helper
+
+        settings = chart_settings()
+        tf = tf or settings["timeframe"]
+        charts = list(_logic_state.tokens_nearest.items())
+        # history first: it loads the frames the live candles come from
+        histories = await asyncio.gather(
+            *(asyncio.to_thread(Helper.candles, key, tf) for key, _ in charts)
+        )
+        parts = []
+        seq = None
+        for (key, symbol), history in zip(charts, histories, strict=True):
+            ticks, live = candle_hub.snapshot(key, tf * 60)
+            seq = ticks if seq is None else max(seq, ticks)
+            live = (live or "null").encode()
+            parts.append(
+                json.dumps(symbol).encode()
+                + b':{"history":'
+                + history
+                + b',"live":'
+                + live
+                + b"}"
+            )
+        head = {"settings": settings, "symbols": [s for _, s in charts], "tf": tf}
+        head["seq"] = candle_hub.ticks if seq is None else seq
+        # histories are already serialized, only the envelope is new
+        content = (
+            json.dumps(head).encode()[:-1] + b',"charts":{' + b",".join(parts) + b"}}"
+        )
+        headers = {"Cache-Control": "no-store", "Vary": "Accept-Encoding"}
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            content = gzip.compress(content, compresslevel=BOOTSTRAP_GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        return Response(content=content, media_type="application/json", headers=headers)
     except Exception as e:
+        logging.error(f"Error in bootstrap: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
@@ -451,16 +588,22 @@ async def get_available_symbols(request: Request) -> JSONResponse:
 
 
 @app.get("/api/summary")
-async def get_summary(request: Request) -> JSONResponse:
+async def get_summary(request: Request) -> Response:
     try:
-        from src.api import Helper
+        helper = trading_helper()
 
-        content = Helper.summary()
-        if not content:
+        # a stale book is read again from the broker, behind the rate limiter
+        snapshot = await asyncio.to_thread(helper.summary_snapshot)
+        if not snapshot.data:
             return JSONResponse(
                 content={"error": "api not initialized"}, status_code=500
             )
-        return JSONResponse(content)
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == snapshot.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=snapshot.body, media_type="application/json", headers=headers
+        )
     except Exception as e:
         logging.error(f"Error getting summary: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -469,9 +612,9 @@ async def get_summary(request: Request) -> JSONResponse:
 @app.get("/api/orders")
 async def get_orders(request: Request) -> JSONResponse:
     try:
-        from src.api import Helper
+        helper = trading_helper()
 
-        orders = Helper.orders()
+        orders = await asyncio.to_thread(helper.orders)
         logging.info(f"Orders count: {len(orders) if orders else 0}")
         return JSONResponse(content={"orders": orders})
     except Exception as e:
@@ -479,116 +622,172 @@ async def get_orders(request: Request) -> JSONResponse:
         return JSONResponse(content={"orders": []})
 
 
+@app.get("/api/brackets")
+async def get_bracket_stats(request: Request) -> JSONResponse:
+    from src.bracket import brackets
+
+    return JSONResponse(content=brackets.stats())
+
+
+@app.get("/api/admin/broker")
+async def get_broker_stats(request: Request) -> JSONResponse:
+    from src.api import Helper
+
+    return JSONResponse(content=Helper.broker_stats())
+
+
 @app.get("/api/historical/{symbol}")
-async def get_historical_data(symbol: str, request: Request) -> JSONResponse:
+async def get_historical_data(
+    symbol: str, request: Request, tf: int = HISTORY_INTERVAL
+) -> Response:
     try:
         tokens_nearest = _logic_state.tokens_nearest
         ws_token = next((k for k, v in tokens_nearest.items() if v == symbol), None)
         if not ws_token:
             return JSONResponse(content={"error": "Symbol not found"}, status_code=404)
 
-        parts = ws_token.split("|")
-        exchange, token = parts[0], parts[1]
-
         from src.api import Helper
 
-        historical_data = Helper.historical(exchange, token, interval=HISTORY_INTERVAL)
-
-        if not historical_data or len(historical_data) == 0:
-            return JSONResponse(content={"data": []})
-
-        candlesticks = []
-        for row in historical_data:
-            candlesticks.append(
-                {
-                    "time": int(row.get("ssboe", row.get("ut", 0))),
-                    "open": float(row.get("into", row.get("open", 0))),
-                    "high": float(row.get("inth", row.get("high", 0))),
-                    "low": float(row.get("intl", row.get("low", 0))),
-                    "close": float(row.get("intc", row.get("close", 0))),
-                }
-            )
-
-        return JSONResponse(content={"data": candlesticks})
+        # a cache miss waits for a history slot, off the event loop
+        return Response(
+            content=await asyncio.to_thread(Helper.candles, ws_token, tf),
+            media_type="application/json",
+        )
     except Exception as e:
         logging.error(f"Error in historical: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
+def timed(content: dict[str, Any], started: float, **kwargs: Any) -> JSONResponse:
+    """JSON response carrying the handler's own latency, also as Server-Timing."""
+    elapsed = (time.perf_counter() - started) * 1000
+    content["latency_ms"] = round(elapsed, 2)
+    response = JSONResponse(content=content, **kwargs)
+    response.headers["Server-Timing"] = f"handler;dur={elapsed:.2f}"
+    return response
+
+
 @app.post("/api/trade/buy")
 async def place_buy_order(
     request: Request, payload: dict[str, Any] = Body(...)
 ) -> JSONResponse:
+    started = time.perf_counter()
     logging.debug(f"Order request received: {payload}")
 
     symbol = payload.get("symbol", "DUMMY").upper()
-    if symbol != "DUMMY":
-        settings = get_settings()
+    if symbol == "DUMMY":
+        return timed({"message": "symbol required", "status": "failed"}, started)
 
-        order_details = {
-            "symbol": symbol,
-            "quantity": _logic_state.quantity,
-            "disclosed_quantity": 0,
-            "exchange": settings.get("option_exchange", "NFO"),
-            "tag": payload.pop("tag", "no_tag"),
-            "side": "BUY",
-        }
-
-        exit_price = payload.pop("exit_price")
-        target_price = payload.pop("target_price", None)
-        order_details.update(payload)
-
-        if not target_price:
-            return JSONResponse(
-                content={
-                    "message": "No target_price from frontend",
-                    "status": "failed",
-                    "order": order_details,
-                }
-            )
+    template = _logic_state.templates.get(symbol)
+    if template is None:
+        # not one of the session symbols, resolve it the slow way once
+        settings = get_settings()
+        template = OrderTemplate(
+            symbol,
+            settings.get("option_exchange", "NFO"),
+            _logic_state.quantity,
+            settings.get("product", "NRML"),
+        )
+    order_details = template.entry(
+        price=payload.get("price", 0),
+        trigger_price=payload.get("trigger_price", 0),
+        order_type=payload.get("order_type", "LIMIT"),
+        tag=payload.get("tag"),
+    )
 
-        from src.api import Helper
+    target_price = payload.get("target_price")
+    if not target_price:
+        return timed(
+            {
+                "message": "No target_price from frontend",
+                "status": "failed",
+                "order": order_details,
+            },
+            started,
+        )
+    exit_price = payload.get("exit_price")
+    if not exit_price:
+        return timed(
+            {
+                "message": "No exit_price from frontend",
+                "status": "failed",
+                "order": order_details,
+            },
+            started,
+        )
 
-        order_id = Helper.one_side(order_details)
-        if order_id:
-            order_details["entry_id"] = order_id
-            order_details["exit_price"] = exit_price
-            order_details["target_price"] = target_price
+    runner = _logic_state.runner
+    if runner is not None and not runner.can_adopt():
+        return timed(
+            {
+                "message": f"trade {runner.entry_id} still open, not placing another",
+                "status": "failed",
+                "order": order_details,
+            },
+            started,
+            status_code=409,
+        )
 
-            order_type = order_details.get("order_type", "LIMIT")
-            if order_type == "SL":
-                Helper.cancel_orders(symbol, keep_order_id=order_id)
-            else:
-                Helper.cancel_orders(symbol, keep_order_id=order_id, side="BUY")
+    helper = trading_helper()
 
-            blacklist = ["side", "price", "trigger_price", "order_type"]
-            for key in blacklist:
-                order_details.pop(key, None)
-            O_FUTL.write_file(filepath=TRADE_JSON, content=order_details)
-            return JSONResponse(
-                content={
-                    "message": f"Buy order initiated for {symbol}",
-                    "status": "success",
-                    "order": order_details,
-                }
-            )
+    if not helper.can_enter():
+        return timed(
+            {
+                "message": "broker degraded, new entries paused",
+                "status": "failed",
+                "order": order_details,
+            },
+            started,
+            status_code=503,
+        )
 
-        return JSONResponse(
-            content={
+    # the order bucket may be drained, wait for a slot off the loop
+    order_id = await asyncio.to_thread(helper.one_side, order_details)
+    if not order_id:
+        return timed(
+            {
                 "message": "error while buy order",
                 "status": "failed",
                 "order": order_details,
-            }
+            },
+            started,
         )
 
+    trade = template.trade(order_id, exit_price, target_price, tag=payload.get("tag"))
+    if runner is not None:
+        if not await runner.adopt_async(trade):
+            logging.error(
+                f"entry {order_id} placed but the runner took another trade meanwhile"
+            )
+    else:
+        file_writer.write(TRADE_JSON, trade)
+
+    # other entries of the symbol are cancelled after the response is sent
+    if order_details["order_type"] == "SL":
+        cleanup = BackgroundTask(helper.cancel_orders, symbol, keep_order_id=order_id)
+    else:
+        cleanup = BackgroundTask(
+            helper.cancel_orders, symbol, keep_order_id=order_id, side="BUY"
+        )
+    return timed(
+        {
+            "message": f"Buy order initiated for {symbol}",
+            "status": "success",
+            "order": trade,
+        },
+        started,
+        background=cleanup,
+    )
+
 
 @app.get("/api/trade/sell")
 async def reset(symbol: str = "", ltp: float = 0) -> JSONResponse:
     try:
-        from src.api import Helper
+        helper = trading_helper()
 
         logging.debug(f"Cancel requested: symbol={symbol}, ltp={ltp}")
-        Helper.close_all_for_symbol(symbol, ltp)
+        # waits for cancel confirmations, the streams keep going meanwhile
+        await asyncio.to_thread(helper.close_all_for_symbol, symbol, ltp)
         return JSONResponse(content={"message": "reset completed", "status": "success"})
     except Exception as e:
         logging.error(f"Cancel error: {e}")
@@ -602,7 +801,7 @@ async def add_position_order(
     request: Request, payload: dict[str, Any] = Body(...)
 ) -> JSONResponse:
     try:
-        from src.api import Helper
+        helper = trading_helper()
 
         settings = get_settings()
 
@@ -633,7 +832,16 @@ async def add_position_order(
             "product": product,
         }
 
-        order_id = Helper.one_side(order_details)
+        if not helper.can_enter():
+            return JSONResponse(
+                content={
+                    "message": "broker degraded, new entries paused",
+                    "status": "failed",
+                },
+                status_code=503,
+            )
+
+        order_id = await asyncio.to_thread(helper.one_side, order_details)
         if order_id:
             return JSONResponse(
                 content={
@@ -659,7 +867,7 @@ async def square_position(
     request: Request, payload: dict[str, Any] = Body(...)
 ) -> JSONResponse:
     try:
-        from src.api import Helper
+        helper = trading_helper()
 
         settings = get_settings()
 
@@ -688,7 +896,7 @@ async def square_position(
             "validity": "DAY",
         }
 
-        order_id = Helper.one_side(order_details)
+        order_id = await asyncio.to_thread(helper.one_side, order_details)
         if order_id:
             return JSONResponse(
                 content={
@@ -714,7 +922,7 @@ async def cancel_order(
     request: Request, payload: dict[str, Any] = Body(...)
 ) -> JSONResponse:
     try:
-        from src.api import Helper
+        helper = trading_helper()
 
         order_id = payload.get("order_id", "")
         if not order_id:
@@ -722,7 +930,7 @@ async def cancel_order(
                 content={"message": "Order ID required", "status": "error"},
                 status_code=400,
             )
-        Helper.api().order_cancel(order_id=order_id)
+        await asyncio.to_thread(helper.order_cancel, order_id)
         return JSONResponse(
             content={"message": f"Order {order_id} cancelled", "status": "success"}
         )
@@ -740,92 +948,150 @@ async def cancel_order(
 
 @app.get("/sse/candlesticks/{symbol}")
 async def sse_candlestick_endpoint(
-    symbol: str, request: Request
+    symbol: str, request: Request, tf: int = HISTORY_INTERVAL
 ) -> EventSourceResponse:
     logging.info(f"SSE connection requested for symbol: {symbol}")
 
-    last_sent_candle: dict[str, Any] | None = None
-
     async def event_generator():
-        nonlocal last_sent_candle
-        ws = _logic_state.ws
         token_symbols = _logic_state.tokens_nearest
-
-        if not ws or not token_symbols:
-            logging.error(f"SSE error: ws={ws}, tokens_nearest={token_symbols}")
+        if not _logic_state.ws or not token_symbols:
+            logging.error(
+                f"SSE error: ws={_logic_state.ws}, tokens_nearest={token_symbols}"
+            )
             return
 
-        if symbol not in token_symbols.values():
+        token_symbol = next((k for k, v in token_symbols.items() if v == symbol), None)
+        if token_symbol is None:
             logging.error(
                 f"SSE symbol {symbol} not in tokens_nearest values. Available: {list(token_symbols.values())}"
             )
             return
 
-        token_symbol = next(k for k, v in token_symbols.items() if v == symbol)
-        logging.info(f"SSE mapping: {symbol} -> {token_symbol}")
+        # the engine's frame of the token and timeframe, shared by every chart
+        subscription = candle_hub.subscribe(token_symbol, tf * 60)
+        logging.info(f"SSE connected for {symbol} -> {token_symbol}")
+        try:
+            while _logic_state.is_running():
+                try:
+                    payloads = await asyncio.wait_for(subscription.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                for payload in payloads:
+                    yield {"event": "live_update", "data": payload}
+            logging.info(f"Trading stopped. Closing SSE stream for {symbol}.")
+        finally:
+            candle_hub.unsubscribe(subscription)
 
-        waited = 0
-        while token_symbol not in ws.ltp and waited < 60:
-            await asyncio.sleep(0.5)
-            waited += 1
+    return EventSourceResponse(event_generator())
 
-        if token_symbol not in ws.ltp:
-            logging.error(
-                f"SSE timeout: {token_symbol} not in ws.ltp after {waited/2}s. LTP keys: {list(ws.ltp.keys())[:10]}"
-            )
-            return
 
-        logging.info(
-            f"SSE connected for {symbol}, initial LTP: {ws.ltp.get(token_symbol)}"
-        )
+@app.websocket("/ws/market")
+async def market_socket(websocket: WebSocket) -> None:
+    """Candles of any symbol and timeframe plus orders over one binary socket."""
+    # the http middleware never sees websockets, check before accepting
+    if not verify_basic_auth(websocket) or not same_origin(websocket):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    from src.api import Helper
+
+    market = MarketSession(
+        websocket.send_bytes,
+        websocket.send_text,
+        candle_hub,
+        order_feed,
+        resolve_symbol,
+        [indicator_name(spec) for spec in Helper._indicators],
+        default_tf=HISTORY_INTERVAL,
+    )
+    writer = asyncio.create_task(market.writer())
+    closing: set[asyncio.Future] = set()  # keeps the close alive until it ran
 
+    def writer_done(task: asyncio.Task) -> None:
+        # a client too slow for its orders reconnects and gets fresh snapshots
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"{task.exception()} on market socket, closing")
+            closing.add(asyncio.ensure_future(websocket.close(code=1013)))
+
+    writer.add_done_callback(writer_done)
+    try:
         while True:
-            if not _logic_state.is_running():
-                logging.info(f"Trading stopped. Closing SSE stream for {symbol}.")
-                break
+            await market.handle(await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logging.error(f"{e} on market socket")
+    finally:
+        market.close()
+        writer.cancel()
+        logging.info(f"market socket closed after {market.sent_bytes} bytes")
 
-            current_ws = _logic_state.ws
-            if current_ws is None:
-                await asyncio.sleep(0.5)
-                continue
 
-            await asyncio.sleep(0.5)
+def trading_status() -> dict[str, Any]:
+    return {
+        "running": _logic_state.is_running(),
+        "paused": _logic_state.is_paused(),
+        "pause_reason": _logic_state.pause_reason,
+        "within_schedule": schedule_config.is_within_schedule(),
+    }
 
-            try:
-                price = current_ws.ltp.get(token_symbol)
-                if price is None:
-                    continue
 
-                ist_now = datetime.now(IST)
-                current_timestamp_ist = int(ist_now.timestamp())
-                candle_time = current_timestamp_ist - (
-                    current_timestamp_ist % CANDLESTICK_TIMEFRAME_SECONDS
-                )
-
-                if last_sent_candle is None or candle_time > last_sent_candle["time"]:
-                    if last_sent_candle is not None:
-                        yield {
-                            "event": "live_update",
-                            "data": json.dumps(last_sent_candle),
-                        }
-
-                    last_sent_candle = {
-                        "open": price,
-                        "high": price,
-                        "low": price,
-                        "close": price,
-                        "volume": 0,
-                        "time": candle_time,
-                    }
-                else:
-                    last_sent_candle["high"] = max(last_sent_candle["high"], price)
-                    last_sent_candle["low"] = min(last_sent_candle["low"], price)
-                    last_sent_candle["close"] = price
-
-                yield {"event": "live_update", "data": json.dumps(last_sent_candle)}
-
-            except Exception:
-                continue
+def read_summary() -> tuple[Any, str]:
+    snapshot = trading_helper().summary_snapshot()
+    return snapshot.etag, snapshot.body.decode()
+
+
+def read_pnl() -> tuple[Any, str]:
+    # runs on the loop, reconciling with the broker is the background task's job
+    book = trading_helper().local_position_book()
+    return (id(book), book.version), json.dumps(book.snapshot())
+
+
+def read_status() -> tuple[Any, str]:
+    payload = json.dumps(trading_status())
+    return payload, payload
+
+
+# read once for every open /sse/stream, only while one of them listens
+STREAM_PRODUCERS = {
+    "summary": Producer("summary", read_summary, STREAM_INTERVAL, blocking=True),
+    "pnl": Producer("pnl", read_pnl, PNL_INTERVAL),
+    "status": Producer("status", read_status, STREAM_INTERVAL),
+}
+
+
+@app.get("/sse/stream")
+async def stream_topics(
+    request: Request, symbols: str = "", topics: str = "", tf: int = HISTORY_INTERVAL
+) -> EventSourceResponse:
+    """
+    Candles of the given symbols plus any of orders, summary, pnl and
+    status on one connection: /sse/stream?symbols=A,B&topics=orders,status
+    """
+
+    async def event_generator():
+        session = StreamSession(
+            candle_hub, order_feed, STREAM_PRODUCERS, resolve_symbol
+        )
+        rejected = session.subscribe(symbols.split(","), topics.split(","), tf)
+        if rejected:
+            yield {"event": "error", "data": json.dumps({"rejected": rejected})}
+        # candles that follow include every tick up to seq, see /api/bootstrap
+        yield {"event": "ready", "data": json.dumps({"seq": session.seq})}
+        try:
+            # open until the client leaves, a pause or stop reaches it as status
+            while True:
+                if not _logic_state.running:
+                    # the broker session was torn down, its tokens are gone
+                    session.end_candles()
+                try:
+                    events = await asyncio.wait_for(session.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                for event, data in events:
+                    yield {"event": event, "data": data}
+        finally:
+            session.close()
 
     return EventSourceResponse(event_generator())
 
@@ -849,6 +1115,23 @@ async def stream_all_orders(request: Request) -> EventSourceResponse:
     return EventSourceResponse(event_generator())
 
 
+@app.get("/sse/pnl")
+async def stream_pnl(request: Request) -> EventSourceResponse:
+    helper = trading_helper()
+
+    async def event_generator():
+        book = helper.local_position_book()
+        version = -1
+        while _logic_state.is_running():
+            if book.version != version:
+                snapshot = book.snapshot()
+                version = snapshot["version"]
+                yield {"event": "pnl", "data": json.dumps(snapshot)}
+            await asyncio.sleep(PNL_INTERVAL)
+
+    return EventSourceResponse(event_generator())
+
+
 # ============================================================
 # Routes - Logic App (Mounted)
 # ============================================================
@@ -917,7 +1200,7 @@ async def admin_reset_session(request: Request) -> JSONResponse:
     try:
         from src.api import Helper
 
-        Helper.reset()
+        Helper.reset(forget=True)
         return JSONResponse(
             content={"message": "Session reset complete", "status": "success"}
         )
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import math
+import struct
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from src.candles import CandleHub
+
+# binary frames, little endian, several may share one websocket message
+SNAPSHOT, DELTA = 1, 2
+SNAPSHOT_FRAME = struct.Struct("<BHI4iI")  # kind, channel, time, ohlc in paise, volume
+DELTA_HEAD = struct.Struct("<BHB")  # kind, channel, mask of the fields that follow
+PRICE = struct.Struct("<i")
+VOLUME = struct.Struct("<I")
+INDICATORS = 0x20  # mask bit: count and float32 indicator values follow
+MAX_BATCH = 64 * 1024  # bytes joined into one websocket message
+MAX_PENDING = 1000  # unsent messages before a client counts as too slow
+
+
+def paise(price: float) -> int:
+    return int(round(price * 100))
+
+
+class CandleEncoder:
+    """
+    Binary frames of one candle channel.
+
+    A bar the client has not seen goes out as a full snapshot: on
+    subscribe and on every rollover. Updates of the same bar only carry
+    the fields that changed, usually the close and the volume.
+    """
+
+    def __init__(self, channel: int, names: list[str]) -> None:
+        self.channel = channel
+        self.names = names
+        self.time = -1
+        self.fields: list[int] = []
+        self.indicators: list[float] = []
+
+    def _indicators(self, values: dict[str, Any] | None) -> list[float]:
+        """Values in ack order as float32 would carry them, so repeats compare equal."""
+        values = values or {}
+        floats = [
+            math.nan if values.get(name) is None else float(values[name])
+            for name in self.names
+        ]
+        layout = f"<{len(floats)}f"
+        return list(struct.unpack(layout, struct.pack(layout, *floats)))
+
+    def _indicator_block(self, values: list[float]) -> bytes:
+        return struct.pack(f"<B{len(values)}f", len(values), *values)
+
+    def encode(
+        self, stamp: int, bar: list[float], indicators: dict[str, Any] | None = None
+    ) -> bytes:
+        o, h, lo, c, v = bar
+        fields = [paise(o), paise(h), paise(lo), paise(c), max(int(v), 0)]
+        values = self._indicators(indicators)
+        if stamp != self.time:
+            self.time, self.fields, self.indicators = stamp, fields, values
+            return SNAPSHOT_FRAME.pack(
+                SNAPSHOT, self.channel, stamp, *fields
+            ) + self._indicator_block(values)
+        mask = 0
+        body = b""
+        for bit, (new, old) in enumerate(zip(fields, self.fields, strict=True)):
+            if new != old:
+                mask |= 1 << bit
+                body += (VOLUME if bit == 4 else PRICE).pack(new)
+        if any(
+            new != old and not (math.isnan(new) and math.isnan(old))
+            for new, old in zip(values, self.indicators, strict=True)
+        ):
+            mask |= INDICATORS
+            body += self._indicator_block(values)
+        self.fields = fields
+        self.indicators = values
+        if not mask:
+            return b""
+        return DELTA_HEAD.pack(DELTA, self.channel, mask) + body
+
+
+class OrderFeed:
+    """Order updates for websocket clients, serialized once per update."""
+
+    def __init__(self) -> None:
+        self._subscribers: set[Callable[[str], None]] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def subscribe(self, deliver: Callable[[str], None]) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._subscribers.add(deliver)
+
+    def unsubscribe(self, deliver: Callable[[str], None]) -> None:
+        self._subscribers.discard(deliver)
+
+    def on_order_update(self, update: dict[str, Any]) -> None:
+        if not self._subscribers or self._loop is None:
+            return
+        payload = json.dumps({"op": "order", "data": update}, default=str)
+        with contextlib.suppress(RuntimeError):
+            self._loop.call_soon_threadsafe(self._fanout, payload)
+
+    def _fanout(self, payload: str) -> None:
+        for deliver in list(self._subscribers):
+            deliver(payload)
+
+
+class MarketSession:
+    """
+    One /ws/market connection carrying any number of channels.
+
+    The client sends json text: {"op": "subscribe", "channel": "candles",
+    "symbol": ..., "tf": 3}, {"op": "subscribe", "channel": "orders"} or
+    {"op": "unsubscribe", "id": n}. Subscribes are answered in text with
+    the channel id and the indicator names, candles then arrive as binary
+    frames and orders as json text. One writer drains everything queued
+    into as few websocket messages as it can.
+
+    Candles are only taken from the hub once the writer has sent what
+    was queued, so a slow client gets fewer, conflated frames instead of
+    a growing backlog. Order updates cannot be conflated; a client that
+    leaves MAX_PENDING messages unsent is dropped and resubscribes.
+    """
+
+    def __init__(
+        self,
+        send_bytes: Callable[[bytes], Awaitable[None]],
+        send_text: Callable[[str], Awaitable[None]],
+        hub: CandleHub,
+        orders: OrderFeed,
+        resolve: Callable[[str], str | None],
+        names: list[str],
+        default_tf: int = 3,
+    ) -> None:
+        self._send_bytes = send_bytes
+        self._send_text = send_text
+        self.hub = hub
+        self.orders = orders
+        self.resolve = resolve
+        self.names = names
+        self.default_tf = default_tf
+        self._outbox: asyncio.Queue[bytes | str] = asyncio.Queue()
+        self._writable = asyncio.Event()  # set while the outbox is empty
+        self._writable.set()
+        self.overflowed = False
+        self._channels: dict[int, tuple[Any, asyncio.Task | None]] = {}
+        self._next = 1
+        self.sent_bytes = 0
+
+    async def handle(self, text: str) -> None:
+        try:
+            message = json.loads(text)
+            op = message.get("op")
+            if op == "subscribe":
+                self.subscribe(message)
+            elif op == "unsubscribe":
+                self.unsubscribe(int(message.get("id", 0)))
+            else:
+                self._error(f"unknown op {op}")
+        except Exception as e:
+            self._error(f"{e} in {text[:80]}")
+
+    def _put(self, item: bytes | str) -> None:
+        if self._outbox.qsize() >= MAX_PENDING:
+            self.overflowed = True
+            return
+        self._writable.clear()
+        self._outbox.put_nowait(item)
+
+    def _error(self, message: str) -> None:
+        self._put(json.dumps({"op": "error", "message": message}))
+
+    def subscribe(self, message: dict[str, Any]) -> int | None:
+        channel = message.get("channel", "candles")
+        if channel == "orders":
+            id_ = self._take_id()
+            self.orders.subscribe(self._put)
+            self._channels[id_] = (self._put, None)
+            self._ack(id_, channel=channel)
+            return id_
+        if channel != "candles":
+            self._error(f"unknown channel {channel}")
+            return None
+        symbol = message.get("symbol", "")
+        key = self.resolve(symbol)
+        if key is None:
+            self._error(f"unknown symbol {symbol}")
+            return None
+        tf = int(message.get("tf") or self.default_tf)
+        id_ = self._take_id()
+        # the ack must reach the client before the snapshot of the bar
+        self._ack(id_, channel=channel, symbol=symbol, tf=tf, indicators=self.names)
+        subscription = self.hub.subscribe(key, tf * 60, raw=True)
+        encoder = CandleEncoder(id_, self.names)
+        task = asyncio.create_task(self._pump(subscription, encoder))
+        self._channels[id_] = (subscription, task)
+        return id_
+
+    def _take_id(self) -> int:
+        id_, self._next = self._next, self._next + 1
+        return id_
+
+    def _ack(self, id_: int, **fields: Any) -> None:
+        self._put(json.dumps({"op": "subscribed", "id": id_, **fields}))
+
+    def unsubscribe(self, id_: int) -> None:
+        channel = self._channels.pop(id_, None)
+        if channel is None:
+            return
+        subscription, task = channel
+        if task is None:
+            self.orders.unsubscribe(subscription)
+        else:
+            task.cancel()
+            self.hub.unsubscribe(subscription)
+
+    async def _pump(self, subscription: Any, encoder: CandleEncoder) -> None:
+        while True:
+            # updates wait in the subscription, one per bar, until the client caught up
+            await self._writable.wait()
+            for stamp, bar, indicators in await subscription.get():
+                frame = encoder.encode(stamp, bar, indicators)
+                if frame:
+                    self._put(frame)
+
+    async def writer(self) -> None:
+        """Sends until the connection fails or the client falls MAX_PENDING behind."""
+        while True:
+            if self.overflowed:
+                raise ConnectionError("client too slow")
+            if self._outbox.empty():
+                self._writable.set()
+            item = await self._outbox.get()
+            batch: list[bytes] = []
+            while True:
+                if isinstance(item, str):
+                    if batch:
+                        await self._flush(batch)
+                        batch = []
+                    await self._send_text(item)
+                else:
+                    batch.append(item)
+                    if sum(map(len, batch)) >= MAX_BATCH:
+                        await self._flush(batch)
+                        batch = []
+                if self._outbox.empty():
+                    break
+                item = self._outbox.get_nowait()
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: list[bytes]) -> None:
+        data = b"".join(batch)
+        self.sent_bytes += len(data)
+        await self._send_bytes(data)
+
+    def close(self) -> None:
+        for id_ in list(self._channels):
+            self.unsubscribe(id_)
+
+
+order_feed = OrderFeed()
@@ -0,0 +1,713 @@
+from __future__ import annotations
+
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs
+
+from src.backtest import FillModel, SimOrder
+from src.brokerclient import ORDER_TYPES, PRODUCTS, order_row, position_row
+from src.constants import logging
+from src.trailing import TICK_SIZE
+
+# noren order type to the trigger it needs
+TRIGGERED = ("SL-LMT", "SL-MKT")
+# a market order is a limit this far through the touch
+MARKET_BAND = 0.2
+
+
+class MockBrokerError(ConnectionError):
+    pass
+
+
+def _stamp(now: float) -> str:
+    return time.strftime("%H:%M:%S %d-%m-%Y", time.localtime(now))
+
+
+class Latency:
+    """Fixed seconds, or (lo, hi) drawn uniformly per call."""
+
+    def __init__(
+        self, value: float | tuple[float, float] | list[float] = 0.0, seed: int = 0
+    ) -> None:
+        self.lo, self.hi = (value, value) if isinstance(value, int | float) else value
+        self._rng = random.Random(seed)
+
+    def sample(self) -> float:
+        return self.lo if self.lo == self.hi else self._rng.uniform(self.lo, self.hi)
+
+    def sleep(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Engine:
+    """
+    Price driven matching for the mock broker.
+
+    Orders rest until set_price moves through them; limit and SL-limit
+    fills use the backtest FillModel so the mock and the backtest agree on
+    where an order executes. Every state change is queued as a noren style
+    order update, every price as a quote, and a single dispatcher thread
+    hands them to the websocket callbacks in order, like the real feed.
+    """
+
+    def __init__(
+        self,
+        slippage: float = 0.0,
+        reject_rate: float = 0.0,
+        ws_latency: float | tuple[float, float] = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.fill_model = FillModel(slippage)
+        self.reject_rate = reject_rate
+        self.ws_latency = Latency(ws_latency, seed)
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(int(time.strftime("%y%m%d")) * 10**6 + 1)
+        self._tokens = itertools.count(40001)
+        self._lock = threading.RLock()
+        self.orders: dict[str, dict[str, Any]] = {}
+        self._sim: dict[str, SimOrder] = {}
+        self.symbols: dict[str, str] = {}  # tsym -> exch|token
+        self.keys: dict[str, str] = {}  # exch|token -> tsym
+        self.prices: dict[str, float] = {}  # exch|token -> ltp
+        self.ticks: dict[str, deque[tuple[float, float]]] = defaultdict(
+            lambda: deque(maxlen=20000)
+        )
+        self.subscribed: set[str] = set()
+        self.on_order: Callable[[dict[str, Any]], None] | None = None
+        self.on_quote: Callable[[dict[str, Any]], None] | None = None
+        self._events: queue.Queue[tuple[float, str, dict[str, Any]] | None] = (
+            queue.Queue()
+        )
+        self._dispatcher: threading.Thread | None = None
+
+    # instruments and prices
+
+    def listing(
+        self, symbol: str, exchange: str = "NFO", token: str | None = None
+    ) -> str:
+        with self._lock:
+            if symbol not in self.symbols:
+                key = f"{exchange}|{token or next(self._tokens)}"
+                self.symbols[symbol] = key
+                self.keys[key] = symbol
+            return self.symbols[symbol]
+
+    def key_of(self, symbol_or_key: str) -> str:
+        if "|" in symbol_or_key:
+            return symbol_or_key
+        return self.listing(symbol_or_key)
+
+    def set_price(
+        self, symbol_or_key: str, price: float, now: float | None = None
+    ) -> None:
+        now = time.time() if now is None else now
+        key = self.key_of(symbol_or_key)
+        with self._lock:
+            prev = self.prices.get(key)
+            self.prices[key] = price
+            self.ticks[key].append((now, price))
+            symbol = self.keys.get(key)
+            if symbol:
+                # only resting orders have a sim order, filled ones are skipped
+                for order_id in [
+                    i for i in self._sim if self.orders[i]["tsym"] == symbol
+                ]:
+                    self._match(order_id, price, prev)
+            if key in self.subscribed:
+                exchange, token = key.split("|", 1)
+                self._emit(
+                    "quote",
+                    {
+                        "t": "tf",
+                        "e": exchange,
+                        "tk": token,
+                        "lp": f"{price:.2f}",
+                        "ft": str(int(now)),
+                    },
+                )
+
+    # orders
+
+    def place(self, kwargs: dict[str, Any]) -> str:
+        order_type = str(kwargs.get("order_type", "LMT")).upper()
+        product = str(kwargs.get("product", "M")).upper()
+        side = "B" if str(kwargs.get("side", "B"))[:1].upper() == "B" else "S"
+        symbol = kwargs["symbol"]
+        exchange = kwargs.get("exchange", "NFO")
+        key = self.listing(symbol, exchange)
+        now = time.time()
+        with self._lock:
+            order_id = str(next(self._ids))
+            order = {
+                "stat": "Ok",
+                "norenordno": order_id,
+                "tsym": symbol,
+                "exch": exchange,
+                "token": key.split("|", 1)[1],
+                "trantype": side,
+                "prctyp": ORDER_TYPES.get(order_type, order_type),
+                "prd": PRODUCTS.get(product, product),
+                "qty": str(int(kwargs["quantity"])),
+                "fillshares": "0",
+                "prc": f"{float(kwargs.get('price') or 0):.2f}",
+                "trgprc": f"{float(kwargs.get('trigger_price') or 0):.2f}",
+                "avgprc": "0.00",
+                "status": "PENDING",
+                "remarks": kwargs.get("tag", ""),
+                "norentm": _stamp(now),
+                "rejreason": "",
+            }
+            self.orders[order_id] = order
+            if self.reject_rate and self._rng.random() < self.reject_rate:
+                self._update(order_id, "REJECTED", "Rejected", rejreason="mock reject")
+                return order_id
+            if order["prctyp"] in ("MKT", "SL-MKT") and key not in self.prices:
+                self._update(order_id, "REJECTED", "Rejected", rejreason="no price")
+                return order_id
+            self._sim[order_id] = self._sim_order(order)
+            status = "TRIGGER_PENDING" if order["prctyp"] in TRIGGERED else "OPEN"
+            self._update(order_id, status, "NewAck")
+            if key in self.prices:
+                self._match(order_id, self.prices[key], None)
+        return order_id
+
+    def _sim_order(self, order: dict[str, Any]) -> SimOrder:
+        side = "BUY" if order["trantype"] == "B" else "SELL"
+        price = float(order["prc"])
+        trigger = float(order["trgprc"]) if order["prctyp"] in TRIGGERED else 0.0
+        if order["prctyp"] in ("MKT", "SL-MKT"):
+            # executes through the touch at the trigger or current price
+            ref = trigger or self.prices[self.symbols[order["tsym"]]]
+            price = (
+                ref * (1 + MARKET_BAND) if side == "BUY" else ref * (1 - MARKET_BAND)
+            )
+        return SimOrder(side, price, trigger)
+
+    def modify(self, kwargs: dict[str, Any]) -> bool:
+        order_id = str(kwargs["order_id"])
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None or order["status"] not in ("OPEN", "TRIGGER_PENDING"):
+                return False
+            order_type = str(kwargs.get("order_type") or order["prctyp"]).upper()
+            order["prctyp"] = ORDER_TYPES.get(order_type, order_type)
+            if kwargs.get("quantity"):
+                order["qty"] = str(int(kwargs["quantity"]))
+            if kwargs.get("price") is not None:
+                order["prc"] = f"{float(kwargs['price']):.2f}"
+            if kwargs.get("trigger_price") is not None:
+                order["trgprc"] = f"{float(kwargs['trigger_price']):.2f}"
+            sim = self._sim_order(order)
+            # an already triggered stop stays triggered when it is moved
+            sim.triggered = sim.triggered or (
+                self._sim[order_id].triggered and order["prctyp"] in TRIGGERED
+            )
+            self._sim[order_id] = sim
+            status = "OPEN" if sim.triggered else "TRIGGER_PENDING"
+            self._update(order_id, status, "Replaced")
+            key = self.symbols[order["tsym"]]
+            if key in self.prices:
+                self._match(order_id, self.prices[key], None)
+        return True
+
+    def cancel(self, order_id: str) -> bool:
+        with self._lock:
+            order = self.orders.get(str(order_id))
+            if order is None or order["status"] not in ("OPEN", "TRIGGER_PENDING"):
+                return False
+            self._sim.pop(order["norenordno"], None)
+            self._update(order["norenordno"], "CANCELED", "Canceled")
+        return True
+
+    def _match(self, order_id: str, ltp: float, prev: float | None) -> None:
+        sim = self._sim.get(order_id)
+        if sim is None:
+            return
+        was_triggered = sim.triggered
+        fill = self.fill_model.match(sim, ltp, prev)
+        if sim.triggered and not was_triggered:
+            self._update(order_id, "OPEN", "TriggerHit")
+        if fill is None:
+            return
+        order = self.orders[order_id]
+        quantity = int(order["qty"])
+        fill = round(round(fill / TICK_SIZE) * TICK_SIZE, 2)
+        self._sim.pop(order_id, None)
+        self._update(
+            order_id,
+            "COMPLETE",
+            "Fill",
+            fillshares=str(quantity),
+            avgprc=f"{fill:.2f}",
+            flqty=str(quantity),
+            flprc=f"{fill:.2f}",
+        )
+
+    def _update(self, order_id: str, status: str, report: str, **fields: str) -> None:
+        order = self.orders[order_id]
+        order["status"] = status
+        order["norentm"] = _stamp(time.time())
+        order.update({k: v for k, v in fields.items() if k not in ("flqty", "flprc")})
+        self._emit("order", {"t": "om", **order, **fields, "reporttype": report})
+
+    # books
+
+    def order_book(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [dict(o) for o in reversed(self.orders.values())]
+
+    def position_book(self) -> list[dict[str, Any]]:
+        legs: dict[str, dict[str, float]] = {}
+        with self._lock:
+            for order in self.orders.values():
+                filled = int(order["fillshares"])
+                if not filled:
+                    continue
+                leg = legs.setdefault(
+                    order["tsym"],
+                    {
+                        "bq": 0,
+                        "bv": 0.0,
+                        "sq": 0,
+                        "sv": 0.0,
+                        "prd": order["prd"],
+                        "exch": order["exch"],
+                    },
+                )
+                value = filled * float(order["avgprc"])
+                if order["trantype"] == "B":
+                    leg["bq"] += filled
+                    leg["bv"] += value
+                else:
+                    leg["sq"] += filled
+                    leg["sv"] += value
+            rows = []
+            for symbol, leg in legs.items():
+                key = self.symbols[symbol]
+                bq, sq = leg["bq"], leg["sq"]
+                buy_avg = leg["bv"] / bq if bq else 0.0
+                sell_avg = leg["sv"] / sq if sq else 0.0
+                net = bq - sq
+                ltp = self.prices.get(key, buy_avg if net > 0 else sell_avg)
+                closed = min(bq, sq)
+                rpnl = closed * (sell_avg - buy_avg)
+                if net > 0:
+                    urmtom = net * (ltp - buy_avg)
+                elif net < 0:
+                    urmtom = -net * (sell_avg - ltp)
+                else:
+                    urmtom = 0.0
+                rows.append(
+                    {
+                        "stat": "Ok",
+                        "tsym": symbol,
+                        "exch": leg["exch"],
+                        "token": key.split("|", 1)[1],
+                        "prd": leg["prd"],
+                        "netqty": str(net),
+                        "daybuyqty": str(bq),
+                        "daysellqty": str(sq),
+                        "daybuyavgprc": f"{buy_avg:.2f}",
+                        "daysellavgprc": f"{sell_avg:.2f}",
+                        "lp": f"{ltp:.2f}",
+                        "rpnl": f"{rpnl:.2f}",
+                        "urmtom": f"{urmtom:.2f}",
+                    }
+                )
+            return rows
+
+    def time_price_series(
+        self, key: str, start: float | None, end: float | None, interval: int
+    ) -> list[dict[str, Any]]:
+        """Bars built from the recorded ticks, newest first like noren."""
+        seconds = max(int(interval), 1) * 60
+        bars: dict[int, list[float]] = {}
+        with self._lock:
+            ticks = list(self.ticks.get(key, ()))
+        for stamp, price in ticks:
+            if (start and stamp < start) or (end and stamp > end):
+                continue
+            bucket = int(stamp // seconds * seconds)
+            bar = bars.get(bucket)
+            if bar is None:
+                bars[bucket] = [price, price, price, price, 1]
+            else:
+                bar[1] = max(bar[1], price)
+                bar[2] = min(bar[2], price)
+                bar[3] = price
+                bar[4] += 1
+        return [
+            {
+                "stat": "Ok",
+                "time": time.strftime("%d-%m-%Y %H:%M:%S", time.localtime(bucket)),
+                "ssboe": str(bucket),
+                "into": f"{o:.2f}",
+                "inth": f"{h:.2f}",
+                "intl": f"{lo:.2f}",
+                "intc": f"{c:.2f}",
+                "intv": str(v),
+            }
+            for bucket, (o, h, lo, c, v) in sorted(bars.items(), reverse=True)
+        ]
+
+    # websocket
+
+    def _emit(self, kind: str, message: dict[str, Any]) -> None:
+        self._events.put((time.monotonic() + self.ws_latency.sample(), kind, message))
+
+    def start_feed(self) -> None:
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(
+                target=self._dispatch, name="mockbroker-ws", daemon=True
+            )
+            self._dispatcher.start()
+
+    def stop_feed(self) -> None:
+        if self._dispatcher is not None:
+            self._events.put(None)
+            self._dispatcher.join(2)
+            self._dispatcher = None
+
+    def _dispatch(self) -> None:
+        while True:
+            event = self._events.get()
+            try:
+                if event is None:
+                    return
+                due, kind, message = event
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                callback = self.on_order if kind == "order" else self.on_quote
+                if callback is not None:
+                    callback(message)
+            except Exception as e:
+                logging.error(f"{e} in mock broker {kind} callback")
+            finally:
+                self._events.task_done()
+
+    def drain(self, timeout: float = 2.0) -> None:
+        """Wait until every queued event was delivered, for tests."""
+        deadline = time.monotonic() + timeout
+        while self._events.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+
+class MockNoren:
+    """The NorenApi methods the app calls through session.broker."""
+
+    def __init__(self, owner: Mock) -> None:
+        self._owner = owner
+        self._engine = owner.engine
+
+    def start_websocket(
+        self,
+        order_update_callback: Callable[[dict[str, Any]], None] | None = None,
+        subscribe_callback: Callable[[dict[str, Any]], None] | None = None,
+        socket_open_callback: Callable[[], None] | None = None,
+        socket_close_callback: Callable[[], None] | None = None,
+        socket_error_callback: Callable[[Any], None] | None = None,
+    ) -> bool:
+        self._engine.on_order = order_update_callback
+        self._engine.on_quote = subscribe_callback
+        self._engine.start_feed()
+        if socket_open_callback is not None:
+            threading.Timer(self._owner.latency.sample(), socket_open_callback).start()
+        return True
+
+    def close_websocket(self) -> None:
+        self._engine.stop_feed()
+
+    def subscribe(self, instrument: str | list[str], feed_type: str = "t") -> None:
+        keys = [instrument] if isinstance(instrument, str) else instrument
+        engine = self._engine
+        with engine._lock:
+            for key in keys:
+                engine.subscribed.add(key)
+                if key in engine.prices:
+                    exchange, token = key.split("|", 1)
+                    engine._emit(
+                        "quote",
+                        {
+                            "t": "tk",
+                            "e": exchange,
+                            "tk": token,
+                            "lp": f"{engine.prices[key]:.2f}",
+                        },
+                    )
+
+    def unsubscribe(self, instrument: str | list[str], feed_type: str = "t") -> None:
+        keys = [instrument] if isinstance(instrument, str) else instrument
+        self._engine.subscribed.difference_update(keys)
+
+    def get_limits(self) -> dict[str, Any]:
+        self._owner._call()
+        return {"stat": "Ok", "cash": "0.00"}
+
+    def get_time_price_series(
+        self,
+        exchange: str,
+        token: str,
+        starttime: float | None = None,
+        endtime: float | None = None,
+        interval: int | None = None,
+    ) -> list[dict[str, Any]] | None:
+        self._owner._call()
+        rows = self._engine.time_price_series(
+            f"{exchange}|{token}", starttime, endtime, interval or 1
+        )
+        return rows or None
+
+
+class Mock:
+    """
+    In process stand in for a stock_brokers session, selected with
+    broker: mock in the credential file.
+
+    latency is seconds per REST call, fixed or (lo, hi); error_rate is the
+    chance a call raises MockBrokerError; reject_rate the chance an order
+    is accepted and then rejected; ws_latency delays every websocket event.
+    """
+
+    def __init__(
+        self,
+        latency: float | tuple[float, float] = 0.0,
+        error_rate: float = 0.0,
+        reject_rate: float = 0.0,
+        ws_latency: float | tuple[float, float] = 0.0,
+        slippage: float = 0.0,
+        prices: dict[str, float] | None = None,
+        seed: int = 0,
+        engine: Engine | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.engine = engine or Engine(slippage, reject_rate, ws_latency, seed)
+        self.latency = Latency(latency, seed)
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.authenticated = False
+        self.broker = MockNoren(self)
+        for symbol_or_key, price in (prices or {}).items():
+            self.engine.set_price(symbol_or_key, price)
+
+    def _call(self) -> None:
+        self.calls += 1
+        self.latency.sleep()
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            raise MockBrokerError("mock broker injected failure")
+
+    def authenticate(self) -> bool:
+        self._call()
+        self.authenticated = True
+        return True
+
+    def order_place(self, **kwargs: Any) -> str | None:
+        self._call()
+        return self.engine.place(kwargs)
+
+    def order_modify(self, **kwargs: Any) -> dict[str, Any]:
+        self._call()
+        if self.engine.modify(kwargs):
+            return {"stat": "Ok", "result": str(kwargs["order_id"])}
+        return {"stat": "Not_Ok", "emsg": "order not open"}
+
+    def order_cancel(self, order_id: str) -> dict[str, Any]:
+        self._call()
+        if self.engine.cancel(order_id):
+            return {"stat": "Ok", "result": str(order_id)}
+        return {"stat": "Not_Ok", "emsg": "order not open"}
+
+    @property
+    def orders(self) -> list[dict[str, Any]]:
+        self._call()
+        return [order_row(o) for o in self.engine.order_book()]
+
+    @property
+    def positions(self) -> list[dict[str, Any]]:
+        self._call()
+        return [position_row(p) for p in self.engine.position_book()]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Noren REST routes over the engine, for AsyncBroker and load tests."""
+
+    protocol_version = "HTTP/1.1"
+    server: MockServer
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        form = parse_qs(body.decode())
+        jdata = json.loads(form.get("jData", ["{}"])[0])
+        route = self.path.rstrip("/").rsplit("/", 1)[-1]
+        try:
+            payload = self.server.route(route, jdata)
+        except MockBrokerError as e:
+            self._reply(502, {"stat": "Not_Ok", "emsg": str(e)})
+            return
+        except (KeyError, ValueError) as e:
+            payload = {"stat": "Not_Ok", "emsg": f"bad request {e}"}
+        self._reply(200, payload)
+
+    def _reply(self, code: int, payload: Any) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, mock: Mock, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), MockHandler)
+        self.mock = mock
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/NorenWClientTP/"
+
+    def route(self, route: str, jdata: dict[str, Any]) -> Any:
+        mock, engine = self.mock, self.mock.engine
+        mock._call()
+        no_data = {"stat": "Not_Ok", "emsg": 'Error Occurred : 5 "no data"'}
+        if route == "PlaceOrder":
+            order_id = engine.place(
+                {
+                    "symbol": jdata["tsym"],
+                    "exchange": jdata.get("exch", "NFO"),
+                    "quantity": jdata["qty"],
+                    "side": jdata.get("trantype", "B"),
+                    "order_type": jdata.get("prctyp", "LMT"),
+                    "product": jdata.get("prd", "M"),
+                    "price": jdata.get("prc", 0),
+                    "trigger_price": jdata.get("trgprc", 0),
+                    "tag": jdata.get("remarks", ""),
+                }
+            )
+            return {"stat": "Ok", "norenordno": order_id}
+        if route == "ModifyOrder":
+            ok = engine.modify(
+                {
+                    "order_id": jdata["norenordno"],
+                    "order_type": jdata.get("prctyp"),
+                    "quantity": jdata.get("qty"),
+                    "price": jdata.get("prc"),
+                    "trigger_price": jdata.get("trgprc"),
+                }
+            )
+            return (
+                {"stat": "Ok", "result": jdata["norenordno"]}
+                if ok
+                else {"stat": "Not_Ok", "emsg": "order not open"}
+            )
+        if route == "CancelOrder":
+            ok = engine.cancel(jdata["norenordno"])
+            return (
+                {"stat": "Ok", "result": jdata["norenordno"]}
+                if ok
+                else {"stat": "Not_Ok", "emsg": "order not open"}
+            )
+        if route == "OrderBook":
+            return engine.order_book() or no_data
+        if route == "PositionBook":
+            return engine.position_book() or no_data
+        if route == "TPSeries":
+            key = f"{jdata['exch']}|{jdata['token']}"
+            st, et = jdata.get("st"), jdata.get("et")
+            rows = engine.time_price_series(
+                key,
+                float(st) if st else None,
+                float(et) if et else None,
+                int(jdata.get("intrv", 1)),
+            )
+            return rows or no_data
+        return {"stat": "Not_Ok", "emsg": f"unknown route {route}"}
+
+
+def serve(mock: Mock, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """Start the REST server on a daemon thread, shutdown() stops it."""
+    server = MockServer(mock, host, port)
+    threading.Thread(
+        target=server.serve_forever, name="mockbroker-http", daemon=True
+    ).start()
+    return server
+
+
+def random_walk(
+    mock: Mock,
+    prices: dict[str, float],
+    interval: float = 0.1,
+    step: float = 0.5,
+    stop: threading.Event | None = None,
+    seed: int = 0,
+) -> threading.Thread:
+    """Move every price by up to step points each interval until stop is set."""
+    rng = random.Random(seed)
+    stop = stop or threading.Event()
+    levels = dict(prices)
+
+    def run() -> None:
+        while not stop.wait(interval):
+            for key, price in levels.items():
+                moved = max(
+                    TICK_SIZE,
+                    round((price + rng.uniform(-step, step)) / TICK_SIZE) * TICK_SIZE,
+                )
+                levels[key] = round(moved, 2)
+                mock.engine.set_price(key, levels[key])
+
+    thread = threading.Thread(target=run, name="mockbroker-walk", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.constants import logging
+
+    parser = argparse.ArgumentParser(description="mock noren broker over localhost")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.0])
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--price",
+        action="append",
+        default=[],
+        help="SYMBOL=price, random walks while running",
+    )
+    args = parser.parse_args()
+
+    latency = args.latency[0] if len(args.latency) == 1 else tuple(args.latency[:2])
+    mock = Mock(
+        latency=latency, error_rate=args.error_rate, reject_rate=args.reject_rate
+    )
+    prices = {k: float(v) for k, v in (p.split("=", 1) for p in args.price)}
+    server = serve(mock, port=args.port)
+    if prices:
+        random_walk(mock, prices)
+    logging.info(f"mock broker on {server.url}, instruments {mock.engine.symbols}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import threading
+from os import path as ospath
+from typing import Any
+
+from src.constants import O_FUTL, logging
+
+
+def accepted(resp: Any) -> bool:
+    """Whether a broker order response says the request went through."""
+    return bool(resp) and not (
+        isinstance(resp, dict) and resp.get("stat", "Ok") != "Ok"
+    )
+
+
+class OrderTemplate:
+    """
+    Entry order of one symbol with everything but the prices resolved.
+
+    Built once when the session picks its symbols, so the buy endpoint
+    only copies a dict and sets price, trigger and order type.
+    """
+
+    __slots__ = ("_order", "_trade", "symbol")
+
+    def __init__(
+        self,
+        symbol: str,
+        exchange: str,
+        quantity: int,
+        product: str,
+        tag: str = "no_tag",
+    ) -> None:
+        self.symbol = symbol
+        self._order = {
+            "symbol": symbol,
+            "quantity": quantity,
+            "disclosed_quantity": 0,
+            "exchange": exchange,
+            "product": product,
+            "tag": tag,
+            "side": "BUY",
+        }
+        # what trade.json keeps of the entry, prices are added per trade
+        self._trade = {
+            k: v for k, v in self._order.items() if k not in ("side", "product")
+        }
+
+    @property
+    def quantity(self) -> int:
+        return self._order["quantity"]
+
+    def entry(
+        self,
+        price: float,
+        trigger_price: float = 0,
+        order_type: str = "LIMIT",
+        tag: str | None = None,
+    ) -> dict[str, Any]:
+        order = self._order.copy()
+        order["price"] = price
+        order["trigger_price"] = trigger_price
+        order["order_type"] = order_type
+        if tag:
+            order["tag"] = tag
+        return order
+
+    def trade(
+        self,
+        entry_id: str,
+        exit_price: float,
+        target_price: float,
+        tag: str | None = None,
+    ) -> dict[str, Any]:
+        trade = self._trade.copy()
+        trade["entry_id"] = entry_id
+        trade["exit_price"] = exit_price
+        trade["target_price"] = target_price
+        if tag:
+            trade["tag"] = tag
+        return trade
+
+
+def build_templates(
+    tokens_nearest: dict[str, str], settings: dict[str, Any], quantity: int
+) -> dict[str, OrderTemplate]:
+    exchange = settings.get("option_exchange", "NFO")
+    product = settings.get("product", "NRML")
+    return {
+        symbol: OrderTemplate(symbol, exchange, quantity, product)
+        for symbol in tokens_nearest.values()
+    }
+
+
+class FileWriter:
+    """
+    Writes json files on a background thread, newest content per path wins.
+
+    Readers go through read() so a write still in the queue is seen before
+    it reaches the disk.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[str, Any] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self.writes = 0
+
+    def write(self, path: str, content: Any) -> None:
+        with self._cond:
+            self._pending[path] = content
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="file-writer", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+
+    def read(self, path: str) -> Any:
+        with self._cond:
+            if path in self._pending:
+                return self._pending[path]
+        if not ospath.exists(path):
+            return None
+        return O_FUTL.read_file(path)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                path = next(iter(self._pending))
+                content = self._pending[path]
+            try:
+                O_FUTL.write_file(filepath=path, content=content)
+                self.writes += 1
+            except Exception as e:
+                logging.error(f"{e} while writing {path}")
+            with self._cond:
+                # a newer write for the path stays queued
+                if self._pending.get(path) is content:
+                    del self._pending[path]
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+
+file_writer = FileWriter()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from src.api import Helper
+from src.books import ACTIVE_BUCKETS, OrderBook, PositionBook, Summary
+from src.constants import logging
+from src.mockbroker import Engine
+from src.wserver import parse_order_update
+
+CLOSE_SLIPPAGE = 0.50  # same band as Helper.close_all_for_symbol
+
+
+class PaperEngine(Engine):
+    """Mock engine that hands order updates over in the calling thread."""
+
+    def _emit(self, kind: str, message: dict[str, Any]) -> None:
+        # quotes come from the live websocket, nothing to replay
+        if kind == "order" and self.on_order is not None:
+            self.on_order(message)
+
+
+class Paper:
+    """
+    Paper broker with the order and book surface of Helper.
+
+    Orders rest in an in-memory engine and fill against the live Wserver
+    ticks passed to on_tick. Every fill updates the paper's own order and
+    position books in that same call, so placing, modifying, reading books
+    and valuing p&l never touch the broker. Only history still comes from
+    Helper, it is market data and not account state.
+    """
+
+    def __init__(self, slippage: float = 0.0, reject_rate: float = 0.0) -> None:
+        self.engine = PaperEngine(slippage=slippage, reject_rate=reject_rate)
+        self.engine.on_order = self._on_engine_order
+        self._order_book = OrderBook()
+        self._position_book = PositionBook()
+        self._summary = Summary()
+        self.order_listeners: list[Callable[[dict[str, Any]], None]] = []
+
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any] | bool) -> Paper:
+        """paper: true, or a section with slippage and reject_rate."""
+        settings = settings if isinstance(settings, dict) else {}
+        return cls(
+            slippage=settings.get("slippage", 0.0),
+            reject_rate=settings.get("reject_rate", 0.0),
+        )
+
+    def watch(self, tokens: dict[str, str]) -> None:
+        """Trade the symbols of these websocket keys (exch|token -> symbol)."""
+        for key, symbol in tokens.items():
+            exchange, token = key.split("|", 1)
+            self.engine.listing(symbol, exchange, token)
+        self._position_book.watch(tokens)
+
+    def add_order_listener(self, listener: Callable[[dict[str, Any]], None]) -> None:
+        self.order_listeners.append(listener)
+
+    def _on_engine_order(self, message: dict[str, Any]) -> None:
+        update = parse_order_update(message)
+        record = self._order_book.apply_event(update)
+        if record is not None:
+            self._position_book.apply_fill(record, update)
+        for listener in self.order_listeners:
+            try:
+                listener(update)
+            except Exception as e:
+                logging.error(f"{e} in paper order listener {listener}")
+
+    def on_tick(
+        self, key: str, price: float, message: dict[str, Any] | None = None
+    ) -> None:
+        if key in self.engine.keys:
+            self.engine.set_price(key, price)
+        self._position_book.on_tick(key, price)
+
+    # orders
+
+    def one_side(self, bargs: dict[str, Any]) -> str | None:
+        try:
+            order_id = self.engine.place(bargs)
+            logging.debug(
+                f"[paper] {bargs.get('side')} {bargs.get('symbol')}: {order_id}"
+            )
+            return order_id
+        except Exception as e:
+            logging.error(f"paper error {e} while placing order {bargs}")
+            return None
+
+    def modify_order(self, kwargs: dict[str, Any]) -> Any | None:
+        if not next((v for v in kwargs.values() if v is not None), None):
+            return None
+        if self.engine.modify(kwargs):
+            return {"stat": "Ok", "result": str(kwargs["order_id"])}
+        return {"stat": "Not_Ok", "emsg": "order not open"}
+
+    def order_cancel(self, order_id: str) -> Any | None:
+        if self.engine.cancel(order_id):
+            return {"stat": "Ok", "result": str(order_id)}
+        return {"stat": "Not_Ok", "emsg": "order not open"}
+
+    def cancel_orders(
+        self,
+        symbol: str,
+        keep_order_id: str | None = None,
+        side: str | None = None,
+        confirm: float = 0.0,
+    ) -> dict[str, str]:
+        """Same contract as Helper.cancel_orders, settled before it returns."""
+        results: dict[str, str] = {}
+        for record in self._order_book.for_symbol(symbol, ACTIVE_BUCKETS):
+            if keep_order_id and record.order_id == keep_order_id:
+                continue
+            if side and record.side[:1] != side[:1].upper():
+                continue
+            self.order_cancel(record.order_id)
+            status = record.status
+            results[record.order_id] = (
+                "cancelled"
+                if status == "CANCELED"
+                else "filled"
+                if status == "COMPLETE"
+                else "failed"
+            )
+        return results
+
+    def close_all_for_symbol(self, symbol: str, ltp: float) -> None:
+        self.cancel_orders(symbol)
+        position = next(
+            (p for p in self._position_book.records() if p.symbol == symbol), None
+        )
+        if position is None or not position.quantity:
+            logging.info(f"[paper] no open position for {symbol}")
+            return
+        quantity = abs(position.quantity)
+        buy = position.quantity < 0
+        args = {
+            "symbol": symbol,
+            "quantity": quantity,
+            "disclosed_quantity": quantity,
+            "product": position.product or "M",
+            "side": "B" if buy else "S",
+            "order_type": "LMT",
+            "price": ltp + CLOSE_SLIPPAGE if buy else ltp - CLOSE_SLIPPAGE,
+            "trigger_price": 0,
+            "exchange": position.exchange or "NFO",
+            "tag": "closebuy" if buy else "closesell",
+        }
+        logging.info(
+            f"[paper] close {args['side']} {symbol} qty={quantity} @ {args['price']}"
+        )
+        self.one_side(args)
+
+    # books
+
+    def order_book(self) -> OrderBook:
+        return self._order_book
+
+    def position_book(self) -> PositionBook:
+        return self._position_book
+
+    def local_position_book(self) -> PositionBook:
+        return self._position_book
+
+    def orders(self) -> list[dict[str, Any]]:
+        return [r.to_dict() for r in self._order_book.records()]
+
+    def positions(self) -> list[dict[str, Any]]:
+        return [p.to_dict() for p in self._position_book.records()]
+
+    def historical(
+        self, exchange: str, token: str, interval: int = 1, start: float | None = None
+    ) -> list[dict[str, Any]]:
+        return Helper.historical(exchange, token, interval=interval, start=start)
+
+    def indicator(self, key: str, minutes: int, spec: dict[str, Any]) -> float | None:
+        return Helper.indicator(key, minutes, spec)
+
+    def reconcile_positions(self) -> dict[str, dict[str, float]]:
+        return {}
+
+    def can_enter(self) -> bool:
+        return True
+
+    def degraded(self) -> list[str]:
+        return []
+
+    def mtm(self) -> float:
+        return self._position_book.snapshot()["total"]
+
+    def order_summary(self):
+        book = self._order_book
+        return book.count(*ACTIVE_BUCKETS), len(book)
+
+    def position_summary(self):
+        positions = self.positions()
+        pnl = self._position_book.snapshot()
+        return positions, pnl["open"], pnl["unrealized"], pnl["realized"]
+
+    def summary_snapshot(self) -> Summary:
+        return self._summary.refresh(
+            self._order_book, self._position_book, degraded=[], paper=True
+        )
+
+    def summary(self) -> dict[str, Any]:
+        return self.summary_snapshot().data
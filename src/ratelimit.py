@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any
+
+# highest first, a waiter never overtakes one of a higher class
+PRIORITIES = ("exit", "entry", "book", "history")
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every broker call, drained in priority order.
+
+    Waiters queue by (priority, arrival). A waiter only takes a token when
+    there are more tokens than waiters ahead of it, so tokens that refill
+    while a stop modify is queued are held for it instead of going to the
+    UI. Threads and coroutines share one bucket.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 10, window: int = 500) -> None:
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._queue: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._granted = dict.fromkeys(PRIORITIES, 0)
+        self._timeouts = dict.fromkeys(PRIORITIES, 0)
+        self._waits: dict[str, deque[float]] = {
+            p: deque(maxlen=window) for p in PRIORITIES
+        }
+
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any]) -> RateLimiter:
+        return cls(rate=settings.get("rate", 10), burst=settings.get("burst", 10))
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _enqueue(self, priority: str) -> tuple[int, int]:
+        if priority not in PRIORITIES:
+            raise ValueError(
+                f"unknown priority {priority}, expected one of {PRIORITIES}"
+            )
+        entry = (PRIORITIES.index(priority), next(self._seq))
+        bisect.insort(self._queue, entry)
+        return entry
+
+    def _dequeue(self, entry: tuple[int, int]) -> None:
+        self._queue.pop(bisect.bisect_left(self._queue, entry))
+        self._cond.notify_all()
+
+    def _try(self, entry: tuple[int, int], now: float) -> float:
+        """0.0 when entry took a token, else seconds until it may."""
+        self._refill(now)
+        ahead = bisect.bisect_left(self._queue, entry)
+        if self._tokens >= ahead + 1:
+            self._tokens -= 1
+            self._dequeue(entry)
+            return 0.0
+        return max((ahead + 1 - self._tokens) / self.rate, 0.001)
+
+    def _granted_after(self, priority: str, started: float) -> bool:
+        self._granted[priority] += 1
+        self._waits[priority].append(time.monotonic() - started)
+        return True
+
+    def _timed_out(self, priority: str, entry: tuple[int, int]) -> bool:
+        self._dequeue(entry)
+        self._timeouts[priority] += 1
+        return False
+
+    def acquire(self, priority: str, timeout: float | None = None) -> bool:
+        started = time.monotonic()
+        with self._cond:
+            entry = self._enqueue(priority)
+            while True:
+                now = time.monotonic()
+                wait = self._try(entry, now)
+                if not wait:
+                    return self._granted_after(priority, started)
+                if timeout is not None:
+                    left = started + timeout - now
+                    if left <= 0:
+                        return self._timed_out(priority, entry)
+                    wait = min(wait, left)
+                self._cond.wait(wait)
+
+    async def acquire_async(self, priority: str, timeout: float | None = None) -> bool:
+        started = time.monotonic()
+        with self._cond:
+            entry = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    wait = self._try(entry, now)
+                    if not wait:
+                        return self._granted_after(priority, started)
+                    if timeout is not None:
+                        left = started + timeout - now
+                        if left <= 0:
+                            return self._timed_out(priority, entry)
+                        wait = min(wait, left)
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            with self._cond:
+                if entry in self._queue:
+                    self._dequeue(entry)
+            raise
+
+    def depth(self, priority: str | None = None) -> int:
+        if priority is None:
+            return len(self._queue)
+        index = PRIORITIES.index(priority)
+        return sum(1 for p, _ in self._queue if p == index)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            queues = {}
+            for priority in PRIORITIES:
+                waits = sorted(self._waits[priority])
+                count = len(waits)
+                queues[priority] = {
+                    "depth": self.depth(priority),
+                    "granted": self._granted[priority],
+                    "timeouts": self._timeouts[priority],
+                    "avg_wait_ms": round(sum(waits) / count * 1000, 1)
+                    if count
+                    else None,
+                    "p95_wait_ms": round(
+                        waits[min(count - 1, int(count * 0.95))] * 1000, 1
+                    )
+                    if count
+                    else None,
+                    "max_wait_ms": round(waits[-1] * 1000, 1) if count else None,
+                }
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "queues": queues,
+            }
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import time
+from typing import Any
+
+from src.constants import SESSION_JSON, logging
+
+
+def credentials(api: Any) -> dict[str, str] | None:
+    """Host, user and token of a logged in stock_brokers (noren) session."""
+    broker = getattr(api, "broker", api)
+    config = getattr(broker, "_NorenApi__service_config", {}) or {}
+    uid = getattr(broker, "_NorenApi__username", None)
+    token = getattr(broker, "_NorenApi__susertoken", None)
+    if not uid or not token:
+        return None
+    return {
+        "host": config.get("host", ""),
+        "uid": uid,
+        "actid": getattr(broker, "_NorenApi__accountid", None) or uid,
+        "token": token,
+    }
+
+
+def save(api: Any, broker_name: str, ttl: float, file: str = SESSION_JSON) -> bool:
+    """Write the token readable by the owner only, replacing the old file atomically."""
+    creds = credentials(api)
+    if creds is None:
+        return False
+    now = time.time()
+    content = {
+        "broker": broker_name,
+        "uid": creds["uid"],
+        "token": creds["token"],
+        "created_at": now,
+        "expires_at": now + ttl,
+    }
+    tmp = file + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(content, f)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, file)
+        return True
+    except OSError as e:
+        logging.error(f"{e} while saving session")
+        return False
+
+
+def load(broker_name: str, file: str = SESSION_JSON) -> dict[str, Any] | None:
+    try:
+        with open(file) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("broker") != broker_name or not saved.get("token"):
+        return None
+    if saved.get("expires_at", 0) <= time.time():
+        logging.info("saved session expired")
+        return None
+    return saved
+
+
+def created_at(broker_name: str, file: str = SESSION_JSON) -> float | None:
+    saved = load(broker_name, file)
+    return saved["created_at"] if saved else None
+
+
+def forget(file: str = SESSION_JSON) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(file)
+
+
+def validate(api: Any) -> bool:
+    """One cheap authenticated call, an expired token fails it."""
+    check = getattr(getattr(api, "broker", None), "get_limits", None)
+    if check is None:
+        return False
+    try:
+        resp = check()
+    except Exception as e:
+        logging.warning(f"{e} while validating session")
+        return False
+    return isinstance(resp, dict) and resp.get("stat") == "Ok"
+
+
+def restore(api: Any, broker_name: str, file: str = SESSION_JSON) -> bool:
+    """Put the saved token on a fresh broker object and check it still works."""
+    saved = load(broker_name, file)
+    if saved is None:
+        return False
+    broker = getattr(api, "broker", None)
+    if broker is None or not hasattr(broker, "set_session"):
+        return False
+    broker.set_session(saved["uid"], "", saved["token"])
+    if validate(api):
+        return True
+    logging.info("saved session rejected by broker, logging in again")
+    forget(file)
+    return False
@@ -11,7 +11,7 @@ if TYPE_CHECKING:
     from src.wserver import Wserver
 
 
-LOCK_FILE = Path(__file__).parent.parent / 'data' / 'app.pid'
+LOCK_FILE = Path(__file__).parent.parent / "data" / "app.pid"
 
 
 class LogicState:
@@ -20,22 +20,25 @@ class LogicState:
         self.started_at: datetime | None = None
         self.paused: bool = False
         self.pause_until: datetime | None = None
-        self.pause_reason: str = ''
-        
+        self.pause_reason: str = ""
+
         # Startup data - preserved across restarts
         self.startup_data: dict[str, Any] | None = None
-        
+
         # App data - runtime state, cleared on stop
         self.app_data: dict[str, Any] | None = None
-        
+
         # Runtime components
         self.ws: Wserver | None = None
         self.runner: TickRunner | None = None
         self.runner_task: Any = None
-        
+        self.reconcile_task: Any = None
+        self.helper: Any = None  # Paper broker when paper trading, else Helper is used
+
         # Token/symbol state
         self.tokens_nearest: dict[str, str] = {}
         self.quantity: int = 0
+        self.templates: dict[str, Any] = {}  # symbol -> OrderTemplate
 
     def is_running(self) -> bool:
         return self.running and not self.paused
@@ -46,7 +49,7 @@ class LogicState:
         if self.pause_until and datetime.now() > self.pause_until:
             self.paused = False
             self.pause_until = None
-            self.pause_reason = ''
+            self.pause_reason = ""
             return False
         return True
 
@@ -55,13 +58,16 @@ class LogicState:
         self.started_at = None
         self.paused = False
         self.pause_until = None
-        self.pause_reason = ''
+        self.pause_reason = ""
         self.app_data = None
         self.ws = None
         self.runner = None
         self.runner_task = None
+        self.reconcile_task = None
+        self.helper = None
         self.tokens_nearest = {}
         self.quantity = 0
+        self.templates = {}
 
 
 # Global singleton
@@ -69,4 +75,4 @@ _logic_state = LogicState()
 
 
 def get_logic_state() -> LogicState:
-    return _logic_state
\ No newline at end of file
+    return _logic_state
@@ -128,11 +128,24 @@ window.addEventListener("DOMContentLoaded", () => {
 		return result;
 	}
 
-	function setupChart(containerId, symbol, buttonIds, settings) {
+	// one binary socket shared by both charts and the orders, /sse/stream if it keeps failing
+	let market = null;
+	function marketSocket() {
+		if (!window.MarketSocket || !window.WebSocket) return null;
+		if (!market) {
+			market = new MarketSocket();
+			market.fallbacks = [];
+			market.onfail = () => market.fallbacks.forEach(start => start());
+		}
+		return market;
+	}
+
+	function setupChart(containerId, symbol, buttonIds, settings, initial) {
 		const chartContainer = document.getElementById(containerId);
 		if (!chartContainer) return;
 
 		const profit = settings?.profit || 5;
+		const timeframe = settings?.timeframe || 3;
 
 		const chart = LightweightCharts.createChart(chartContainer, chartOptions);
 		const candleSeries = chart.addCandlestickSeries(candlestickOptions);
@@ -200,8 +213,33 @@ window.addEventListener("DOMContentLoaded", () => {
 		// window.drawEntryLine(50, true);
 
 		let candleData = [];
+		// true once the server sends indicator columns, then nothing is recomputed here
+		let serverIndicators = false;
+
+		function setServerMAs(indicators) {
+			maSeries.forEach(({ series, config }) => {
+				const values = indicators[config.name];
+				if (!values) return;
+				// columns come newest first like the bars, candleData is oldest first
+				const n = candleData.length;
+				const data = [];
+				for (let i = 0; i < n; i++) {
+					const value = values[n - 1 - i];
+					if (value !== null && value !== undefined) data.push({ time: candleData[i].time, value });
+				}
+				series.setData(data);
+			});
+		}
+
+		function updateServerMAs(candle) {
+			maSeries.forEach(({ series, config }) => {
+				const value = candle.indicators[config.name];
+				if (value !== null && value !== undefined) series.update({ time: candle.time, value });
+			});
+		}
 
 		function updateMAs() {
+			if (serverIndicators) return;
 			maSeries.forEach(({ series, config }) => {
 				const period = config.period;
 				const priceField = config.price || 'close';
@@ -217,44 +255,74 @@ window.addEventListener("DOMContentLoaded", () => {
 			});
 		}
 
+		function showHistory(result) {
+			if (result.data && result.data.length > 0) {
+				candleData = result.data.reverse();
+				candleSeries.setData(candleData);
+				serverIndicators = !!result.indicators;
+				if (serverIndicators) setServerMAs(result.indicators);
+				updateMAs();
+			}
+		}
+
 		function loadHistorical() {
-			return fetch(`/api/historical/${symbol}`)
+			// the bootstrap already carries the history and the bar still forming
+			if (initial) {
+				showHistory(initial.history);
+				if (initial.live) onCandle(initial.live);
+				return Promise.resolve();
+			}
+			return fetch(`/api/historical/${symbol}?tf=${timeframe}`)
 				.then(r => r.json())
-				.then(result => {
-					if (result.data && result.data.length > 0) {
-						candleData = result.data.reverse();
-						candleSeries.setData(candleData);
-						updateMAs();
-					}
-				})
+				.then(showHistory)
 				.catch(e => console.error('Historical error:', e));
 		}
 
+		function onCandle(candle) {
+			// Initialize chart with first live candle if no historical data
+			if (candleData.length === 0) {
+				candleData = [candle];
+				candleSeries.setData(candleData);
+				return;
+			}
+
+			const lastCandle = candleData[candleData.length - 1];
+
+			if (candle.time === lastCandle.time) {
+				// the live bar may have started after the historical one
+				lastCandle.high = Math.max(lastCandle.high, candle.high);
+				lastCandle.low = Math.min(lastCandle.low, candle.low);
+				lastCandle.close = candle.close;
+				candleSeries.update(lastCandle);
+			} else if (candle.time > lastCandle.time) {
+				candleData.push(candle);
+				candleSeries.update(candle);
+				updateMAs();
+			}
+			if (serverIndicators && candle.indicators && candle.time >= lastCandle.time) {
+				updateServerMAs(candle);
+			}
+		}
+
+		function startEventSource() {
+			const stream = window.topicStream && window.topicStream();
+			if (!stream) {
+				const es = new EventSource(`/sse/candlesticks/${symbol}?tf=${timeframe}`);
+				es.addEventListener("live_update", (e) => onCandle(JSON.parse(e.data)));
+				return;
+			}
+			stream.on("candle", (msg) => { if (msg.symbol === symbol) onCandle(msg.candle); });
+			stream.add({ symbols: [symbol], tf: timeframe });
+		}
+
 		function startLiveUpdates() {
-			const es = new EventSource(`/sse/candlesticks/${symbol}`);
-			es.addEventListener("live_update", (e) => {
-				const candle = JSON.parse(e.data);
-				
-				// Initialize chart with first live candle if no historical data
-				if (candleData.length === 0) {
-					candleData = [candle];
-					candleSeries.setData(candleData);
-					return;
-				}
-				
-				const lastCandle = candleData[candleData.length - 1];
-				
-				if (candle.time === lastCandle.time) {
-					lastCandle.high = candle.high;
-					lastCandle.low = candle.low;
-					lastCandle.close = candle.close;
-					candleSeries.update(lastCandle);
-				} else if (candle.time > lastCandle.time) {
-					candleData.push(candle);
-					candleSeries.update(candle);
-					updateMAs();
-				}
-			});
+			const market = marketSocket();
+			if (!market) {
+				startEventSource();
+				return;
+			}
+			market.candles(symbol, timeframe, onCandle);
+			market.fallbacks.push(startEventSource);
 		}
 
 		loadHistorical().then(() => startLiveUpdates());
@@ -319,40 +387,69 @@ window.addEventListener("DOMContentLoaded", () => {
 		};
 	}
 
-	fetch("/api/chart/settings")
-		.then(r => r.json())
-		.then(settings => {
-			return fetch("/api/symbols").then(r => r.json()).then(symbols => ({ settings, symbols }));
+	// one round trip for settings, symbols and every chart, the old calls if it fails
+	function loadLegacy() {
+		return fetch("/api/chart/settings")
+			.then(r => r.json())
+			.then(settings => {
+				return fetch("/api/symbols").then(r => r.json()).then(symbols => ({ settings, symbols, charts: {} }));
+			});
+	}
+
+	fetch("/api/bootstrap")
+		.then(r => (r.ok ? r.json() : Promise.reject(new Error(`bootstrap ${r.status}`))))
+		.catch(e => {
+			console.error("Bootstrap error:", e);
+			return loadLegacy();
 		})
-.then(({ settings, symbols }) => {
+.then(({ settings, symbols, charts }) => {
 			if (!Array.isArray(symbols) || symbols.length < 2) return;
 
-			const orderSource = new EventSource("/sse/orders");
-			console.log("SSE /sse/orders connected");
-			orderSource.addEventListener("order_msg", (e) => {
-				console.log("SSE order_msg:", e.data);
-				try {
-					const msg = JSON.parse(e.data);
-					const status = msg.status || msg.ost || "";
-					const validStatuses = ["trigger_pending", "COMPLETE", "OPEN", "PENDING"];
-					if (!validStatuses.includes(status)) return;
-
-					const isBuy = msg.bs === "B";
-					const orderSymbol = msg.tsym;
-					const price = msg.price || msg.ltp;
-
-					console.log((isBuy ? "BUY" : "SELL") + " " + orderSymbol + " @ " + price);
-
-					// Draw entry line on matching chart
-					if (window.chartFunctions && window.chartFunctions[orderSymbol]) {
-						window.chartFunctions[orderSymbol](price, isBuy);
-					}
-				} catch (err) { console.error("Order msg parse error:", err); }
-			});
+			// raw broker messages on the SSE stream, parsed updates on the market socket
+			function onOrder(msg) {
+				const status = msg.status || msg.ost || "";
+				const validStatuses = ["TRIGGER_PENDING", "trigger_pending", "COMPLETE", "OPEN", "PENDING"];
+				if (!validStatuses.includes(status)) return;
+
+				const isBuy = (msg.side || msg.bs) === "B";
+				const orderSymbol = msg.symbol || msg.tsym;
+				const price = msg.price || msg.ltp;
+
+				console.log((isBuy ? "BUY" : "SELL") + " " + orderSymbol + " @ " + price);
+
+				// Draw entry line on matching chart
+				if (window.chartFunctions && window.chartFunctions[orderSymbol]) {
+					window.chartFunctions[orderSymbol](price, isBuy);
+				}
+			}
+
+			function startOrderSource() {
+				const stream = window.topicStream && window.topicStream();
+				if (stream) {
+					stream.on("order", (msg) => onOrder(msg.data));
+					stream.add({ topics: ["orders"] });
+					return;
+				}
+				const orderSource = new EventSource("/sse/orders");
+				console.log("SSE /sse/orders connected");
+				orderSource.addEventListener("order_msg", (e) => {
+					try {
+						onOrder(JSON.parse(e.data));
+					} catch (err) { console.error("Order msg parse error:", err); }
+				});
+			}
+
+			const market = marketSocket();
+			if (market) {
+				market.orders(onOrder);
+				market.fallbacks.push(startOrderSource);
+			} else {
+				startOrderSource();
+			}
 
 			document.getElementById("chart-title-CE").textContent = symbols[1];
-			setupChart("chart-CE", symbols[1], { high: "buy-btn-CE", mktbuy: "mkt-btn-CE", reset: "sell-btn-CE" }, settings);
+			setupChart("chart-CE", symbols[1], { high: "buy-btn-CE", mktbuy: "mkt-btn-CE", reset: "sell-btn-CE" }, settings, charts[symbols[1]]);
 			document.getElementById("chart-title-PE").textContent = symbols[0];
-			setupChart("chart-PE", symbols[0], { high: "buy-btn-PE", mktbuy: "mkt-btn-PE", reset: "sell-btn-PE" }, settings);
+			setupChart("chart-PE", symbols[0], { high: "buy-btn-PE", mktbuy: "mkt-btn-PE", reset: "sell-btn-PE" }, settings, charts[symbols[0]]);
 		});
 });
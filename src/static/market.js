@@ -0,0 +1,128 @@
+// One websocket for every chart: json text for control and orders, binary candle frames.
+// Frame layout (little endian) matches src/market.py:
+//   snapshot: u8 1, u16 channel, u32 time, i32 open/high/low/close in paise, u32 volume, indicators
+//   delta:    u8 2, u16 channel, u8 mask, then the masked fields in that order, indicators if bit 5
+//   indicators: u8 count, count x f32 in the order the subscribe ack named them
+(function () {
+	const SNAPSHOT = 1;
+	const DELTA = 2;
+	const INDICATORS = 0x20;
+	const FIELDS = ["open", "high", "low", "close", "volume"];
+
+	class MarketSocket {
+		constructor(url) {
+			this.url = url || `${location.protocol === "https:" ? "wss" : "ws"}://${location.host}/ws/market`;
+			this.requests = [];   // subscribe messages, replayed on reconnect
+			this.waiting = [];    // handlers waiting for their ack, in request order
+			this.channels = {};   // id -> { handler, names, bar }
+			this.orderHandlers = [];
+			this.failures = 0;
+			this.onfail = null;
+			this.connect();
+		}
+
+		connect() {
+			this.ws = new WebSocket(this.url);
+			this.ws.binaryType = "arraybuffer";
+			this.ws.onopen = () => {
+				this.failures = 0;
+				this.channels = {};
+				this.waiting = this.requests.map(r => r.handler);
+				this.requests.forEach(r => this.ws.send(JSON.stringify(r.message)));
+			};
+			this.ws.onmessage = (e) => {
+				if (typeof e.data === "string") this.onText(JSON.parse(e.data));
+				else this.onFrames(new DataView(e.data));
+			};
+			this.ws.onclose = () => {
+				this.failures += 1;
+				if (this.failures > 3 && this.onfail) {
+					this.onfail();
+					return;
+				}
+				setTimeout(() => this.connect(), 1000 * this.failures);
+			};
+		}
+
+		subscribe(message, handler) {
+			this.requests.push({ message, handler });
+			if (this.ws.readyState === WebSocket.OPEN) {
+				this.waiting.push(handler);
+				this.ws.send(JSON.stringify(message));
+			}
+		}
+
+		candles(symbol, tf, handler) {
+			this.subscribe({ op: "subscribe", channel: "candles", symbol, tf }, handler);
+		}
+
+		orders(handler) {
+			this.orderHandlers.push(handler);
+			if (this.orderHandlers.length === 1) this.subscribe({ op: "subscribe", channel: "orders" }, null);
+		}
+
+		onText(msg) {
+			if (msg.op === "subscribed") {
+				const handler = this.waiting.shift();
+				if (msg.channel === "candles") this.channels[msg.id] = { handler, names: msg.indicators || [], bar: null };
+			} else if (msg.op === "order") {
+				this.orderHandlers.forEach(h => h(msg.data));
+			} else if (msg.op === "error") {
+				console.error("market socket:", msg.message);
+				this.waiting.shift();
+			}
+		}
+
+		readIndicators(view, offset, channel, bar) {
+			const count = view.getUint8(offset);
+			offset += 1;
+			const indicators = {};
+			for (let i = 0; i < count; i++) {
+				const value = view.getFloat32(offset, true);
+				offset += 4;
+				indicators[channel.names[i]] = Number.isNaN(value) ? null : Math.round(value * 10000) / 10000;
+			}
+			bar.indicators = indicators;
+			return offset;
+		}
+
+		onFrames(view) {
+			let offset = 0;
+			while (offset < view.byteLength) {
+				const kind = view.getUint8(offset);
+				const channel = this.channels[view.getUint16(offset + 1, true)];
+				offset += 3;
+				let bar;
+				if (kind === SNAPSHOT) {
+					bar = {
+						time: view.getUint32(offset, true),
+						open: view.getInt32(offset + 4, true) / 100,
+						high: view.getInt32(offset + 8, true) / 100,
+						low: view.getInt32(offset + 12, true) / 100,
+						close: view.getInt32(offset + 16, true) / 100,
+						volume: view.getUint32(offset + 20, true),
+					};
+					offset = this.readIndicators(view, offset + 24, channel || { names: [] }, bar);
+				} else if (kind === DELTA) {
+					const mask = view.getUint8(offset);
+					offset += 1;
+					bar = Object.assign({}, channel && channel.bar);
+					FIELDS.forEach((field, bit) => {
+						if (!(mask & (1 << bit))) return;
+						bar[field] = field === "volume" ? view.getUint32(offset, true) : view.getInt32(offset, true) / 100;
+						offset += 4;
+					});
+					if (mask & INDICATORS) offset = this.readIndicators(view, offset, channel || { names: [] }, bar);
+				} else {
+					console.error("market socket: unknown frame", kind);
+					return;
+				}
+				if (!channel) continue;
+				channel.bar = bar;
+				if (channel.handler) channel.handler(Object.assign({}, bar));
+			}
+		}
+	}
+
+	window.MarketSocket = MarketSocket;
+})();
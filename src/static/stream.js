@@ -0,0 +1,60 @@
+// One /sse/stream per tab: every script adds its topics, the connection carries them all.
+// Events: candle {symbol, candle}, order {op, data}, summary, pnl and status.
+(function () {
+	class TopicStream {
+		constructor() {
+			this.symbols = new Set();
+			this.topics = new Set();
+			this.handlers = {};   // event -> [handler]
+			this.tf = null;
+			this.es = null;
+			this.pending = null;
+			this.onfail = null;
+			this.failures = 0;
+		}
+
+		on(event, handler) {
+			(this.handlers[event] = this.handlers[event] || []).push(handler);
+			if (this.es) this.es.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+		}
+
+		// topics added in the same tick share one (re)connect
+		add({ symbols = [], topics = [], tf = null }) {
+			symbols.forEach(s => this.symbols.add(s));
+			topics.forEach(t => this.topics.add(t));
+			if (tf) this.tf = tf;
+			if (!this.pending) this.pending = setTimeout(() => this.connect(), 0);
+		}
+
+		connect() {
+			this.pending = null;
+			if (this.es) this.es.close();
+			const params = new URLSearchParams({
+				symbols: [...this.symbols].join(","),
+				topics: [...this.topics].join(","),
+			});
+			if (this.tf) params.set("tf", this.tf);
+			const es = new EventSource(`/sse/stream?${params}`);
+			Object.entries(this.handlers).forEach(([event, handlers]) => {
+				handlers.forEach(h => es.addEventListener(event, (e) => h(JSON.parse(e.data))));
+			});
+			es.onopen = () => { this.failures = 0; };
+			es.onerror = () => {
+				this.failures += 1;
+				if (this.failures > 3 && this.onfail) {
+					es.close();
+					this.es = null;
+					this.onfail();
+				}
+			};
+			this.es = es;
+		}
+	}
+
+	let shared = null;
+	window.topicStream = function () {
+		if (!window.EventSource) return null;
+		if (!shared) shared = new TopicStream();
+		return shared;
+	};
+})();
@@ -1,63 +1,124 @@
-console.log('summary.js v11 - starting');
+console.log('summary.js v12 - starting');
 
 let cachedOrders = [];
 let cachedPositions = [];
 let cachedM2M = 0;
 let cachedRealized = 0;
 
+let summaryEtag = null;
+
 function doFetch() {
-    fetch('/api/summary')
-        .then(r => r.json())
+    const headers = summaryEtag ? { 'If-None-Match': summaryEtag } : {};
+    fetch('/api/summary', { headers, cache: 'no-store' })
+        .then(r => {
+            // unchanged since the last poll, nothing to redraw
+            if (r.status === 304) return null;
+            summaryEtag = r.headers.get('ETag');
+            return r.json();
+        })
         .then(data => {
-            localStorage.setItem('orders_cache', JSON.stringify(data.orders || []));
-            localStorage.setItem('positions_cache', JSON.stringify(data.positions || []));
-
-            cachedOrders = data.orders || [];
-            cachedPositions = data.positions || [];
-            cachedM2M = data.m2m || 0;
-            cachedRealized = data.realized_pnl || 0;
-
-            const posEl = document.getElementById('pos-count');
-            const ordEl = document.getElementById('order-count');
-            const m2mEl = document.getElementById('m2m');
-            const realEl = document.getElementById('realized');
-            const m2mElFooter = document.getElementById('m2m-footer');
-            const realElFooter = document.getElementById('realized-footer');
-
-            const orderCount = data.order_count || 0;
-            const positionCount = data.position_count || 0;
-            const activeOrders = data.active_orders || 0;
-
-            if (posEl) posEl.textContent = positionCount;
-            if (document.getElementById('pos-count-footer')) document.getElementById('pos-count-footer').textContent = positionCount;
-            if (ordEl) ordEl.textContent = activeOrders + ' / ' + orderCount;
-            if (document.getElementById('order-count-footer')) document.getElementById('order-count-footer').textContent = activeOrders + ' / ' + orderCount;
-            if (m2mEl) {
-                m2mEl.textContent = (data.m2m || 0).toFixed(2);
-                m2mEl.parentElement.classList.toggle('negative', data.m2m < 0);
-            }
-            if (m2mElFooter) {
-                m2mElFooter.textContent = (data.m2m || 0).toFixed(2);
-                document.getElementById('m2m-panel').classList.toggle('negative', data.m2m < 0);
-            }
-            if (realEl) {
-                realEl.textContent = (data.realized_pnl || 0).toFixed(2);
-                realEl.parentElement.classList.toggle('negative', data.realized_pnl < 0);
-            }
-            if (realElFooter) {
-                realElFooter.textContent = (data.realized_pnl || 0).toFixed(2);
-                document.getElementById('realized-panel').classList.toggle('negative', data.realized_pnl < 0);
-            }
+            if (data) showSummary(data);
         })
         .catch(e => console.error('summary API error:', e));
 }
 
+function showSummary(data) {
+    localStorage.setItem('orders_cache', JSON.stringify(data.orders || []));
+    localStorage.setItem('positions_cache', JSON.stringify(data.positions || []));
+
+    cachedOrders = data.orders || [];
+    cachedPositions = data.positions || [];
+    cachedM2M = data.m2m || 0;
+    cachedRealized = data.realized_pnl || 0;
+
+    const posEl = document.getElementById('pos-count');
+    const ordEl = document.getElementById('order-count');
+    const m2mEl = document.getElementById('m2m');
+    const realEl = document.getElementById('realized');
+    const m2mElFooter = document.getElementById('m2m-footer');
+    const realElFooter = document.getElementById('realized-footer');
+
+    const orderCount = data.order_count || 0;
+    const positionCount = data.position_count || 0;
+    const activeOrders = data.active_orders || 0;
+
+    if (posEl) posEl.textContent = positionCount;
+    if (document.getElementById('pos-count-footer')) document.getElementById('pos-count-footer').textContent = positionCount;
+    if (ordEl) ordEl.textContent = activeOrders + ' / ' + orderCount;
+    if (document.getElementById('order-count-footer')) document.getElementById('order-count-footer').textContent = activeOrders + ' / ' + orderCount;
+    if (m2mEl) {
+        m2mEl.textContent = (data.m2m || 0).toFixed(2);
+        m2mEl.parentElement.classList.toggle('negative', data.m2m < 0);
+    }
+    if (m2mElFooter) {
+        m2mElFooter.textContent = (data.m2m || 0).toFixed(2);
+        document.getElementById('m2m-panel').classList.toggle('negative', data.m2m < 0);
+    }
+    if (realEl) {
+        realEl.textContent = (data.realized_pnl || 0).toFixed(2);
+        realEl.parentElement.classList.toggle('negative', data.realized_pnl < 0);
+    }
+    if (realElFooter) {
+        realElFooter.textContent = (data.realized_pnl || 0).toFixed(2);
+        document.getElementById('realized-panel').classList.toggle('negative', data.realized_pnl < 0);
+    }
+    const degraded = data.degraded || [];
+    document.body.classList.toggle('degraded', degraded.length > 0);
+    document.body.title = degraded.length ? 'broker degraded: ' + degraded.join(', ') : '';
+}
+
 window.fetchSummaryCache = function() { doFetch(); };
 
+function showPnl(m2m, realized) {
+    [['m2m', 'm2m-footer', 'm2m-panel', m2m], ['realized', 'realized-footer', 'realized-panel', realized]].forEach(function(f) {
+        const el = document.getElementById(f[0]);
+        const footer = document.getElementById(f[1]);
+        if (el) {
+            el.textContent = f[3].toFixed(2);
+            el.parentElement.classList.toggle('negative', f[3] < 0);
+        }
+        if (footer) {
+            footer.textContent = f[3].toFixed(2);
+            document.getElementById(f[2]).classList.toggle('negative', f[3] < 0);
+        }
+    });
+}
+
+function showPnlUpdate(pnl) {
+    cachedM2M = pnl.unrealized;
+    cachedRealized = pnl.realized;
+    cachedPositions.forEach(function(p) {
+        const live = pnl.symbols[p.symbol];
+        if (live) {
+            p.last_price = live.ltp;
+            p.quantity = live.quantity;
+            p.rpnl = live.realized;
+            p.urmtom = live.unrealized;
+        }
+    });
+    showPnl(pnl.unrealized, pnl.realized);
+}
+
+function showStatus(status) {
+    document.body.classList.toggle('paused', status.paused);
+    document.body.classList.toggle('stopped', !status.running);
+    if (status.paused && status.pause_reason) document.body.title = 'paused: ' + status.pause_reason;
+}
+
+// summary, p&l and status pushed on the shared stream, the poll only if it fails
 window.addEventListener('DOMContentLoaded', function() {
-    console.log('summary.js v11 - page loaded, starting polls');
+    console.log('summary.js v12 - page loaded, starting stream');
     doFetch();
-    setInterval(doFetch, 5000);
+    const stream = window.topicStream && window.topicStream();
+    if (!stream) {
+        setInterval(doFetch, 5000);
+        return;
+    }
+    stream.on('summary', showSummary);
+    stream.on('pnl', showPnlUpdate);
+    stream.on('status', showStatus);
+    stream.onfail = function() { setInterval(doFetch, 5000); };
+    stream.add({ topics: ['summary', 'pnl', 'status'] });
 });
 
 function showPositionsModal() {
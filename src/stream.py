@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from src.candles import CandleHub
+from src.constants import logging
+from src.market import OrderFeed
+
+Deliver = Callable[[str, str], None]
+
+
+class Producer:
+    """
+    One topic read on behalf of every stream.
+
+    Polls read() only while somebody listens and publishes the payload
+    when its key changes, so a hundred tabs cost one read per interval.
+    A new listener gets the latest payload at once. Blocking reads, ones
+    that may reach the broker, run in a worker thread.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        read: Callable[[], tuple[Any, str]],
+        interval: float,
+        blocking: bool = False,
+    ) -> None:
+        self.name = name
+        self._read = read
+        self.interval = interval
+        self.blocking = blocking
+        self._subscribers: set[Deliver] = set()
+        self._task: asyncio.Task | None = None
+        self.key: Any = None
+        self.payload: str | None = None
+        self.reads = 0
+
+    def subscribe(self, deliver: Deliver) -> None:
+        self._subscribers.add(deliver)
+        if self.payload is not None:
+            deliver(self.name, self.payload)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def unsubscribe(self, deliver: Deliver) -> None:
+        self._subscribers.discard(deliver)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while self._subscribers:
+            try:
+                if self.blocking:
+                    key, payload = await asyncio.to_thread(self._read)
+                else:
+                    key, payload = self._read()
+                self.reads += 1
+                if key != self.key:
+                    self.key, self.payload = key, payload
+                    for deliver in list(self._subscribers):
+                        deliver(self.name, payload)
+            except Exception as e:
+                logging.error(f"{e} while producing {self.name}")
+            await asyncio.sleep(self.interval)
+
+
+class StreamSession:
+    """
+    Topics of one /sse/stream client behind a single wake up.
+
+    Candles come from the shared CandleHub, orders from the OrderFeed and
+    summary, pnl and status from shared Producers. Everything lands in
+    one inbox; a newer payload of the same topic replaces one the client
+    has not read yet, order updates are all kept.
+    """
+
+    def __init__(
+        self,
+        hub: CandleHub,
+        orders: OrderFeed,
+        producers: dict[str, Producer],
+        resolve: Callable[[str], str | None],
+    ) -> None:
+        self.hub = hub
+        self.orders = orders
+        self.producers = producers
+        self.resolve = resolve
+        self.topics: set[str] = set()
+        self._inbox: OrderedDict[Any, tuple[str, str]] = OrderedDict()
+        self._ready = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._candles: list[Any] = []
+        self._listening: list[Producer] = []
+        self._orders = itertools.count()
+        self.seq = 0  # hub ticks already in the first candles
+
+    def _put(self, key: Any, event: str, data: str) -> None:
+        self._inbox.pop(key, None)
+        self._inbox[key] = (event, data)
+        self._ready.set()
+
+    def _on_topic(self, name: str, payload: str) -> None:
+        self._put(name, name, payload)
+
+    def _on_order(self, payload: str) -> None:
+        self._put(("order", next(self._orders)), "order", payload)
+
+    def subscribe(self, symbols: list[str], topics: list[str], tf: int) -> list[str]:
+        """Returns what could not be subscribed."""
+        self.seq = self.hub.ticks
+        rejected = []
+        for symbol in filter(None, symbols):
+            key = self.resolve(symbol)
+            if key is None:
+                rejected.append(symbol)
+                continue
+            subscription = self.hub.subscribe(key, tf * 60)
+            self._candles.append(subscription)
+            self._tasks.append(asyncio.create_task(self._pump(symbol, subscription)))
+        for topic in filter(None, topics):
+            if topic == "orders":
+                self.orders.subscribe(self._on_order)
+            elif topic in self.producers:
+                self.producers[topic].subscribe(self._on_topic)
+                self._listening.append(self.producers[topic])
+            else:
+                rejected.append(topic)
+                continue
+            self.topics.add(topic)
+        return rejected
+
+    async def _pump(self, symbol: str, subscription: Any) -> None:
+        prefix = f'{{"symbol":"{symbol}","candle":'
+        while True:
+            for stamp, payload in await subscription.items():
+                # the hub serialized the bar once, only the envelope is added
+                self._put(("candle", symbol, stamp), "candle", prefix + payload + "}")
+
+    async def get(self) -> list[tuple[str, str]]:
+        await self._ready.wait()
+        self._ready.clear()
+        events = list(self._inbox.values())
+        self._inbox.clear()
+        return events
+
+    def end_candles(self) -> None:
+        """Stops the candle pumps, the other topics keep flowing."""
+        for task in self._tasks:
+            task.cancel()
+        for subscription in self._candles:
+            self.hub.unsubscribe(subscription)
+        self._tasks.clear()
+        self._candles.clear()
+
+    def close(self) -> None:
+        self.end_candles()
+        for producer in self._listening:
+            producer.unsubscribe(self._on_topic)
+        self.orders.unsubscribe(self._on_order)
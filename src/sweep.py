@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+import json
+import os
+import random
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from copy import deepcopy
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import Backtest, Bars
+
+# filled by the pool initializer, read only views of the memory mapped chain
+_CHAIN: dict[str, Bars] = {}
+
+
+def grid(spec: dict[str, list[Any]]) -> Iterator[dict[str, Any]]:
+    keys = list(spec)
+    for values in itertools.product(*(spec[k] for k in keys)):
+        yield dict(zip(keys, values, strict=True))
+
+
+def random_search(
+    spec: dict[str, Any], samples: int, seed: int = 0
+) -> Iterator[dict[str, Any]]:
+    """(lo, hi) tuples are sampled uniformly, ints stay ints, lists are choices."""
+    rng = random.Random(seed)
+    for _ in range(samples):
+        params: dict[str, Any] = {}
+        for key, value in spec.items():
+            if isinstance(value, tuple):
+                lo, hi = value
+                if isinstance(lo, int) and isinstance(hi, int):
+                    params[key] = rng.randint(lo, hi)
+                else:
+                    params[key] = round(rng.uniform(lo, hi), 2)
+            else:
+                params[key] = rng.choice(value)
+        yield params
+
+
+def apply_params(base: dict[str, Any], params: dict[str, Any]) -> dict[str, Any]:
+    """Dotted keys like trail.value reach into nested settings."""
+    settings = deepcopy(base)
+    for key, value in params.items():
+        node = settings
+        *parents, leaf = key.split(".")
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return settings
+
+
+def share_chain(chain: dict[str, Bars], directory: str) -> str:
+    """Write the chain once as .npy files the workers memory map."""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    index: dict[str, list[int]] = {}
+    start = 0
+    for symbol, bars in chain.items():
+        index[symbol] = [start, start + len(bars)]
+        start += len(bars)
+    bars_list = list(chain.values())
+    np.save(path / "time.npy", np.concatenate([b.time for b in bars_list]))
+    np.save(
+        path / "ohlcv.npy",
+        np.concatenate(
+            [
+                np.column_stack((b.open, b.high, b.low, b.close, b.volume))
+                for b in bars_list
+            ]
+        ),
+    )
+    (path / "index.json").write_text(json.dumps(index))
+    return str(path)
+
+
+def load_shared(directory: str) -> dict[str, Bars]:
+    path = Path(directory)
+    times = np.load(path / "time.npy", mmap_mode="r")
+    ohlcv = np.load(path / "ohlcv.npy", mmap_mode="r")
+    index = json.loads((path / "index.json").read_text())
+    chain: dict[str, Bars] = {}
+    for symbol, (start, stop) in index.items():
+        rows = ohlcv[start:stop]
+        chain[symbol] = Bars(
+            symbol,
+            times[start:stop],
+            rows[:, 0],
+            rows[:, 1],
+            rows[:, 2],
+            rows[:, 3],
+            rows[:, 4],
+        )
+    return chain
+
+
+def _init_worker(directory: str) -> None:
+    global _CHAIN
+    _CHAIN = load_shared(directory)
+
+
+def _run_batch(
+    base: dict[str, Any], batch: list[dict[str, Any]]
+) -> list[tuple[dict[str, Any], dict[str, Any]]]:
+    return [
+        (params, Backtest(_CHAIN, apply_params(base, params)).run().summary())
+        for params in batch
+    ]
+
+
+class Leaderboard:
+    """Results kept ranked as they stream in, best first."""
+
+    def __init__(self, rank_by: str = "pnl") -> None:
+        self.rank_by = rank_by
+        self._keys: list[float] = []
+        self.rows: list[dict[str, Any]] = []
+
+    def add(self, params: dict[str, Any], summary: dict[str, Any]) -> int:
+        row = {**params, **summary}
+        key = -float(row[self.rank_by])
+        pos = bisect.bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self.rows.insert(pos, row)
+        return pos
+
+    def top(self, n: int = 10) -> list[dict[str, Any]]:
+        return self.rows[:n]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows)
+
+
+def sweep(
+    directory: str,
+    base: dict[str, Any],
+    params: Iterable[dict[str, Any]],
+    workers: int | None = None,
+    batch_size: int = 4,
+    rank_by: str = "pnl",
+) -> Iterator[tuple[Leaderboard, dict[str, Any]]]:
+    """
+    Fan backtests out over a process pool, yields the leaderboard and the
+    row just added as each batch finishes. directory comes from share_chain.
+    """
+    workers = workers or os.cpu_count() or 1
+    board = Leaderboard(rank_by)
+    params = iter(params)
+    batches = iter(lambda: list(itertools.islice(params, batch_size)), [])
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(directory,)
+    ) as pool:
+        # keep a couple of batches queued per worker, not the whole grid
+        pending = {
+            pool.submit(_run_batch, base, batch)
+            for batch in itertools.islice(batches, workers * 2)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for row_params, summary in future.result():
+                    board.add(row_params, summary)
+                    yield board, {**row_params, **summary}
+                batch = next(batches, None)
+                if batch:
+                    pending.add(pool.submit(_run_batch, base, batch))
+
+
+def _parse_values(text: str) -> list[Any]:
+    values: list[Any] = []
+    for item in text.split(","):
+        try:
+            values.append(int(item))
+        except ValueError:
+            try:
+                values.append(float(item))
+            except ValueError:
+                values.append(item)
+    return values
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import time
+
+    from src.backtest import load_chain
+    from src.constants import logging
+
+    parser = argparse.ArgumentParser(description="parameter sweep over backtests")
+    parser.add_argument("csvfile")
+    parser.add_argument(
+        "params",
+        nargs="+",
+        help="key=v1,v2,... for example profit=1,2,3 trail.value=3,5",
+    )
+    parser.add_argument("--random", type=int, default=0, help="samples instead of grid")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rank-by", default="pnl")
+    parser.add_argument("--lot-size", type=int, default=75)
+    args = parser.parse_args()
+
+    spec = {k: _parse_values(v) for k, v in (p.split("=", 1) for p in args.params)}
+    if args.random:
+        spec = {
+            k: (min(v), max(v)) if len(v) == 2 and not isinstance(v[0], str) else v
+            for k, v in spec.items()
+        }
+        combos = random_search(spec, args.random)
+    else:
+        combos = grid(spec)
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir="./data") as tmp:
+        share_chain(load_chain(args.csvfile), tmp)
+        board = Leaderboard(args.rank_by)
+        for board, row in sweep(
+            tmp, {"lot_size": args.lot_size}, combos, args.workers, rank_by=args.rank_by
+        ):
+            logging.info(f"{len(board.rows)} done, last {row}")
+    logging.info(f"\n{board.to_frame().head(20).to_string()}")
+    logging.info(f"{len(board.rows)} backtests in {time.perf_counter() - started:.2f}s")
@@ -58,7 +58,13 @@ class Symbol:
     None
     """
 
-    def __init__(self, exchange: str, base: str | None = None, symbol: str | None = None, expiry: str | None = None) -> None:
+    def __init__(
+        self,
+        exchange: str,
+        base: str | None = None,
+        symbol: str | None = None,
+        expiry: str | None = None,
+    ) -> None:
         self._exchange = exchange
         self._base = base
         self._symbol = symbol
@@ -171,15 +177,13 @@ class Symbol:
             symbol_differences: dict[str, float] = {}
 
             for symbol, ltp in call_or_put_begins_with.items():
-                logging.debug(f"Symbol:{symbol} difference {ltp} - {premium}")
                 difference = abs(float(ltp) - premium)
                 symbol_differences[symbol] = difference
 
-            logging.debug(symbol_differences)
+            # one line for every candidate instead of one per symbol
+            logging.debug("closest to premium %s: %s", premium, symbol_differences)
             # Find the symbol with the lowest difference
-            return min(
-                symbol_differences, key=symbol_differences.get, default=None
-            )
+            return min(symbol_differences, key=symbol_differences.get, default=None)
         except Exception as e:
             logging.error(f"{e} Symbol: find closest premium")
             print_exc()
@@ -209,7 +213,9 @@ class Symbol:
             logging.error(f"{e} Symbol: while find_option_by_distance")
             print_exc()
 
-    def find_wstoken_from_tradingsymbol(self, tradingsymbols: list[str]) -> dict[str, str]:
+    def find_wstoken_from_tradingsymbol(
+        self, tradingsymbols: list[str]
+    ) -> dict[str, str]:
         df = pd.read_csv(self.csvfile)
         filtered_df = df[(df["TradingSymbol"]).isin(tradingsymbols)]
         tokens_found = filtered_df.assign(
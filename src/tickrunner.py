@@ -1,27 +1,30 @@
 from __future__ import annotations
 
 import asyncio
-from os import path
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 from src.api import Helper
-from src.constants import O_FUTL, TRADE_JSON, logging
+from src.asynclog import DEBUG
+from src.bracket import Bracket, BracketManager, brackets
+from src.constants import TRADE_JSON, logging
+from src.orders import accepted, file_writer
+from src.trailing import ATR_PERIOD, TICK_SIZE, TrailingStop, atr_from_bars
 from src.wserver import Wserver
 
+STATUS_LOG_EVERY = 5.0  # seconds between status lines of the 500 ms loop
 
-def get_dict_from_list(order_id: str) -> dict[str, Any]:
+
+def get_dict_from_list(order_id: str, helper: Any = Helper) -> Any:
     try:
-        orders = Helper.orders()
-        if orders:
-            for item in orders:
-                if item["order_id"] == order_id:
-                    logging.debug(
-                        f"[get_dict] FOUND order_id={order_id}, status={item.get('status')}"
-                    )
-                    return item
-            logging.debug(f"[get_dict] order_id={order_id} NOT in order book")
-        else:
-            logging.warning(f"orders is {orders}")
+        item = helper.order_book().get(order_id)
+        if item:
+            logging.debug(
+                "[get_dict] FOUND order_id=%s, status=%s", order_id, item.get("status")
+            )
+            return item
+        logging.debug("[get_dict] order_id=%s NOT in order book", order_id)
         return {}
     except Exception as e:
         logging.error(f"{e} in get_dict_from_list")
@@ -29,9 +32,32 @@ def get_dict_from_list(order_id: str) -> dict[str, Any]:
 
 
 class TickRunner:
-    def __init__(self, ws: Wserver, tokens_nearest: dict[str, str]) -> None:
+    def __init__(
+        self,
+        ws: Wserver,
+        tokens_nearest: dict[str, str],
+        trail: dict[str, Any] | None = None,
+        bracket: bool = False,
+        helper: Any = Helper,
+        bracket_manager: BracketManager = brackets,
+        trade_file: str = TRADE_JSON,
+    ) -> None:
+        # Helper trades live, a Paper broker with its own books trades on paper
+        self.helper = helper
+        self.brackets = bracket_manager
+        self.trade_file = trade_file
         self.ws = ws
         self.tokens_nearest = tokens_nearest
+        self.use_bracket = bracket
+        self.bracket: Bracket | None = None
+        self.target_id: str = ""
+        self.trail_settings: dict[str, Any] = trail or {}
+        self.trail: TrailingStop | None = None
+        self._trail_key: str = ""
+        self._trail_pending: bool = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # broker calls of the runner wait on the rate limiter, never on the loop
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="runner")
         self.fn: str = "create"
         self.ltps: dict[str, float] = {}
         self.symbol: str = ""
@@ -43,45 +69,87 @@ class TickRunner:
         self.exit_price: float | None = None
         self.target_price: float | None = None
         self._load_trade_from_file()
+        self.ws.add_tick_listener(self.on_tick)
 
     def _load_trade_from_file(self) -> None:
         try:
-            if path.exists(TRADE_JSON):
-                data = O_FUTL.read_file(TRADE_JSON)
-                if data and data.get("entry_id"):
-                    self.entry_id = data.get("entry_id", "")
-                    self.symbol = data.get("symbol", "")
-                    self.quantity = data.get("quantity", 0)
-                    self.exchange = data.get("exchange", "")
-                    self.tag = data.get("tag", "")
-                    self.exit_price = data.get("exit_price")
-                    self.target_price = data.get("target_price")
-                    if self.entry_id:
-                        self.fn = "is_trade"
-                        logging.info(
-                            f"Loaded trade: entry_id={self.entry_id}, symbol={self.symbol}"
-                        )
+            data = file_writer.read(self.trade_file)
+            if data and data.get("entry_id"):
+                self.entry_id = data.get("entry_id", "")
+                self.symbol = data.get("symbol", "")
+                self.quantity = data.get("quantity", 0)
+                self.exchange = data.get("exchange", "")
+                self.tag = data.get("tag", "")
+                self.exit_price = data.get("exit_price")
+                self.target_price = data.get("target_price")
+                if self.entry_id:
+                    self.fn = "is_trade"
+                    logging.info(
+                        f"Loaded trade: entry_id={self.entry_id}, symbol={self.symbol}"
+                    )
         except Exception as e:
             logging.error(f"{e} _load_trade_from_file")
 
+    def can_adopt(self) -> bool:
+        """Only a runner without a trade may take a new entry."""
+        return self.fn == "create"
+
+    def adopt(self, trade: dict[str, Any]) -> bool:
+        """
+        Take over an entry placed by the buy endpoint, persisted in the
+        background. Refused while a trade is managed, its exit would be
+        orphaned.
+        """
+        if not self.can_adopt():
+            logging.warning(
+                f"Not adopting {trade['entry_id']}, {self.fn} on {self.entry_id}"
+            )
+            return False
+        self.entry_id = trade["entry_id"]
+        self.symbol = trade.get("symbol", "")
+        self.quantity = trade.get("quantity", 0)
+        self.exchange = trade.get("exchange", "")
+        self.tag = trade.get("tag", "")
+        self.exit_price = trade.get("exit_price")
+        self.target_price = trade.get("target_price")
+        self.exit_id = ""
+        self.target_id = ""
+        self.trail = None
+        self.bracket = None
+        self._trail_key = ""
+        self.fn = "is_trade"
+        file_writer.write(self.trade_file, trade)
+        return True
+
+    async def adopt_async(self, trade: dict[str, Any]) -> bool:
+        """adopt() in turn with the steps, a create step never sees it half done."""
+        if self._loop is None:
+            return self.adopt(trade)
+        return await self._loop.run_in_executor(self._worker, self.adopt, trade)
+
     def create(self) -> None:
         try:
             self._load_trade_from_file()
             if not self.entry_id:
-                O_FUTL.write_file(TRADE_JSON, {"entry_id": ""})
+                file_writer.write(self.trade_file, {"entry_id": ""})
                 self.fn = "create"
         except Exception as e:
             logging.error(f"{e} while create")
 
     def is_trade(self) -> None:
         try:
-            item = get_dict_from_list(self.entry_id)
-            if item and item.get("status", None) == "COMPLETE":
+            item = get_dict_from_list(self.entry_id, self.helper)
+            if item and item.get("status", None) == "COMPLETE" and self.use_bracket:
+                self._open_bracket(item)
+            elif item and item.get("status", None) == "COMPLETE":
                 logging.info(
                     f"Entry COMPLETE: {self.entry_id}, placing exit at {self.exit_price}"
                 )
                 logging.debug(
-                    f"[tickrunner] >>> EXIT ORDER: symbol={self.symbol}, side=SELL, order_type=SL, price={self.exit_price}, trigger={self.exit_price + 0.05}"
+                    "[tickrunner] >>> EXIT ORDER: symbol=%s, side=SELL, order_type=SL, price=%s, trigger=%s",
+                    self.symbol,
+                    self.exit_price,
+                    self.exit_price + 0.05,
                 )
                 args = {
                     "symbol": self.symbol,
@@ -94,23 +162,12 @@ class TickRunner:
                     "trigger_price": self.exit_price + 0.05,
                     "tag": self.tag,
                 }
-                exit_id = Helper.one_side(args)
+                exit_id = self.helper.one_side(args)
                 if exit_id:
                     self.exit_id = exit_id
                     logging.info(f"Exit order placed: {exit_id} for {self.symbol}")
-                    O_FUTL.write_file(
-                        TRADE_JSON,
-                        {
-                            "entry_id": self.entry_id,
-                            "exit_id": self.exit_id,
-                            "symbol": self.symbol,
-                            "quantity": self.quantity,
-                            "exchange": self.exchange,
-                            "tag": self.tag,
-                            "exit_price": self.exit_price,
-                            "target_price": self.target_price,
-                        },
-                    )
+                    self._save_trade()
+                    self._start_trail(item)
                     self.fn = "exit_trade"
             elif item and item.get("status", None) in ["REJECTED", "CANCELED"]:
                 logging.info(f"Entry {item.get('status')}: {self.entry_id}, clearing")
@@ -123,34 +180,107 @@ class TickRunner:
         except Exception as e:
             logging.error(f"{e} while is_trade")
 
+    def _open_bracket(self, entry: dict[str, Any]) -> None:
+        logging.info(
+            f"Entry COMPLETE: {self.entry_id}, placing bracket target:{self.target_price} stop:{self.exit_price}"
+        )
+        bracket = self.brackets.open(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            quantity=self.quantity,
+            tag=self.tag,
+            target_price=self.target_price,
+            stop_price=self.exit_price,
+        )
+        if bracket:
+            self.bracket = bracket
+            self.exit_id = bracket.stop.order_id
+            self.target_id = bracket.target.order_id
+            self._save_trade()
+            self._start_trail(entry)
+            self.fn = "exit_trade"
+
+    def _exit_bracket(self) -> None:
+        bracket = self.bracket
+        # order book poll backs up the websocket events that drive the bracket
+        book = self.helper.order_book()
+        for leg in (bracket.target, bracket.stop):
+            item = book.get(leg.order_id)
+            if item and item.status != leg.status:
+                self.brackets.on_order_update(
+                    {
+                        "order_id": leg.order_id,
+                        "status": item.status,
+                        "filled_quantity": item.filled_quantity,
+                    }
+                )
+        if bracket.done:
+            logging.info(
+                f"Bracket closed by {bracket.closed_by or 'cancel'} for {self.symbol}, clearing"
+            )
+            self.fn = "create"
+            file_writer.write(self.trade_file, {"entry_id": ""})
+            self.entry_id = ""
+            self.exit_id = ""
+            self.target_id = ""
+            self.bracket = None
+            self.trail = None
+        else:
+            logging.debug(
+                "Bracket OPEN target:%s stop:%s",
+                bracket.target.status,
+                bracket.stop.status,
+            )
+
     def exit_trade(self) -> None:
+        if self.bracket and self.target_id:
+            try:
+                self._exit_bracket()
+            except Exception as e:
+                logging.error(f"{e} exit_trade bracket")
+            return
         try:
-            item = get_dict_from_list(self.exit_id)
+            item = get_dict_from_list(self.exit_id, self.helper)
             order_status = item.get("status", "NOT FOUND") if item else "NO ORDER"
-            logging.info(f"EXIT CHECK: order_id={self.exit_id}, status={order_status}")
+            logging.info(
+                "EXIT CHECK: order_id=%s, status=%s",
+                self.exit_id,
+                order_status,
+                every=STATUS_LOG_EVERY,
+            )
             if item and item.get("status", None) in [
                 "COMPLETE",
                 "REJECTED",
                 "CANCELED",
             ]:
                 logging.info(f"Exit {item.get('status')}: {self.exit_id}, clearing")
+                self.trail = None
                 self.fn = "create"
-                O_FUTL.write_file(TRADE_JSON, {"entry_id": ""})
+                file_writer.write(self.trade_file, {"entry_id": ""})
                 self.entry_id = ""
                 self.exit_id = ""
             elif item and item.get("status", None) in ["OPEN", "TRIGGER_PENDING"]:
                 ltp = self.ltps.get(self.symbol)
-                ws_ltp_keys = list(self.ws.ltp.keys())
-                logging.info(
-                    f"exit_trade: symbol={self.symbol} in tokens_nearest={self.symbol in self.tokens_nearest} in ltps={self.symbol in self.ltps}, ws_ltp_keys={ws_ltp_keys[:3]}..., ltp={ltp}"
-                )
+                if logging.enabled(DEBUG):
+                    # the websocket thread keeps changing ltp, copy its keys here
+                    logging.debug(
+                        "exit_trade: symbol=%s in ltps=%s, ws_ltp_keys=%s..., ltp=%s",
+                        self.symbol,
+                        self.symbol in self.ltps,
+                        list(self.ws.ltp)[:3],
+                        ltp,
+                    )
                 if ltp and (ltp > self.target_price or ltp < self.exit_price):
                     sell_price = ltp - 0.5
                     logging.info(
                         f"Target reached for {self.exit_id}, modifying to LMT @ {sell_price}"
                     )
                     logging.debug(
-                        f"[tickrunner] >>> MODIFY: order_id={self.exit_id}, symbol={self.symbol}, quantity={self.quantity}, order_type=LMT, price={sell_price}, trigger_price=0"
+                        "[tickrunner] >>> MODIFY: order_id=%s, symbol=%s, quantity=%s, order_type=LMT, price=%s, trigger_price=0",
+                        self.exit_id,
+                        self.symbol,
+                        self.quantity,
+                        sell_price,
                     )
                     kwargs = {
                         "symbol": self.symbol,
@@ -161,17 +291,122 @@ class TickRunner:
                         "price": sell_price,
                         "trigger_price": 0,
                     }
-                    Helper.modify_order(kwargs)
-                    Helper.close_all_for_symbol(symbol=self.symbol, ltp=ltp)
+                    self.trail = None
+                    self.helper.modify_order(kwargs)
+                    self.helper.close_all_for_symbol(symbol=self.symbol, ltp=ltp)
                     self.fn = "create"
-                    O_FUTL.write_file(TRADE_JSON, {"entry_id": ""})
+                    file_writer.write(self.trade_file, {"entry_id": ""})
                 else:
                     logging.info(
-                        f"Exit OPEN at target:{self.target_price} stop:{self.exit_price}, ltp:{ltp}"
+                        "Exit OPEN at target:%s stop:%s, ltp:%s",
+                        self.target_price,
+                        self.exit_price,
+                        ltp,
+                        every=STATUS_LOG_EVERY,
                     )
         except Exception as e:
             logging.error(f"{e} exit_trade")
 
+    def _save_trade(self) -> None:
+        file_writer.write(
+            self.trade_file,
+            {
+                "entry_id": self.entry_id,
+                "exit_id": self.exit_id,
+                "target_id": self.target_id,
+                "symbol": self.symbol,
+                "quantity": self.quantity,
+                "exchange": self.exchange,
+                "tag": self.tag,
+                "exit_price": self.exit_price,
+                "target_price": self.target_price,
+            },
+        )
+
+    def _atr_source(self, key: str) -> Callable[[], float | None]:
+        """Live ATR from the candle engine, a one off from history for other intervals."""
+        interval = self.trail_settings.get("interval", 3)
+        spec = {"type": "atr", "period": self.trail_settings.get("period", ATR_PERIOD)}
+        try:
+            self.helper.indicator(key, interval, spec)
+            return lambda: self.helper.indicator(key, interval, spec)
+        except ValueError:
+            exchange, token = key.split("|")
+            bars = self.helper.historical(exchange, token, interval=interval)
+            atr_value = atr_from_bars(bars, spec["period"])
+            return lambda: atr_value
+
+    def _start_trail(self, entry: dict[str, Any]) -> None:
+        if not self.trail_settings.get("mode"):
+            return
+        try:
+            self._trail_key = next(
+                (k for k, v in self.tokens_nearest.items() if v == self.symbol), ""
+            )
+            entry_price = float(
+                entry.get("average_price") or entry.get("price") or self.exit_price
+            )
+            atr = None
+            if self.trail_settings["mode"] == "atr" and self._trail_key:
+                atr = self._atr_source(self._trail_key)
+            self.trail = TrailingStop.from_settings(
+                self.trail_settings,
+                entry=entry_price,
+                stop=self.exit_price,
+                atr=atr,
+            )
+            logging.info(
+                f"Trailing {self.trail.mode} started for {self.symbol} entry={entry_price} stop={self.exit_price}"
+            )
+        except Exception as e:
+            self.trail = None
+            logging.error(f"{e} while starting trail")
+
+    def on_tick(self, key: str, ltp: float, message: dict[str, Any]) -> None:
+        trail = self.trail
+        if trail is None or key != self._trail_key:
+            return
+        if trail.update(ltp) is None or self._trail_pending:
+            return
+        # called from the websocket thread, the modify waits on the runner's worker
+        self._trail_pending = True
+        if self._loop is not None:
+            self._worker.submit(self._modify_trail)
+        else:
+            self._modify_trail()
+
+    def _modify_trail(self) -> None:
+        self._trail_pending = False
+        trail = self.trail
+        if trail is None or not self.exit_id or self.fn != "exit_trade":
+            return
+        stop = trail.stop
+        moved = False
+        try:
+            if self.bracket is not None:
+                # the bracket knows the stop leg's open quantity after a partial target fill
+                moved = self.bracket.move_stop(stop)
+            else:
+                kwargs = {
+                    "symbol": self.symbol,
+                    "order_id": self.exit_id,
+                    "quantity": self.quantity,
+                    "exchange": self.exchange,
+                    "order_type": "SL",
+                    "price": stop,
+                    "trigger_price": round(stop + TICK_SIZE, 2),
+                }
+                logging.info(f"Trailing stop of {self.exit_id} to {stop}")
+                moved = accepted(self.helper.modify_order(kwargs))
+        except Exception as e:
+            logging.error(f"{e} while trailing stop")
+        if moved:
+            self.exit_price = stop
+            self._save_trade()
+        else:
+            logging.warning(f"Trailing stop of {self.exit_id} to {stop} not accepted")
+            trail.rollback(self.exit_price)
+
     def run_state_machine(self) -> None:
         try:
             self.ltps = {}
@@ -180,18 +415,29 @@ class TickRunner:
                 if ws_token in ws_ltp:
                     self.ltps[trading_symbol] = ws_ltp[ws_token]
             if self.entry_id and self.fn != "create":
-                ltp_val = self.ltps.get(self.symbol, "NOT FOUND")
                 logging.info(
-                    f"TRADE CHECK: target={self.target_price}, exit={self.exit_price}, ltp={ltp_val}"
+                    "TRADE CHECK: target=%s, exit=%s, ltp=%s",
+                    self.target_price,
+                    self.exit_price,
+                    self.ltps.get(self.symbol, "NOT FOUND"),
+                    every=STATUS_LOG_EVERY,
                 )
             getattr(self, self.fn)()
         except Exception as e:
             logging.error(f"{e} run_state_machine")
 
     async def run(self):
-        while True:
-            try:
-                self.run_state_machine()
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                logging.error(f"TickRunner.run failed: {e}")
+        self._loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    # one worker keeps the steps and the stop moves in order
+                    await self._loop.run_in_executor(
+                        self._worker, self.run_state_machine
+                    )
+                    await asyncio.sleep(0.5)
+                except Exception as e:
+                    logging.error(f"TickRunner.run failed: {e}")
+        finally:
+            self._loop = None
+            self._worker.shutdown(wait=False)
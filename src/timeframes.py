@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from src.candles import day_start, volume_delta
+from src.constants import logging
+from src.indicators import IndicatorSet, indicator_name
+
+TIMEFRAMES = (1, 3, 5, 15)  # minutes kept per token unless settings say otherwise
+DAY_SECONDS = 24 * 3600
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+
+def _row(row: dict[str, Any]) -> tuple[int, float, float, float, float, float] | None:
+    try:
+        return (
+            int(row.get("ssboe", row.get("ut", 0))),
+            float(row.get("into", row.get("open", 0))),
+            float(row.get("inth", row.get("high", 0))),
+            float(row.get("intl", row.get("low", 0))),
+            float(row.get("intc", row.get("close", 0))),
+            float(row.get("intv", row.get("volume", 0)) or 0),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+class Frame:
+    """
+    Bars of one token at one timeframe in arrays sized for a whole day.
+
+    time[:count] and ohlcv[:count] are the bars, oldest first. A tick
+    either updates the last row or writes the next one, nothing is
+    reallocated or shifted during the day.
+    """
+
+    __slots__ = (
+        "_payload",
+        "count",
+        "indicators",
+        "minutes",
+        "ohlcv",
+        "seconds",
+        "time",
+        "version",
+    )
+
+    def __init__(
+        self, minutes: int, indicators: tuple[dict[str, Any], ...] = ()
+    ) -> None:
+        self.minutes = minutes
+        self.seconds = minutes * 60
+        capacity = DAY_SECONDS // self.seconds + 1
+        self.time = np.zeros(capacity, dtype=np.int64)
+        self.ohlcv = np.zeros((capacity, 5), dtype=np.float64)
+        self.count = 0
+        self.version = 0
+        self.indicators = IndicatorSet(indicators, capacity)
+        self._payload: tuple[int, bytes] | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def load(self, stamps: np.ndarray, bars: np.ndarray) -> None:
+        """
+        Resample one minute bars (oldest first) into this timeframe.
+
+        Bars built from ticks after the newest history bar are kept, the
+        one they share is merged so live extremes survive.
+        """
+        live_time = self.time[: self.count].copy()
+        live = self.ohlcv[: self.count].copy()
+        n = 0
+        if len(stamps):
+            buckets = stamps // self.seconds * self.seconds
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            ends = np.r_[starts[1:], len(buckets)] - 1
+            n = len(starts)
+            self.time[:n] = buckets[starts]
+            self.ohlcv[:n, OPEN] = bars[starts, OPEN]
+            self.ohlcv[:n, HIGH] = np.maximum.reduceat(bars[:, HIGH], starts)
+            self.ohlcv[:n, LOW] = np.minimum.reduceat(bars[:, LOW], starts)
+            self.ohlcv[:n, CLOSE] = bars[ends, CLOSE]
+            self.ohlcv[:n, VOLUME] = np.add.reduceat(bars[:, VOLUME], starts)
+        newest = self.time[n - 1] if n else -1
+        for stamp, bar in zip(live_time, live, strict=True):
+            if stamp == newest:
+                row = self.ohlcv[n - 1]
+                row[HIGH] = max(row[HIGH], bar[HIGH])
+                row[LOW] = min(row[LOW], bar[LOW])
+                row[CLOSE] = bar[CLOSE]
+                row[VOLUME] = max(row[VOLUME], bar[VOLUME])
+            elif stamp > newest and n < len(self.time):
+                self.time[n] = stamp
+                self.ohlcv[n] = bar
+                n += 1
+        self.count = n
+        self.indicators.backfill(self.ohlcv[:n])
+        self.version += 1
+
+    def on_tick(self, price: float, volume: float, now: float) -> bool:
+        stamp = int(now) // self.seconds * self.seconds
+        n = self.count
+        if n and stamp == self.time[n - 1]:
+            row = self.ohlcv[n - 1]
+            if price > row[HIGH]:
+                row[HIGH] = price
+            elif price < row[LOW]:
+                row[LOW] = price
+            row[CLOSE] = price
+            row[VOLUME] += volume
+            self.indicators.on_tick(self.ohlcv, n, rolled=False)
+        elif (not n or stamp > self.time[n - 1]) and n < len(self.time):
+            self.time[n] = stamp
+            self.ohlcv[n] = (price, price, price, price, volume)
+            self.count = n + 1
+            self.indicators.on_tick(self.ohlcv, n + 1, rolled=True)
+        else:
+            return False
+        self.version += 1
+        return True
+
+    def values_at(self, stamp: int) -> dict[str, float | None] | None:
+        """Indicator values of the forming bar or the one closed before it."""
+        for index in (self.count - 1, self.count - 2):
+            if index >= 0 and self.time[index] == stamp:
+                return self.indicators.row(index)
+        return None
+
+    def changed(self, rolled: bool) -> list[tuple[int, list[float]]]:
+        """Bars a tick moved: the forming one, behind the one it closed if it rolled."""
+        start = self.count - 2 if rolled else self.count - 1
+        return [
+            (int(self.time[i]), self.ohlcv[i].tolist())
+            for i in range(max(start, 0), self.count)
+        ]
+
+    def last(self) -> tuple[int, list[float]] | None:
+        if not self.count:
+            return None
+        return int(self.time[self.count - 1]), self.ohlcv[self.count - 1].tolist()
+
+    def view(self, bars: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """The last bars (all by default) as views, no copy is made."""
+        start = 0 if bars is None else max(self.count - bars, 0)
+        return self.time[start : self.count], self.ohlcv[start : self.count]
+
+    def payload(self) -> bytes:
+        """
+        Bars newest first in the /api/historical shape, rebuilt once per
+        change. Indicator columns line up with data.
+        """
+        if self._payload is None or self._payload[0] != self.version:
+            times = self.time[: self.count][::-1].tolist()
+            rows = self.ohlcv[: self.count][::-1].tolist()
+            data = [
+                {"time": t, "open": o, "high": h, "low": lo, "close": c, "volume": v}
+                for t, (o, h, lo, c, v) in zip(times, rows, strict=True)
+            ]
+            content = {"data": data, "indicators": self.indicators.columns(self.count)}
+            self._payload = (self.version, json.dumps(content).encode())
+        return self._payload[1]
+
+
+class CandleEngine:
+    """
+    Every configured timeframe of a token from one history call and the ticks.
+
+    The first request for a token fetches its one minute bars for the day
+    and resamples them into each timeframe; from then on ticks keep every
+    frame current and any timeframe is served from memory. A load that got
+    no history is retried at most once a minute, series roll over at local
+    midnight. A listener, the live candle hub, is told which frames each
+    tick moved.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[..., list[dict[str, Any]]],
+        timeframes: tuple[int, ...] = TIMEFRAMES,
+        now: Callable[[], float] = time.time,
+        indicators: tuple[dict[str, Any], ...] = (),
+    ) -> None:
+        self._fetch = fetch
+        self.timeframes = tuple(sorted({int(m) for m in timeframes}))
+        self.indicators = list(indicators)
+        self._now = now
+        self._frames: dict[str, dict[int, Frame]] = {}
+        self._loaded: dict[str, tuple[int, bool, float]] = {}  # day, got history, at
+        self._volume: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+        # (key, [(frame, rolled)]) after each tick, called under the lock
+        self.listener: Callable[[str, list[tuple[Frame, bool]]], None] | None = None
+        self.fetches = 0
+
+    def _stale(self, key: str, now: float) -> bool:
+        loaded = self._loaded.get(key)
+        if loaded is None:
+            return True
+        day, complete, at = loaded
+        return day != day_start(now) or (not complete and now - at >= 60)
+
+    def load(self, key: str) -> dict[int, Frame]:
+        now = self._now()
+        if not self._stale(key, now):
+            return self._frames[key]
+        with self._loading:
+            now = self._now()
+            if not self._stale(key, now):
+                return self._frames[key]
+            today = day_start(now)
+            exchange, token = key.split("|", 1)
+            rows = self._fetch(exchange, token, interval=1, start=today) or []
+            self.fetches += 1
+            parsed = sorted(
+                r for r in map(_row, rows) if r is not None and r[0] >= today
+            )
+            stamps = np.array([r[0] for r in parsed], dtype=np.int64)
+            bars = np.array([r[1:] for r in parsed], dtype=np.float64).reshape(-1, 5)
+            with self._lock:
+                frames = self._frames.get(key)
+                if frames is None or self._loaded.get(key, (today,))[0] != today:
+                    frames = self._frames[key] = {
+                        m: Frame(m, tuple(self.indicators)) for m in self.timeframes
+                    }
+                for frame in frames.values():
+                    frame.load(stamps, bars)
+                self._loaded[key] = (today, bool(parsed), now)
+            logging.debug(f"[timeframes] {key}: {len(parsed)} one minute bars")
+            return frames
+
+    def on_tick(
+        self, key: str, price: float, message: dict[str, Any] | None = None
+    ) -> None:
+        frames = self._frames.get(key)
+        if frames is None:
+            return
+        volume = volume_delta(self._volume, key, message)
+        now = self._now()
+        with self._lock:
+            changed = []
+            for frame in frames.values():
+                count = frame.count
+                if frame.on_tick(price, volume, now):
+                    changed.append((frame, 0 < count < frame.count))
+            if changed and self.listener is not None:
+                try:
+                    self.listener(key, changed)
+                except Exception as e:
+                    logging.error(f"{e} while passing on a tick of {key}")
+
+    def frame(self, key: str, minutes: int) -> Frame:
+        frames = self.load(key)
+        if minutes not in frames:
+            raise ValueError(f"{minutes}m is not one of {self.timeframes}")
+        return frames[minutes]
+
+    def arrays(
+        self, key: str, minutes: int, bars: int | None = None
+    ) -> dict[str, np.ndarray]:
+        """Columns of the last bars and their indicators for strategies, views into the frame."""
+        frame = self.frame(key, minutes)
+        stamps, ohlcv = frame.view(bars)
+        start = frame.count - len(stamps)
+        columns = {
+            "time": stamps,
+            "open": ohlcv[:, OPEN],
+            "high": ohlcv[:, HIGH],
+            "low": ohlcv[:, LOW],
+            "close": ohlcv[:, CLOSE],
+            "volume": ohlcv[:, VOLUME],
+        }
+        for name, values in frame.indicators.values.items():
+            columns[name] = values[start : frame.count]
+        return columns
+
+    def indicator(self, key: str, minutes: int, spec: dict[str, Any]) -> float | None:
+        """Latest value with the forming bar, a new spec is backfilled into the token's frames."""
+        frames = self.load(key)
+        if minutes not in frames:
+            raise ValueError(f"{minutes}m is not one of {self.timeframes}")
+        name = indicator_name(spec)
+        with self._lock:
+            if spec not in self.indicators:
+                self.indicators.append(spec)
+            for frame in frames.values():
+                if name not in frame.indicators.values:
+                    frame.indicators.add(spec, frame.ohlcv[: frame.count])
+                    frame.version += 1
+            frame = frames[minutes]
+            if not frame.count:
+                return None
+            return frame.indicators.row(frame.count - 1)[name]
+
+    def values_at(
+        self, key: str, minutes: int, stamp: int
+    ) -> dict[str, float | None] | None:
+        frame = self._frames.get(key, {}).get(minutes)
+        if frame is None:
+            return None
+        with self._lock:
+            return frame.values_at(stamp)
+
+    def forming(self, key: str, minutes: int) -> tuple[int, list[float]] | None:
+        """Newest bar of a loaded frame, never fetches."""
+        frame = self._frames.get(key, {}).get(minutes)
+        if frame is None:
+            return None
+        with self._lock:
+            return frame.last()
+
+    def payload(self, key: str, minutes: int) -> bytes:
+        frame = self.frame(key, minutes)
+        with self._lock:
+            return frame.payload()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+            self._loaded.clear()
+            self._volume.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "timeframes": list(self.timeframes),
+            "tokens": {
+                k: {f"{m}m": len(f) for m, f in frames.items()}
+                for k, frames in self._frames.items()
+            },
+            "fetches": self.fetches,
+        }
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Callable
+from typing import Any
+
+TICK_SIZE = 0.05
+ATR_PERIOD = 14
+
+
+def floor_to_tick(price: float, tick_size: float = TICK_SIZE) -> float:
+    return round(math.floor(price / tick_size + 1e-9) * tick_size, 2)
+
+
+def atr_from_bars(bars: list[dict[str, Any]], period: int = ATR_PERIOD) -> float | None:
+    """Wilder ATR over broker time price series rows (newest first)."""
+    rows = list(reversed(bars))
+    if len(rows) < 2:
+        return None
+    true_ranges: list[float] = []
+    prev_close = float(rows[0].get("intc", rows[0].get("close", 0)))
+    for row in rows[1:]:
+        high = float(row.get("inth", row.get("high", 0)))
+        low = float(row.get("intl", row.get("low", 0)))
+        true_ranges.append(
+            max(high - low, abs(high - prev_close), abs(low - prev_close))
+        )
+        prev_close = float(row.get("intc", row.get("close", 0)))
+    atr = sum(true_ranges[:period]) / min(period, len(true_ranges))
+    for tr in true_ranges[period:]:
+        atr = (atr * (period - 1) + tr) / period
+    return atr
+
+
+class TrailingStop:
+    """
+    Ratchets the stop of a long position upwards as price moves in favour.
+
+    Parameters
+    ----------
+    mode : str
+        points, percent, atr or breakeven
+    entry : float
+        fill price of the entry order
+    stop : float
+        initial stop price resting at the broker
+    value : float
+        points / percent / atr multiple behind the high, or for
+        breakeven the favourable move after which stop goes to entry
+    step : int
+        minimum number of ticks the stop must move before a modify
+    """
+
+    MODES = ("points", "percent", "atr", "breakeven")
+
+    def __init__(
+        self,
+        mode: str,
+        entry: float,
+        stop: float,
+        value: float,
+        step: int = 1,
+        offset: float = 0.0,
+        atr: Callable[[], float | None] | None = None,
+        tick_size: float = TICK_SIZE,
+    ) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"unknown trail mode {mode}, expected one of {self.MODES}")
+        if mode == "atr" and atr is None:
+            raise ValueError("atr trail needs an atr source")
+        self.mode = mode
+        self.entry = float(entry)
+        self.stop = float(stop)
+        self.value = float(value)
+        self.offset = float(offset)
+        self.tick_size = tick_size
+        self.min_move = tick_size * max(int(step), 1)
+        self.high = self.entry
+        self.modifications = 0
+        self._atr = atr
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: dict[str, Any],
+        entry: float,
+        stop: float,
+        atr: Callable[[], float | None] | None = None,
+    ) -> TrailingStop:
+        return cls(
+            mode=settings.get("mode", "points"),
+            entry=entry,
+            stop=stop,
+            value=settings.get("value", 0),
+            step=settings.get("step", 1),
+            offset=settings.get("offset", 0),
+            atr=atr,
+        )
+
+    def _candidate(self) -> float | None:
+        if self.mode == "points":
+            return self.high - self.value
+        if self.mode == "percent":
+            return self.high * (1 - self.value / 100)
+        if self.mode == "atr":
+            atr = self._atr()
+            if not atr:
+                return None
+            return self.high - atr * self.value
+        if self.high - self.entry >= self.value:
+            return self.entry + self.offset
+        return None
+
+    def update(self, ltp: float) -> float | None:
+        """Feed a tick, returns the new stop only when it moved by a full step."""
+        self.high = max(self.high, ltp)
+        candidate = self._candidate()
+        if candidate is None:
+            return None
+        candidate = floor_to_tick(candidate, self.tick_size)
+        if candidate - self.stop < self.min_move - 1e-9:
+            return None
+        self.stop = candidate
+        self.modifications += 1
+        return candidate
+
+    def rollback(self, stop: float) -> None:
+        """Back to the stop the broker still has, the next tick moves it again."""
+        self.stop = float(stop)
+        self.modifications -= 1
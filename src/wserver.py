@@ -2,20 +2,53 @@ from __future__ import annotations
 
 import time
 from collections import deque
+from collections.abc import Callable
 from typing import Any
 
 from src.constants import logging
 
 
+def _field(message: dict[str, Any], keys: tuple[str, ...], cast: Any) -> Any:
+    for key in keys:
+        value = message.get(key)
+        if value not in (None, ""):
+            return cast(value)
+    return None
+
+
+def parse_order_update(message: dict[str, Any]) -> dict[str, Any]:
+    """Map a raw websocket order update to the keys used by the order book."""
+    status = _field(message, ("status", "ost"), str)
+    return {
+        "order_id": _field(message, ("norenordno", "order_id"), str) or "",
+        "status": status.upper() if status else "",
+        "symbol": _field(message, ("tsym", "symbol"), str),
+        "exchange": _field(message, ("exch", "exchange"), str),
+        "side": _field(message, ("bs", "trantype", "side"), str),
+        "quantity": _field(message, ("qty", "quantity"), int),
+        "filled_quantity": _field(message, ("fillshares",), int),
+        "price": _field(message, ("prc", "price"), float),
+        "trigger_price": _field(message, ("trgprc",), float),
+        "average_price": _field(message, ("avgprc",), float),
+        "fill_quantity": _field(message, ("flqty",), int),
+        "fill_price": _field(message, ("flprc",), float),
+        "report_type": message.get("reporttype", ""),
+        "received_at": time.time(),
+    }
+
+
 class Wserver:
     def __init__(self, session: Any, tokens: list[str]) -> None:
         self.api = session
         self.tokens = tokens
         self.socket_opened = False  # Instance variable - FIXED!
-        self.ltp: dict[str, float] = {}  # Instance variable - FIXED! (was class variable)
+        # Instance variable - FIXED! (was class variable)
+        self.ltp: dict[str, float] = {}
         self.order_updates: deque = deque(maxlen=100)  # Instance variable
+        self.tick_listeners: list[Callable[[str, float, dict[str, Any]], None]] = []
+        self.order_listeners: list[Callable[[dict[str, Any]], None]] = []
         logging.info(f"🔌 Wserver: Creating websocket for tokens: {tokens}")
-        
+
         ret = self.api.broker.start_websocket(
             order_update_callback=self.event_handler_order_update,
             subscribe_callback=self.event_handler_quote_update,
@@ -36,12 +69,45 @@ class Wserver:
     def event_handler_order_update(self, message: dict[str, Any]) -> None:
         self.order_updates.append(message)
         logging.debug(f"order_updates count: {len(self.order_updates)}")
+        if self.order_listeners:
+            update = parse_order_update(message)
+            for listener in self.order_listeners:
+                try:
+                    listener(update)
+                except Exception as e:
+                    logging.error(f"{e} in order listener {listener}")
+
+    def add_order_listener(self, listener: Callable[[dict[str, Any]], None]) -> None:
+        if listener not in self.order_listeners:
+            self.order_listeners.append(listener)
+
+    def remove_order_listener(self, listener: Callable[[dict[str, Any]], None]) -> None:
+        if listener in self.order_listeners:
+            self.order_listeners.remove(listener)
 
     def event_handler_quote_update(self, message: dict[str, Any]) -> None:
         val = message.get("lp", False)
         if val:
             key = message["e"] + "|" + message["tk"]
-            self.ltp[key] = float(val)
+            price = float(val)
+            self.ltp[key] = price
+            for listener in self.tick_listeners:
+                try:
+                    listener(key, price, message)
+                except Exception as e:
+                    logging.error(f"{e} in tick listener {listener}")
+
+    def add_tick_listener(
+        self, listener: Callable[[str, float, dict[str, Any]], None]
+    ) -> None:
+        if listener not in self.tick_listeners:
+            self.tick_listeners.append(listener)
+
+    def remove_tick_listener(
+        self, listener: Callable[[str, float, dict[str, Any]], None]
+    ) -> None:
+        if listener in self.tick_listeners:
+            self.tick_listeners.remove(listener)
 
     def subscribe(self, tokens: list[str]) -> None:
         if self.socket_opened:
@@ -1,9 +1,10 @@
-import pytest
 import sys
 from pathlib import Path
 from types import ModuleType
 from unittest.mock import MagicMock
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).parent.parent
 TRADE_JSON = PROJECT_ROOT / "data" / "trade.json"
 
@@ -30,6 +31,7 @@ def setup_modules():
     mock_const.O_FUTL.write_file.return_value = None
     mock_const.logging = MagicMock()
     mock_const.TRADE_JSON = str(TRADE_JSON)
+    mock_const.PAPER_TRADE_JSON = str(TRADE_JSON.with_name("paper_trade.json"))
     mock_const.S_LOG = ""
     sys.modules["src.constants"] = mock_const
 
@@ -50,4 +52,4 @@ def clean_trade():
         TRADE_JSON.unlink()
     yield
     if TRADE_JSON.exists():
-        TRADE_JSON.unlink()
\ No newline at end of file
+        TRADE_JSON.unlink()
@@ -0,0 +1,378 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import api, main
+from src.api import Helper
+from src.books import OrderBook, PositionBook
+from src.breaker import breakers_from_settings
+from src.orders import build_templates
+from src.ratelimit import RateLimiter
+from src.state import _logic_state
+
+SYMBOL = "NIFTY28APR26C25050"
+ROUND_TRIP = 0.1
+
+
+def order(order_id, status="OPEN", side="B", symbol=SYMBOL):
+    return {"order_id": order_id, "symbol": symbol, "status": status, "side": side}
+
+
+def on_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class FakeBroker:
+    def __init__(self, orders, feed=True):
+        self.orders = orders
+        self.positions = []
+        self.feed = feed
+        self.cancelled = []
+        self.placed = []
+
+    def order_cancel(self, order_id):
+        time.sleep(ROUND_TRIP)
+        self.cancelled.append(order_id)
+        if order_id == "bad":
+            return {"stat": "Not_Ok", "emsg": "order not open"}
+        if self.feed:
+            update = {"order_id": order_id, "status": "CANCELED"}
+            threading.Timer(0.01, Helper.on_order_update, (update,)).start()
+        else:
+            self.orders = [
+                {**o, "status": "CANCELED"} if o["order_id"] == order_id else o
+                for o in self.orders
+            ]
+        return {"stat": "Ok", "result": order_id}
+
+    def order_place(self, **kwargs):
+        self.placed.append(kwargs)
+        return "9001"
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    fake = FakeBroker(
+        [order("1"), order("2"), order("3", "TRIGGER_PENDING", "S"), order("4")]
+    )
+    monkeypatch.setattr(Helper, "_api", fake)
+    monkeypatch.setattr(Helper, "_created_at", time.time())
+    monkeypatch.setattr(Helper, "_books", {})
+    monkeypatch.setattr(Helper, "_order_book", OrderBook())
+    monkeypatch.setattr(Helper, "_limiter", RateLimiter())
+    monkeypatch.setattr(Helper, "_position_book", PositionBook())
+    monkeypatch.setattr(Helper, "_breakers", breakers_from_settings({"cooldown": 60}))
+    return fake
+
+
+class TestCancelOrders:
+    def test_cancels_overlap_and_are_confirmed_by_updates(self, broker):
+        started = time.monotonic()
+        results = Helper.cancel_orders(SYMBOL, confirm=1.0)
+        elapsed = time.monotonic() - started
+        assert results == dict.fromkeys(["1", "2", "3", "4"], "cancelled")
+        assert elapsed < ROUND_TRIP * 2
+
+    def test_keep_and_side_filters(self, broker):
+        results = Helper.cancel_orders(SYMBOL, keep_order_id="1", side="BUY")
+        assert sorted(results) == ["2", "4"]
+        assert set(results.values()) == {"requested"}
+
+    def test_failed_cancel_is_reported(self, broker):
+        broker.orders = [order("1"), order("bad")]
+        results = Helper.cancel_orders(SYMBOL, confirm=1.0)
+        assert results == {"1": "cancelled", "bad": "failed"}
+
+    def test_falls_back_to_book_without_order_feed(self, broker):
+        broker.feed = False
+        results = Helper.cancel_orders(SYMBOL, confirm=0.05)
+        assert set(results.values()) == {"cancelled"}
+
+    def test_nothing_open(self, broker):
+        broker.orders = [order("1", "COMPLETE")]
+        assert Helper.cancel_orders(SYMBOL, confirm=1.0) == {}
+        assert broker.cancelled == []
+
+
+class TestCloseAll:
+    def test_flatten_takes_about_one_round_trip(self, broker):
+        broker.positions = [{"symbol": SYMBOL, "quantity": 75, "prd": "M"}]
+        started = time.monotonic()
+        Helper.close_all_for_symbol(SYMBOL, ltp=100.0)
+        elapsed = time.monotonic() - started
+        assert len(broker.cancelled) == 4
+        assert broker.placed[0]["side"] == "S"
+        assert broker.placed[0]["price"] == 99.5
+        assert elapsed < ROUND_TRIP * 2
+
+    def test_no_position_book_still_cancels(self, broker):
+        broker.positions = None
+        Helper.close_all_for_symbol(SYMBOL, ltp=100.0)
+        assert len(broker.cancelled) == 4
+        assert broker.placed == []
+
+    def test_endpoint_flattens_off_the_event_loop(self, broker, monkeypatch):
+        seen = []
+        monkeypatch.setattr(
+            Helper,
+            "close_all_for_symbol",
+            lambda symbol, ltp: seen.append((symbol, ltp, on_loop())),
+        )
+        monkeypatch.setattr(_logic_state, "helper", Helper)
+        client = TestClient(main.app)
+        resp = client.get("/api/trade/sell", params={"symbol": SYMBOL, "ltp": 100})
+        assert resp.json()["status"] == "success"
+        assert seen == [(SYMBOL, 100.0, False)]
+
+
+class TestLocalPnl:
+    def test_fills_and_ticks_without_position_calls(self, broker):
+        Helper.position_book().watch({"NFO|40001": SYMBOL})
+        Helper.on_order_update(
+            {
+                "order_id": "7",
+                "symbol": SYMBOL,
+                "side": "B",
+                "status": "COMPLETE",
+                "quantity": 75,
+                "filled_quantity": 75,
+                "fill_quantity": 75,
+                "fill_price": 100.0,
+            }
+        )
+        Helper.on_tick("NFO|40001", 104.0, {})
+        positions, count, m2m, realized = Helper.position_summary()
+        assert (count, m2m, realized) == (1, 300.0, 0.0)
+        assert positions[0]["last_price"] == 104.0
+        assert Helper.mtm() == 300.0
+        assert Helper.book("positions").fetches == 1
+
+    def test_pnl_stream_never_calls_the_broker(self, broker, monkeypatch):
+        monkeypatch.setattr(_logic_state, "helper", Helper)
+        assert not Helper._position_book.reconciled_at
+        _, payload = main.read_pnl()
+        assert json.loads(payload)["total"] == 0
+        assert Helper.book("positions").fetches == 0
+
+
+class DownBroker(FakeBroker):
+    down = False
+
+    def __getattribute__(self, name):
+        if name in ("orders", "order_place") and object.__getattribute__(self, "down"):
+            raise ConnectionError("broker unreachable")
+        return object.__getattribute__(self, name)
+
+
+class TestDegraded:
+    def test_outage_serves_cached_book_and_pauses_entries(self, broker, monkeypatch):
+        down = DownBroker([order("1")])
+        monkeypatch.setattr(Helper, "_api", down)
+        assert len(Helper.orders()) == 1
+        down.down = True
+        for _ in range(5):
+            Helper.invalidate_books()
+            assert len(Helper.orders()) == 1
+        assert Helper.degraded() == ["book"]
+        refused = Helper._breakers["book"].stats()["refused"]
+        Helper.invalidate_books()
+        assert len(Helper.orders()) == 1
+        assert Helper._breakers["book"].stats()["refused"] == refused + 1
+
+        for _ in range(5):
+            assert Helper.one_side({"symbol": SYMBOL, "side": "BUY"}) is None
+        assert not Helper.can_enter()
+        assert "order" in Helper.summary()["degraded"]
+        down.down = False
+        assert Helper.one_side({"symbol": SYMBOL, "side": "BUY"}) is None
+        assert Helper.one_side({"symbol": SYMBOL, "side": "SELL"}) == "9001"
+
+
+class TestHistoryBreaker:
+    def test_rate_limited_probe_leaves_the_breaker_half_open(self, broker, monkeypatch):
+        monkeypatch.setattr(api, "HISTORY_WAIT", 0.01)
+        monkeypatch.setattr(Helper, "_limiter", RateLimiter(rate=0.1, burst=1))
+        monkeypatch.setattr(
+            Helper, "_breakers", breakers_from_settings({"min_calls": 1, "cooldown": 0})
+        )
+        breaker = Helper._breakers["history"]
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == "open"
+
+        # the bucket is empty, the probe never reaches the broker
+        assert Helper.throttle("exit")
+        assert Helper.historical("NFO", "40001") == []
+        assert breaker.state == "half_open"
+        assert breaker.ready
+
+        rows = [{"time": "21-04-2025 09:15:00"}]
+        broker.broker = SimpleNamespace(get_time_price_series=lambda **kwargs: rows)
+        monkeypatch.setattr(Helper, "_limiter", RateLimiter())
+        assert Helper.historical("NFO", "40001") == rows
+        assert breaker.is_closed
+
+
+class RecordingHelper:
+    """Order methods that note whether they ran on the event loop."""
+
+    def __init__(self):
+        self.seen = []
+
+    def can_enter(self):
+        return True
+
+    def cancel_orders(self, *args, **kwargs):
+        return {}
+
+    def one_side(self, order):
+        self.seen.append(("one_side", on_loop()))
+        return "9001"
+
+    def order_cancel(self, order_id):
+        self.seen.append(("order_cancel", on_loop()))
+        return {"stat": "Ok"}
+
+
+class TestOrderEndpoints:
+    def test_throttled_calls_wait_off_the_event_loop(self, monkeypatch):
+        helper = RecordingHelper()
+        monkeypatch.setattr(_logic_state, "helper", helper)
+        monkeypatch.setattr(_logic_state, "runner", None)
+        monkeypatch.setattr(
+            _logic_state, "templates", build_templates({"NFO|1": SYMBOL}, {}, 75)
+        )
+        monkeypatch.setattr(main.file_writer, "write", lambda path, content: None)
+        monkeypatch.setattr(main, "get_settings", dict)
+        client = TestClient(main.app)
+        buy = {
+            "symbol": SYMBOL,
+            "price": 98.0,
+            "exit_price": 95.0,
+            "target_price": 110.0,
+        }
+        assert client.post("/api/trade/buy", json=buy).json()["status"] == "success"
+        position = {"symbol": SYMBOL, "quantity": 75, "ltp": 100.0}
+        assert client.post("/api/position/add", json=position).status_code == 200
+        assert client.post("/api/position/square", json=position).status_code == 200
+        cancel = client.post("/api/order/cancel", json={"order_id": "9001"})
+        assert cancel.status_code == 200
+        assert helper.seen == [
+            ("one_side", False),
+            ("one_side", False),
+            ("one_side", False),
+            ("order_cancel", False),
+        ]
+
+
+class TestAsyncClient:
+    @pytest.fixture
+    def pooled(self, broker, monkeypatch):
+        monkeypatch.setattr(
+            api.AsyncBroker,
+            "from_session",
+            classmethod(
+                lambda cls, session, **options: cls("http://127.0.0.1:1", "U", "T")
+            ),
+        )
+        for name in ("_aclient", "_aclient_key", "_aclient_loop"):
+            monkeypatch.setattr(Helper, name, None)
+
+    @staticmethod
+    async def make():
+        return Helper.aclient()
+
+    @staticmethod
+    def closed(client):
+        deadline = time.monotonic() + 1.0
+        while not client.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return client.is_closed
+
+    def test_reset_closes_the_pooled_client(self, broker, pooled):
+        async def main():
+            first = Helper.aclient()
+            assert Helper.aclient() is first
+            Helper.reset()
+            Helper._api, Helper._created_at = broker, time.time()
+            await asyncio.sleep(0.05)
+            return first, Helper.aclient()
+
+        first, second = asyncio.run(main())
+        assert first.is_closed
+        assert second is not first
+
+    def test_new_loop_closes_the_client_of_the_old_one(self, broker, pooled):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            first = asyncio.run_coroutine_threadsafe(self.make(), loop).result(1)
+            second = asyncio.run(self.make())
+            assert second is not first
+            assert self.closed(first)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(1)
+            loop.close()
+
+
+class TestSummaryEndpoint:
+    def test_unchanged_poll_is_304_without_broker_call(self, broker, monkeypatch):
+        monkeypatch.setattr(_logic_state, "helper", Helper)
+        client = TestClient(main.app)
+        first = client.get("/api/summary")
+        assert first.status_code == 200
+        assert first.json()["active_orders"] == 4
+        fetches = Helper.book("orders").fetches
+        again = client.get(
+            "/api/summary", headers={"If-None-Match": first.headers["ETag"]}
+        )
+        assert again.status_code == 304
+        assert again.content == b""
+        assert Helper.book("orders").fetches == fetches
+
+        Helper.on_order_update({"order_id": "1", "status": "CANCELED"})
+        changed = client.get(
+            "/api/summary", headers={"If-None-Match": first.headers["ETag"]}
+        )
+        assert changed.status_code == 200
+        assert changed.json()["active_orders"] == 3
+
+    def test_broker_reads_wait_off_the_event_loop(self, broker, monkeypatch):
+        seen = []
+        real = Helper.orders.__func__
+        monkeypatch.setattr(
+            Helper,
+            "orders",
+            classmethod(lambda cls: seen.append(on_loop()) or real(cls)),
+        )
+        from src.api import Helper as EndpointHelper
+
+        monkeypatch.setattr(
+            EndpointHelper, "candles", lambda key, tf: seen.append(on_loop()) or b"{}"
+        )
+        monkeypatch.setattr(_logic_state, "helper", Helper)
+        monkeypatch.setattr(_logic_state, "tokens_nearest", {"NFO|40001": SYMBOL})
+        client = TestClient(main.app)
+        assert client.get("/api/summary").status_code == 200
+        assert client.get(f"/api/historical/{SYMBOL}").content == b"{}"
+        assert seen == [False, False]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
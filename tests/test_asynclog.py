@@ -0,0 +1,115 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import asynclog
+from src.asynclog import INFO, AsyncLogger
+
+
+class SlowLogger:
+    """A logger whose writes take as long as a busy disk."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lines = []
+        self.threads = set()
+
+    def _write(self, level, text):
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.lines.append((level, text))
+
+    def debug(self, text):
+        self._write("DEBUG", text)
+
+    def info(self, text):
+        self._write("INFO", text)
+
+    def warning(self, text):
+        self._write("WARNING", text)
+
+    def error(self, text):
+        self._write("ERROR", text)
+
+    def critical(self, text):
+        self._write("CRITICAL", text)
+
+
+class TestAsyncLogger:
+    def test_caller_does_not_wait_for_the_write(self):
+        target = SlowLogger(delay=0.05)
+        logger = AsyncLogger(target)
+        started = time.perf_counter()
+        for i in range(20):
+            logger.info("tick %s", i)
+        assert time.perf_counter() - started < 0.05
+        logger.flush()
+        assert [text for _, text in target.lines] == [f"tick {i}" for i in range(20)]
+        assert target.threads == {"logwriter"}
+
+    def test_below_level_is_never_formatted(self):
+        target = SlowLogger()
+        logger = AsyncLogger(target, level=20)
+        built = []
+        logger.debug(lambda: built.append(1) or "expensive")
+        logger.info(lambda: f"keys {sorted({'b': 1, 'a': 2})}")
+        logger.flush()
+        assert built == []
+        assert target.lines == [("INFO", "keys ['a', 'b']")]
+
+    def test_every_limits_one_call_site(self):
+        target = SlowLogger()
+        logger = AsyncLogger(target)
+        for i in range(10):
+            logger.info("status %s", i, every=60)
+            logger.warning("other %s", i, every=60)
+        logger.flush()
+        assert [text for _, text in target.lines] == ["status 0", "other 0"]
+        assert logger.stats()["rate_limited"] == 18
+
+    def test_repeats_collapse_into_a_count(self):
+        target = SlowLogger()
+        logger = AsyncLogger(target)
+        for ltp in (101.5, 101.5, 101.5, 101.5, 101.5, 102.0):
+            logger.info("TRADE CHECK: ltp=%s", ltp)
+        logger.flush()
+        assert [text for _, text in target.lines] == [
+            "TRADE CHECK: ltp=101.5",
+            "TRADE CHECK: ltp=101.5 (repeated 4 times)",
+            "TRADE CHECK: ltp=102.0",
+        ]
+
+    def test_repeats_are_held_until_the_site_goes_quiet(self, monkeypatch):
+        clock = {"now": 0.0}
+        monkeypatch.setattr(
+            asynclog, "time", SimpleNamespace(monotonic=lambda: clock["now"])
+        )
+        target = SlowLogger()
+        logger = AsyncLogger(target)
+        for now in (0.0, 4.0, 8.0):
+            clock["now"] = now
+            logger._handle(INFO, "site", "TRADE CHECK", ())
+        clock["now"] = 10.0
+        logger._flush_repeats(asynclog.DEDUP_WINDOW)
+        assert [text for _, text in target.lines] == ["TRADE CHECK"]
+        clock["now"] = 13.0
+        logger._flush_repeats(asynclog.DEDUP_WINDOW)
+        assert target.lines[-1] == ("INFO", "TRADE CHECK (repeated 2 times)")
+
+    def test_literal_percent_without_args_is_kept(self):
+        target = SlowLogger()
+        logger = AsyncLogger(target)
+        logger.error("down 5% on %d")
+        logger.flush()
+        assert target.lines == [("ERROR", "down 5% on %d")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,100 @@
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.backtest import Backtest, Bars, FillModel, SimOrder, option_type
+
+DAY_START = 1745206200  # 2025-04-21 09:15 IST
+
+
+def make_bars(symbol, rows):
+    times = [DAY_START + 60 * n for n in range(len(rows))]
+    o, h, lo, c = zip(*rows, strict=True)
+    return Bars(symbol, times, o, h, lo, c)
+
+
+class TestFillModel:
+    def test_buy_stop_triggers_then_fills_capped_at_limit(self):
+        fill = FillModel(slippage=0.1)
+        order = SimOrder("BUY", 101.05, trigger=101.0)
+        assert fill.match(order, 100.9) is None
+        assert fill.match(order, 101.0) == 101.05
+
+    def test_sell_stop_crossed_inside_bar_fills_at_trigger(self):
+        order = SimOrder("SELL", 95.0, trigger=95.05)
+        assert FillModel().match(order, 94.0, prev=97.0) == 95.05
+
+    def test_sell_stop_gapped_through_limit_does_not_fill(self):
+        order = SimOrder("SELL", 95.0, trigger=95.05)
+        assert FillModel().match(order, 94.0) is None
+        assert order.triggered
+
+
+class TestBacktest:
+    def test_target_and_stop_trades(self):
+        chain = {
+            "NIFTY24APR25C24000": make_bars(
+                "NIFTY24APR25C24000",
+                [
+                    (100, 101, 99, 100),  # arms buy above 101, stop 99
+                    (100, 102, 100, 101.5),  # fills at 101, target 105.15
+                    (102, 106, 102, 105.5),  # target crossed
+                    (104, 104, 100, 100.5),  # re-arms above 104, stop 100
+                    (101, 104.5, 101, 102),  # fills at 104
+                    (102, 102, 98, 98.5),  # stop triggers at 100.05
+                ],
+            ),
+            "NIFTY24APR25P24000": make_bars(
+                "NIFTY24APR25P24000",
+                [(300 - n, 300 - n, 299 - n, 299 - n) for n in range(6)],
+            ),
+        }
+        result = Backtest(chain, {"premium": 100, "profit": 2, "lot_size": 75}).run()
+        reasons = [t.reason for t in result.trades]
+        assert reasons == ["target", "stop"]
+        first, second = result.trades
+        assert first.entry_price == 101.0
+        assert first.exit_price == 105.15
+        assert second.entry_price == 104.0
+        assert second.exit_price == 100.05
+        assert result.max_drawdown == pytest.approx(3.95 * 75)
+        assert result.summary()["trades"] == 2
+
+    def test_week_of_chain_runs_fast(self):
+        rng = np.random.default_rng(7)
+        chain = {}
+        for strike in range(23000, 25000, 50):
+            for kind in ("C", "P"):
+                symbol = f"NIFTY24APR25{kind}{strike}"
+                times = np.concatenate(
+                    [DAY_START + d * 86400 + 60 * np.arange(375) for d in range(5)]
+                )
+                close = (
+                    50
+                    + abs(strike - 24000) / 10
+                    + np.cumsum(rng.normal(0, 0.5, len(times)))
+                )
+                close = np.maximum(close, 1)
+                chain[symbol] = Bars(
+                    symbol, times, close, close + 0.5, close - 0.5, close
+                )
+        started = time.perf_counter()
+        result = Backtest(chain, {"premium": 100, "profit": 1}).run()
+        assert time.perf_counter() - started < 5
+        assert len(result.trades) > 0
+
+
+def test_option_type():
+    assert option_type("NIFTY28APR26C25050") == "CE"
+    assert option_type("NIFTY28APR26P23800") == "PE"
+    assert option_type("NIFTY") == ""
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
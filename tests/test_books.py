@@ -0,0 +1,293 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.books import BookCache, OrderBook, OrderRecord, PositionBook, Summary
+
+
+class SlowBroker:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [{"order_id": str(self.calls)}]
+
+
+class TestBookCache:
+    def test_serves_from_cache_within_ttl(self):
+        broker = SlowBroker(delay=0)
+        cache = BookCache(broker.fetch, ttl=60)
+        assert cache.get() == [{"order_id": "1"}]
+        assert cache.get() == [{"order_id": "1"}]
+        assert broker.calls == 1
+        assert cache.hits == 1
+
+    def test_concurrent_callers_share_one_fetch(self):
+        broker = SlowBroker()
+        cache = BookCache(broker.fetch, ttl=60)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get()))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert broker.calls == 1
+        assert results == [[{"order_id": "1"}]] * 8
+
+    def test_invalidate_forces_fetch_inside_ttl(self):
+        broker = SlowBroker(delay=0)
+        cache = BookCache(broker.fetch, ttl=60)
+        cache.get()
+        cache.invalidate()
+        assert cache.get() == [{"order_id": "2"}]
+
+    def test_update_during_fetch_keeps_book_stale(self):
+        broker = SlowBroker()
+        cache = BookCache(broker.fetch, ttl=60)
+        t = threading.Thread(target=cache.get)
+        t.start()
+        time.sleep(0.01)
+        cache.invalidate()
+        t.join()
+        assert not cache.is_fresh
+        cache.get()
+        assert broker.calls == 2
+
+    def test_started_at_belongs_to_the_current_book(self):
+        cache = BookCache(SlowBroker(delay=0).fetch, ttl=0)
+        before = time.monotonic()
+        first = cache.get()
+        assert before <= cache.started_at(first) <= time.monotonic()
+        cache.get()
+        assert cache.started_at(first) == 0.0
+
+    def test_failed_fetch_returns_last_book(self):
+        books = [[{"order_id": "1"}], None]
+        cache = BookCache(lambda: books.pop(0), ttl=0)
+        assert cache.get() == [{"order_id": "1"}]
+        assert cache.get() == [{"order_id": "1"}]
+
+
+def broker_row(order_id, symbol, status, side="B"):
+    return {
+        "order_id": order_id,
+        "symbol": symbol,
+        "status": status,
+        "side": side,
+        "price": "101.05",
+        "quantity": "75",
+        "cname": symbol,
+        "exchange": "NFO",
+        "rejreason": "",
+        "remarks": "no_tag",
+    }
+
+
+class TestOrderBook:
+    def test_snapshot_builds_indexes(self):
+        book = OrderBook()
+        book.apply_snapshot(
+            [
+                broker_row("1", "NIFTYC", "OPEN"),
+                broker_row("2", "NIFTYC", "TRIGGER_PENDING", side="S"),
+                broker_row("3", "NIFTYP", "COMPLETE"),
+                broker_row("4", "NIFTYP", "CANCELED"),
+                {},
+            ]
+        )
+        assert len(book) == 4
+        assert book.get("2").status == "TRIGGER_PENDING"
+        assert book.get("1").price == 101.05
+        assert [o.order_id for o in book.for_symbol("NIFTYC")] == ["1", "2"]
+        assert book.for_symbol("NIFTYP") == []
+        assert book.count("open", "pending") == 2
+        assert book.count_status("CANCELED") == 1
+
+    def test_event_moves_record_between_buckets(self):
+        book = OrderBook()
+        book.apply_snapshot([broker_row("1", "NIFTYC", "OPEN")])
+        version = book.version
+        book.apply_event({"order_id": "1", "status": "COMPLETE", "price": None})
+        record = book.get("1")
+        assert record.get("status") == "COMPLETE"
+        assert record.price == 101.05
+        assert book.count("open") == 0
+        assert book.count("terminal") == 1
+        assert book.version == version + 1
+
+    def test_same_snapshot_is_not_reapplied(self):
+        book = OrderBook()
+        rows = [broker_row("1", "NIFTYC", "OPEN")]
+        book.sync(rows)
+        version = book.version
+        book.sync(rows)
+        book.sync(list(rows))
+        assert book.version == version
+
+    def test_snapshot_fetched_before_an_update_keeps_the_update(self):
+        book = OrderBook()
+        book.apply_snapshot([broker_row("1", "NIFTYC", "OPEN")])
+        started = time.monotonic()
+        book.apply_event({"order_id": "1", "status": "COMPLETE"})
+        book.apply_event({"order_id": "2", "symbol": "NIFTYC", "status": "OPEN"})
+        book.sync([broker_row("1", "NIFTYC", "OPEN")], started)
+        assert book.get("1").status == "COMPLETE"
+        assert book.count("open") == 1
+
+        book.sync([broker_row("1", "NIFTYC", "COMPLETE")], time.monotonic())
+        assert book.get("2") is None
+        assert book.count("terminal") == 1
+
+    def test_snapshot_drops_missing_orders(self):
+        book = OrderBook()
+        book.apply_snapshot([broker_row("1", "NIFTYC", "OPEN")])
+        book.apply_snapshot([broker_row("2", "NIFTYC", "OPEN")])
+        assert book.get("1") is None
+        assert book.count("open") == 1
+
+    def test_record_is_smaller_than_broker_dict(self):
+        record = OrderRecord("1")
+        record.update(broker_row("1", "NIFTYC", "OPEN"))
+        assert not hasattr(record, "__dict__")
+        assert sys.getsizeof(record) < sys.getsizeof(broker_row("1", "NIFTYC", "OPEN"))
+
+
+def fill(book, order_id, side, filled, average, fill_qty=None, fill_price=None):
+    orders = book.orders
+    record = orders.apply_event(
+        {
+            "order_id": order_id,
+            "symbol": "NIFTYC",
+            "exchange": "NFO",
+            "side": side,
+            "status": "COMPLETE" if fill_qty is None else "OPEN",
+            "quantity": 150,
+            "filled_quantity": filled,
+            "average_price": average,
+        }
+    )
+    return book.apply_fill(
+        record, {"fill_quantity": fill_qty, "fill_price": fill_price}
+    )
+
+
+@pytest.fixture
+def positions():
+    book = PositionBook()
+    book.orders = OrderBook()
+    book.watch({"NFO|40001": "NIFTYC"})
+    return book
+
+
+class TestPositionBook:
+    def test_fills_and_ticks_value_the_position(self, positions):
+        assert fill(positions, "1", "B", 75, 100.0, 75, 100.0)
+        assert fill(positions, "1", "B", 150, 101.0, 75, 102.0)
+        # the same update again books nothing
+        assert not fill(positions, "1", "B", 150, 101.0, 75, 102.0)
+        assert positions.on_tick("NFO|40001", 103.0)
+        snap = positions.snapshot()
+        assert snap["symbols"]["NIFTYC"]["quantity"] == 150
+        assert snap["symbols"]["NIFTYC"]["average_price"] == 101.0
+        assert snap["unrealized"] == 300.0
+        assert not positions.on_tick("NFO|99", 1.0)
+
+    def test_closing_fill_realizes(self, positions):
+        fill(positions, "1", "B", 150, 100.0)
+        fill(positions, "2", "S", 150, 104.0)
+        snap = positions.snapshot()
+        assert snap["realized"] == 600.0
+        assert snap["unrealized"] == 0.0
+        assert snap["open"] == 0
+
+    def test_average_derived_without_fill_price(self, positions):
+        fill(positions, "1", "B", 75, 100.0, 0, None)
+        fill(positions, "1", "B", 150, 101.0, 0, None)
+        record = positions.records()[0]
+        assert record.quantity == 150
+        assert record.average_price == 101.0
+
+    def test_reconcile_takes_broker_and_reports_drift(self, positions):
+        fill(positions, "1", "B", 75, 100.0)
+        rows = [
+            {
+                "symbol": "NIFTYC",
+                "exch": "NFO",
+                "token": "40001",
+                "quantity": 150,
+                "rpnl": 0.0,
+                "urmtom": 150.0,
+                "lp": "101.00",
+            }
+        ]
+        # a fill newer than the broker book wins
+        assert positions.reconcile(rows, time.time() - 10) == {}
+        assert positions.records()[0].quantity == 75
+        drift = positions.reconcile(rows, time.time() + 10)
+        assert drift["NIFTYC"]["broker_quantity"] == 150
+        record = positions.records()[0]
+        assert record.quantity == 150
+        assert record.average_price == 100.0
+        assert positions.snapshot()["total"] == 150.0
+
+
+class TestSummary:
+    def test_rebuilt_only_when_a_book_moves(self):
+        orders, positions = OrderBook(), PositionBook()
+        orders.apply_snapshot(
+            [
+                {"order_id": "1", "symbol": "X", "status": "OPEN", "side": "B"},
+                {"order_id": "2", "symbol": "X", "status": "CANCELED", "side": "B"},
+                {
+                    "order_id": "3",
+                    "symbol": "X",
+                    "status": "COMPLETE",
+                    "side": "B",
+                    "quantity": 10,
+                    "filled_quantity": 10,
+                    "average_price": 100.0,
+                },
+            ]
+        )
+        positions.apply_fill(orders.get("3"), {})
+        summary = Summary()
+        first = summary.refresh(orders, positions).body
+        etag = summary.etag
+        assert summary.refresh(orders, positions).body is first
+        assert summary.etag == etag
+        data = summary.data
+        assert (data["active_orders"], data["order_count"], data["position_count"]) == (
+            1,
+            2,
+            1,
+        )
+
+        positions.watch({"NFO|1": "X"})
+        positions.on_tick("NFO|1", 103.0)
+        summary.refresh(orders, positions)
+        assert summary.etag != etag
+        assert summary.data["m2m"] == 30.0
+        assert summary.data["version"] == 2
+
+    def test_summaries_of_different_books_never_share_an_etag(self):
+        live, paper = Summary(), Summary()
+        live.refresh(OrderBook(), PositionBook())
+        paper.refresh(OrderBook(), PositionBook(), degraded=["book"])
+        assert live.data["version"] == paper.data["version"] == 1
+        assert live.etag != paper.etag
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.api import Helper
+from src.bracket import BracketManager
+
+
+@pytest.fixture(autouse=True)
+def setup_mocks(monkeypatch):
+    monkeypatch.setattr(
+        Helper,
+        "one_side",
+        MagicMock(
+            side_effect=lambda args: "STOP1" if args["order_type"] == "SL" else "TGT1"
+        ),
+    )
+    monkeypatch.setattr(Helper, "order_cancel", MagicMock(return_value={"stat": "Ok"}))
+    monkeypatch.setattr(Helper, "modify_order", MagicMock(return_value={"stat": "Ok"}))
+    yield
+
+
+@pytest.fixture
+def manager():
+    mgr = BracketManager(max_workers=2)
+    yield mgr
+    mgr._executor.shutdown(wait=True)
+
+
+def open_bracket(manager):
+    return manager.open(
+        symbol="NIFTY28APR26C25050",
+        exchange="NFO",
+        quantity=75,
+        tag="no_tag",
+        target_price=110.02,
+        stop_price=95.0,
+    )
+
+
+class TestBracket:
+    def test_places_both_legs(self, manager):
+        bracket = open_bracket(manager)
+        assert bracket.stop.order_id == "STOP1"
+        assert bracket.target.order_id == "TGT1"
+        assert bracket.target_price == 110.0
+        orders = [c[0][0] for c in Helper.one_side.call_args_list]
+        assert {o["order_type"] for o in orders} == {"SL", "LMT"}
+
+    def test_target_fill_cancels_stop_and_records_latency(self, manager):
+        bracket = open_bracket(manager)
+        manager.on_order_update(
+            {"order_id": "TGT1", "status": "COMPLETE", "received_at": 10.0}
+        )
+        manager._executor.shutdown(wait=True)
+        Helper.order_cancel.assert_called_once_with("STOP1")
+        assert not bracket.done
+
+        manager.on_order_update(
+            {"order_id": "STOP1", "status": "CANCELED", "received_at": 10.25}
+        )
+        assert bracket.done
+        assert bracket.closed_by == "target"
+        assert manager.stats()["last_ms"] == 250.0
+        assert manager.stats()["open"] == 0
+
+    def test_partial_fill_resizes_sibling(self, manager):
+        open_bracket(manager)
+        manager.on_order_update(
+            {"order_id": "STOP1", "status": "OPEN", "filled_quantity": 25}
+        )
+        manager._executor.shutdown(wait=True)
+        Helper.order_cancel.assert_not_called()
+        kwargs = Helper.modify_order.call_args[0][0]
+        assert kwargs["order_id"] == "TGT1"
+        assert kwargs["quantity"] == 50
+
+    def test_trail_after_partial_target_fill_keeps_the_open_quantity(self, manager):
+        bracket = open_bracket(manager)
+        manager.on_order_update(
+            {"order_id": "TGT1", "status": "OPEN", "filled_quantity": 25}
+        )
+        manager._executor.shutdown(wait=True)
+        assert Helper.modify_order.call_args[0][0]["quantity"] == 50
+        assert bracket.move_stop(98.0)
+        kwargs = Helper.modify_order.call_args[0][0]
+        assert (kwargs["order_id"], kwargs["price"], kwargs["quantity"]) == (
+            "STOP1",
+            98.0,
+            50,
+        )
+
+    def test_resize_after_trail_keeps_the_trailed_stop(self, manager):
+        bracket = open_bracket(manager)
+        bracket.move_stop(99.0)
+        manager.on_order_update(
+            {"order_id": "TGT1", "status": "OPEN", "filled_quantity": 30}
+        )
+        manager._executor.shutdown(wait=True)
+        kwargs = Helper.modify_order.call_args[0][0]
+        assert (kwargs["order_id"], kwargs["price"], kwargs["quantity"]) == (
+            "STOP1",
+            99.0,
+            45,
+        )
+
+    def test_rejected_trail_keeps_the_stop_the_broker_has(self, manager):
+        bracket = open_bracket(manager)
+        Helper.modify_order.return_value = None
+        assert not bracket.move_stop(99.0)
+        assert bracket.stop_price == 95.0
+
+    def test_failed_stop_cancels_target(self, manager):
+        Helper.one_side = MagicMock(
+            side_effect=lambda args: None if args["order_type"] == "SL" else "TGT1"
+        )
+        assert open_bracket(manager) is None
+        Helper.order_cancel.assert_called_once_with("TGT1")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,62 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.breaker import CircuitBreaker, breakers_from_settings
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow()
+        breaker.record(False)
+
+
+class TestCircuitBreaker:
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker("book", min_calls=4, failure_rate=0.5)
+        for ok in (True, True, False):
+            breaker.record(ok)
+        assert breaker.is_closed
+        breaker.record(False)
+        assert breaker.state == "open"
+        assert not breaker.allow()
+        assert breaker.stats()["refused"] == 1
+
+    def test_single_probe_after_cooldown(self):
+        breaker = CircuitBreaker("order", min_calls=2, cooldown=0.05)
+        trip(breaker)
+        assert not breaker.ready
+        time.sleep(0.06)
+        assert breaker.ready
+        assert breaker.allow()
+        assert breaker.state == "half_open"
+        assert not breaker.allow()
+        breaker.record(True)
+        assert breaker.is_closed
+        assert breaker.cooldown == 0.05
+
+    def test_failed_probe_doubles_cooldown(self):
+        breaker = CircuitBreaker(
+            "history", min_calls=2, cooldown=0.05, max_cooldown=0.08
+        )
+        trip(breaker)
+        time.sleep(0.06)
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == "open"
+        assert breaker.cooldown == 0.08
+        assert breaker.stats()["trips"] == 2
+
+    def test_endpoint_overrides(self):
+        breakers = breakers_from_settings({"cooldown": 3, "history": {"cooldown": 10}})
+        assert breakers["order"].cooldown == 3
+        assert breakers["history"].cooldown == 10
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
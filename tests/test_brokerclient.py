@@ -0,0 +1,198 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.brokerclient import AsyncBroker, BrokerError
+
+
+class MockNoren(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockServer"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        form = parse_qs(body.decode())
+        jdata = json.loads(form["jData"][0])
+        route = self.path.rsplit("/", 1)[-1]
+        with self.server.lock:
+            self.server.calls.append((route, jdata, form["jKey"][0]))
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+        time.sleep(self.server.delay.get(route, 0))
+        with self.server.lock:
+            self.server.in_flight -= 1
+        payload = json.dumps(self.server.replies.get(route, {"stat": "Ok"})).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockNoren)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.replies = {}
+        self.delay = {}
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+@pytest.fixture
+def server():
+    srv = MockServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def run(server, fn, **options):
+    async def main():
+        client = AsyncBroker(
+            f"http://127.0.0.1:{server.server_port}/NorenWClientTP/",
+            "FT0001",
+            "token123",
+            **options,
+        )
+        try:
+            return await fn(client)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(main())
+
+
+class TestAsyncBroker:
+    def test_order_place_maps_to_noren_fields(self, server):
+        server.replies["PlaceOrder"] = {"stat": "Ok", "norenordno": "2604280001"}
+        order_id = run(
+            server,
+            lambda c: c.order_place(
+                symbol="NIFTY28APR26C25050",
+                exchange="NFO",
+                quantity=75,
+                side="SELL",
+                order_type="SL",
+                price=95.0,
+                trigger_price=95.05,
+                product="NRML",
+                tag="no_tag",
+            ),
+        )
+        assert order_id == "2604280001"
+        route, jdata, key = server.calls[0]
+        assert route == "PlaceOrder"
+        assert key == "token123"
+        assert jdata["trantype"] == "S"
+        assert jdata["prctyp"] == "SL-LMT"
+        assert jdata["prd"] == "M"
+        assert jdata["qty"] == "75"
+
+    def test_rejected_order_returns_none(self, server):
+        server.replies["PlaceOrder"] = {"stat": "Not_Ok", "emsg": "margin"}
+        order_id = run(
+            server, lambda c: c.order_place(symbol="X", quantity=75, side="BUY")
+        )
+        assert order_id is None
+
+    def test_books_are_normalized(self, server):
+        server.replies["OrderBook"] = [
+            {
+                "norenordno": "1",
+                "tsym": "NIFTY28APR26C25050",
+                "status": "OPEN",
+                "trantype": "B",
+                "qty": "75",
+                "prc": "101.05",
+            }
+        ]
+        server.replies["PositionBook"] = {"stat": "Not_Ok", "emsg": "no data"}
+
+        async def both(client):
+            return await asyncio.gather(client.orders(), client.positions())
+
+        orders, positions = run(server, both)
+        assert orders[0]["order_id"] == "1"
+        assert orders[0]["quantity"] == 75
+        assert orders[0]["price"] == 101.05
+        assert positions == []
+
+    def test_keep_alive_reuses_connection(self, server):
+        async def sequential(client):
+            for _ in range(5):
+                await client.order_cancel("1")
+
+        run(server, sequential)
+        assert len(server.calls) == 5
+        assert server.connections == 1
+
+    def test_per_host_concurrency_is_bounded(self, server):
+        server.delay["CancelOrder"] = 0.05
+
+        async def burst(client):
+            await asyncio.gather(*(client.order_cancel(str(i)) for i in range(6)))
+
+        run(server, burst, per_host=2)
+        assert len(server.calls) == 6
+        assert server.max_in_flight == 2
+        assert server.connections <= 2
+
+    def test_book_and_order_overlap(self, server):
+        server.delay["OrderBook"] = 0.2
+        server.replies["OrderBook"] = []
+        server.replies["PlaceOrder"] = {"stat": "Ok", "norenordno": "9"}
+
+        async def overlap(client):
+            book = asyncio.create_task(client.orders())
+            await asyncio.sleep(0.02)
+            started = time.perf_counter()
+            order_id = await client.order_place(symbol="X", quantity=75)
+            placed_in = time.perf_counter() - started
+            await book
+            return order_id, placed_in
+
+        order_id, placed_in = run(server, overlap)
+        assert order_id == "9"
+        assert placed_in < 0.15
+
+    def test_timeout_raises_broker_error(self, server):
+        server.delay["OrderBook"] = 0.5
+
+        async def slow(client):
+            with pytest.raises(BrokerError):
+                await client.orders()
+            return client.stats()
+
+        stats = run(server, slow, timeout=0.1)
+        assert stats["errors"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.candles import CandleCache, CandleHub, day_start
+from src.timeframes import CandleEngine
+
+KEY = "NFO|40001"
+DAY = day_start(1_776_000_000)
+OPEN = DAY + 9 * 3600 + 15 * 60
+
+
+def row(stamp, o, h, lo, c):
+    return {
+        "ssboe": str(stamp),
+        "into": f"{o:.2f}",
+        "inth": f"{h:.2f}",
+        "intl": f"{lo:.2f}",
+        "intc": f"{c:.2f}",
+    }
+
+
+class FakeHistory:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def fetch(self, exchange, token, interval=1, start=None):
+        self.calls.append(start)
+        return [r for r in self.rows if int(r["ssboe"]) >= start]
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def setup():
+    history = FakeHistory(
+        [row(OPEN + 180, 101, 103, 100, 102), row(OPEN, 100, 101, 99, 101)]
+    )
+    clock = Clock(OPEN + 200)
+    return history, clock, CandleCache(history.fetch, now=clock)
+
+
+def times(payload):
+    return [bar["time"] for bar in json.loads(payload)["data"]]
+
+
+class TestCandleCache:
+    def test_loads_once_then_answers_from_memory(self, setup):
+        history, clock, cache = setup
+        first = cache.get(KEY, 3)
+        assert times(first) == [OPEN + 180, OPEN]
+        clock.now += 60
+        assert cache.get(KEY, 3) is first
+        assert history.calls == [DAY]
+
+    def test_ticks_extend_and_close_bars(self, setup):
+        history, clock, cache = setup
+        cache.get(KEY, 3)
+        cache.on_tick(KEY, 104.0, now=OPEN + 210)
+        cache.on_tick(KEY, 98.0, now=OPEN + 370)
+        bars = json.loads(cache.get(KEY, 3))["data"]
+        assert [b["time"] for b in bars] == [OPEN + 360, OPEN + 180, OPEN]
+        assert bars[0]["open"] == 98.0
+        assert bars[1]["high"] == 104.0
+        assert bars[1]["close"] == 104.0
+
+    def test_stale_load_fetches_only_newer_bars(self, setup):
+        history, clock, cache = setup
+        cache.get(KEY, 3)
+        history.rows.insert(0, row(OPEN + 360, 102, 106, 102, 105))
+        clock.now = OPEN + 400
+        bars = json.loads(cache.get(KEY, 3))["data"]
+        assert history.calls == [DAY, OPEN + 180]
+        assert [b["close"] for b in bars] == [105.0, 102.0, 101.0]
+
+    def test_forming_bar_keeps_live_extremes(self, setup):
+        history, clock, cache = setup
+        cache.get(KEY, 3)
+        cache.on_tick(KEY, 107.0, now=OPEN + 220)
+        clock.now = OPEN + 400
+        bar = json.loads(cache.get(KEY, 3))["data"][0]
+        assert (bar["high"], bar["close"]) == (107.0, 107.0)
+
+    def test_unloaded_series_ignores_ticks(self, setup):
+        history, clock, cache = setup
+        cache.on_tick(KEY, 104.0, now=OPEN + 210)
+        assert cache.stats()["series"] == {}
+
+
+def live_engine(hub, clock, rows=()):
+    """An engine over the given one minute history feeding hub, wired like the logic app."""
+    engine = CandleEngine(lambda *args, **kwargs: list(rows), (1, 3), now=clock)
+    engine.listener = hub.on_frames
+    hub.extras, hub.forming = engine.values_at, engine.forming
+    engine.load(KEY)
+    engine.load("NFO|40002")
+    return engine
+
+
+class TestCandleHub:
+    def test_one_serialization_shared_by_subscribers(self):
+        hub = CandleHub()
+        engine = live_engine(hub, Clock(OPEN + 10))
+
+        async def main():
+            subs = [hub.subscribe(KEY, 180) for _ in range(3)]
+            for price, total in (
+                (100.0, 1000),
+                (105.0, 1010),
+                (98.0, 1025),
+                (101.0, 1030),
+            ):
+                engine.on_tick(KEY, price, {"lp": price, "v": total})
+            return [await sub.get() for sub in subs]
+
+        received = asyncio.run(main())
+        assert received[0] == received[1] == received[2]
+        assert received[0][0] is received[1][0]
+        bar = json.loads(received[0][-1])
+        assert (bar["open"], bar["high"], bar["low"], bar["close"]) == (
+            100.0,
+            105.0,
+            98.0,
+            101.0,
+        )
+        assert bar["volume"] == 30
+        assert hub.stats()["ticks"] == 4
+
+    def test_closed_bar_is_delivered_before_the_new_one(self):
+        clock = Clock(OPEN + 10)
+        hub = CandleHub()
+        engine = live_engine(hub, clock)
+
+        async def main():
+            sub = hub.subscribe(KEY, 180)
+            engine.on_tick(KEY, 100.0)
+            engine.on_tick(KEY, 103.0)
+            clock.now = OPEN + 190
+            engine.on_tick(KEY, 102.0)
+            engine.on_tick("NFO|40002", 50.0)
+            return await sub.get()
+
+        bars = [json.loads(p) for p in asyncio.run(main())]
+        assert [(b["time"], b["close"]) for b in bars] == [
+            (OPEN, 103.0),
+            (OPEN + 180, 102.0),
+        ]
+
+    def test_late_subscriber_gets_the_forming_bar(self):
+        hub = CandleHub()
+        engine = live_engine(hub, Clock(OPEN + 10))
+
+        async def main():
+            first = hub.subscribe(KEY, 180)
+            engine.on_tick(KEY, 100.0)
+            engine.on_tick(KEY, 104.0)
+            await first.get()
+            hub.unsubscribe(first)
+            second = hub.subscribe(KEY, 180)
+            return await second.get()
+
+        (payload,) = asyncio.run(main())
+        assert json.loads(payload)["high"] == 104.0
+
+    def test_first_bar_is_the_frame_built_from_history(self):
+        history = [
+            {**row(OPEN, 100, 108, 97, 101), "intv": "20"},
+            {**row(OPEN + 60, 101, 104, 99, 102), "intv": "20"},
+        ]
+        hub = CandleHub()
+        engine = live_engine(hub, Clock(OPEN + 100), history)
+        ticks, payload = hub.snapshot(KEY, 180)
+
+        async def main():
+            sub = hub.subscribe(KEY, 180)
+            engine.on_tick(KEY, 103.0)
+            await asyncio.sleep(0)
+            return sub.seq, await sub.get()
+
+        seq, payloads = asyncio.run(main())
+        assert (ticks, seq) == (0, 0)
+        assert json.loads(payload)["high"] == 108.0
+        bar = json.loads(payloads[-1])
+        assert (bar["open"], bar["high"], bar["low"], bar["close"]) == (
+            100.0,
+            108.0,
+            97.0,
+            103.0,
+        )
+        assert engine.fetches == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
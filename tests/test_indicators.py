@@ -0,0 +1,145 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.indicators import (
+    KINDS,
+    Indicator,
+    IndicatorSet,
+    indicator_name,
+    specs_from_settings,
+)
+from src.timeframes import CandleEngine, Frame
+from src.trailing import atr_from_bars
+
+SPECS = (
+    {"type": "ema", "period": 3, "price": "low"},
+    {"type": "sma", "period": 9, "price": "close"},
+    {"type": "vwap"},
+    {"type": "atr", "period": 5},
+)
+
+
+def random_bars(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = close + rng.normal(0, 0.5, n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    volume = rng.integers(0, 500, n).astype(float)
+    return np.column_stack([open_, high, low, close, volume])
+
+
+def incremental(spec, bars):
+    indicator = KINDS[spec["type"]](spec)
+    values = []
+    for i, bar in enumerate(bars):
+        if i:
+            indicator.commit(bars[i - 1])
+        value = indicator.update(bar)
+        values.append(np.nan if value is None else value)
+    return np.array(values)
+
+
+class TestIndicators:
+    @pytest.mark.parametrize("spec", SPECS, ids=indicator_name)
+    def test_incremental_matches_backfill(self, spec):
+        bars = random_bars(40)
+        backfilled = KINDS[spec["type"]](spec).backfill(bars)
+        np.testing.assert_allclose(incremental(spec, bars), backfilled, equal_nan=True)
+
+    @pytest.mark.parametrize("spec", SPECS, ids=indicator_name)
+    def test_backfill_leaves_state_for_the_forming_bar(self, spec):
+        bars = random_bars(30)
+        indicator = KINDS[spec["type"]](spec)
+        backfilled = indicator.backfill(bars)
+        assert indicator.update(bars[-1]) == pytest.approx(backfilled[-1])
+
+    def test_atr_matches_the_trail_helper(self):
+        bars = random_bars(25)
+        rows = [{"inth": h, "intl": lo, "intc": c} for _, h, lo, c, _ in bars[::-1]]
+        values = KINDS["atr"]({"type": "atr", "period": 14}).backfill(bars)
+        assert values[-1] == pytest.approx(atr_from_bars(rows, 14))
+
+    def test_ema_seeds_with_sma_like_the_chart(self):
+        bars = random_bars(5)
+        values = KINDS["ema"]({"type": "ema", "period": 3}).backfill(bars)
+        assert np.isnan(values[:2]).all()
+        assert values[2] == pytest.approx(bars[:3, 3].mean())
+        assert values[3] == pytest.approx(values[2] + 0.5 * (bars[3, 3] - values[2]))
+
+    def test_incomplete_kind_fails_when_created(self):
+        class NoBackfill(Indicator):
+            def update(self, bar):
+                return None
+
+            def commit(self, bar):
+                pass
+
+        with pytest.raises(TypeError, match="backfill"):
+            NoBackfill({"type": "sma"})
+
+    def test_settings_add_vwap_and_atr_once(self):
+        specs = specs_from_settings(
+            [{"type": "ema", "period": 3, "price": "low"}, {"type": "vwap"}]
+        )
+        assert [indicator_name(s) for s in specs] == ["ema3_low", "vwap", "atr14"]
+
+
+class TestIndicatorSet:
+    def test_ticks_match_a_backfill_of_the_same_bars(self):
+        bars = random_bars(12)
+        frame = Frame(1, SPECS)
+        start = 1_776_000_000 // 60 * 60
+        for i, bar in enumerate(bars):
+            stamp = start + 60 * i
+            o, h, lo, c, v = bar
+            for j, price in enumerate((o, h, lo, c)):
+                frame.on_tick(price, v if j == 0 else 0, stamp + j)
+        live = {
+            name: column[: frame.count].copy()
+            for name, column in frame.indicators.values.items()
+        }
+        fresh = IndicatorSet(SPECS, 20)
+        fresh.backfill(frame.ohlcv[: frame.count])
+        for name, values in live.items():
+            np.testing.assert_allclose(
+                values, fresh.values[name][: frame.count], equal_nan=True
+            )
+
+    def test_columns_are_newest_first_with_gaps_as_none(self):
+        indicators = IndicatorSet(({"type": "sma", "period": 2},), 4)
+        indicators.backfill(np.array([[1, 1, 1, 1, 0], [3, 3, 3, 3, 0]], dtype=float))
+        assert indicators.columns(2) == {"sma2_close": [2.0, None]}
+
+
+class TestEngineIndicators:
+    def test_new_spec_is_backfilled_and_stays_live(self):
+        day = 1_776_000_000 // 86400 * 86400
+        rows = [
+            {
+                "ssboe": str(day + 60 * i),
+                "into": "100",
+                "inth": str(101 + i),
+                "intl": "99",
+                "intc": "100",
+            }
+            for i in range(5)
+        ]
+        clock = {"now": day + 5 * 60 + 1}
+        engine = CandleEngine(lambda *a, **k: rows, (1,), now=lambda: clock["now"])
+        spec = {"type": "atr", "period": 3}
+        first = engine.indicator("NFO|1", 1, spec)
+        assert first is not None
+        engine.on_tick("NFO|1", 120.0)
+        assert engine.indicator("NFO|1", 1, spec) > first
+        assert "atr3" in engine.arrays("NFO|1", 1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,137 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import logtail
+from src.logtail import LineFilter, follow, tail
+
+LINES = [
+    "09:15:00 INFO started",
+    "09:15:01 DEBUG tick NIFTY 101.5",
+    "09:15:02 ERROR order rejected",
+    "Traceback (most recent call last):",
+    '  File "api.py", line 10',
+    "09:15:03 WARNING slow broker",
+    "09:15:04 DEBUG tick NIFTY 102.0",
+]
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    # small blocks so every test crosses block boundaries
+    monkeypatch.setattr(logtail, "BLOCK", 16)
+    path = tmp_path / "log.txt"
+    path.write_text("\n".join(LINES) + "\n")
+    return path
+
+
+def naive(level=None, contains=""):
+    keep = LineFilter(level, contains)
+    return [line for line in LINES if keep(line)]
+
+
+class TestTail:
+    @pytest.mark.parametrize(
+        "level, contains",
+        [(None, ""), ("WARNING", ""), ("ERROR", ""), (None, "tick"), ("INFO", "0")],
+    )
+    def test_matches_a_forward_read(self, log, level, contains):
+        for n in (1, 2, 5, 100):
+            lines, size = tail(log, n, level, contains)
+            assert lines == naive(level, contains)[-n:]
+            assert size == log.stat().st_size
+
+    def test_traceback_keeps_the_level_of_its_line(self, log):
+        lines, _ = tail(log, 10, "ERROR")
+        assert lines == LINES[2:5]
+
+    def test_reads_only_the_end_of_a_big_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "log.txt"
+        path.write_text("".join(f"09:15:00 DEBUG tick {i}\n" for i in range(50_000)))
+        reads = []
+        real_open = open
+
+        class Counting:
+            def __init__(self, *args):
+                self.f = real_open(*args)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.f.close()
+
+            def seek(self, *args):
+                return self.f.seek(*args)
+
+            def read(self, n=-1):
+                reads.append(n)
+                return self.f.read(n)
+
+        monkeypatch.setattr(logtail, "open", Counting, raising=False)
+        lines, _ = tail(path, 3)
+        assert lines[-1] == "09:15:00 DEBUG tick 49999"
+        assert sum(reads) <= logtail.BLOCK
+
+    def test_missing_file_is_empty(self, tmp_path):
+        assert tail(tmp_path / "none.txt") == ([], 0)
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+class TestFollow:
+    def test_new_lines_only_complete_and_filtered(self, log):
+        async def main():
+            lines = follow(log, level="INFO", interval=0.01)
+            task = asyncio.ensure_future(lines.__anext__())
+            await asyncio.sleep(0.03)
+            append(log, "09:16:00 DEBUG tick\n09:16:01 ERROR boom\n09:16:02 INFO par")
+            first = await asyncio.wait_for(task, 1)
+            append(log, "tial\n")
+            second = await asyncio.wait_for(lines.__anext__(), 1)
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first == ["09:16:01 ERROR boom"]
+        assert second == ["09:16:02 INFO partial"]
+
+    def test_rotated_file_starts_over(self, log):
+        async def main():
+            lines = follow(log, offset=log.stat().st_size, interval=0.01)
+            log.write_text("09:20:00 INFO fresh\n")
+            return await asyncio.wait_for(lines.__anext__(), 1)
+
+        assert asyncio.run(main()) == ["09:20:00 INFO fresh"]
+
+    def test_reads_happen_off_the_event_loop(self, log, monkeypatch):
+        on_loop = []
+        real_open = open
+
+        def checking_open(*args):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return real_open(*args)
+
+        monkeypatch.setattr(logtail, "open", checking_open, raising=False)
+
+        async def main():
+            lines = follow(log, offset=0, interval=0.01)
+            return await asyncio.wait_for(lines.__anext__(), 1)
+
+        assert asyncio.run(main()) == LINES
+        assert on_loop and not any(on_loop)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,291 @@
+import asyncio
+import base64
+import json
+import math
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import main, market
+from src.candles import CandleHub, candle_hub
+from src.market import (
+    DELTA,
+    DELTA_HEAD,
+    INDICATORS,
+    SNAPSHOT,
+    SNAPSHOT_FRAME,
+    CandleEncoder,
+    MarketSession,
+    OrderFeed,
+)
+from src.state import _logic_state
+from src.timeframes import CandleEngine
+
+KEY = "NFO|40001"
+SYMBOL = "NIFTY28APR26C25050"
+OPEN = 1_776_000_000 // 180 * 180
+NAMES = ["ema3_low", "vwap"]
+
+
+def live_engine(hub, timeframes=(3,)):
+    """An engine with no history feeding hub, wired like the logic app."""
+    engine = CandleEngine(lambda *args, **kwargs: [], timeframes, now=lambda: OPEN + 10)
+    engine.listener = hub.on_frames
+    engine.load(KEY)
+    return engine
+
+
+def decode(data, names, bars=None):
+    """What market.js does, bars keyed by channel."""
+    bars = {} if bars is None else bars
+    offset = 0
+    updates = []
+    while offset < len(data):
+        kind, channel = struct.unpack_from("<BH", data, offset)
+        if kind == SNAPSHOT:
+            _, _, stamp, o, h, lo, c, v = SNAPSHOT_FRAME.unpack_from(data, offset)
+            offset += SNAPSHOT_FRAME.size
+            bar = {
+                "time": stamp,
+                "open": o / 100,
+                "high": h / 100,
+                "low": lo / 100,
+                "close": c / 100,
+                "volume": v,
+            }
+            mask = INDICATORS
+        else:
+            _, _, mask = DELTA_HEAD.unpack_from(data, offset)
+            offset += DELTA_HEAD.size
+            bar = dict(bars[channel])
+            for bit, field in enumerate(("open", "high", "low", "close", "volume")):
+                if mask & (1 << bit):
+                    (value,) = struct.unpack_from(
+                        "<I" if bit == 4 else "<i", data, offset
+                    )
+                    bar[field] = value if bit == 4 else value / 100
+                    offset += 4
+        if mask & INDICATORS:
+            count = data[offset]
+            values = struct.unpack_from(f"<{count}f", data, offset + 1)
+            offset += 1 + 4 * count
+            bar["indicators"] = {
+                n: None if math.isnan(v) else round(v, 2)
+                for n, v in zip(names, values, strict=True)
+            }
+        bars[channel] = bar
+        updates.append((kind, channel, dict(bar)))
+    return updates
+
+
+class TestCandleEncoder:
+    def test_snapshot_then_only_changed_fields(self):
+        encoder = CandleEncoder(7, NAMES)
+        snapshot = encoder.encode(
+            OPEN,
+            [100.05, 100.05, 100.05, 100.05, 0],
+            {"ema3_low": None, "vwap": 100.05},
+        )
+        delta = encoder.encode(
+            OPEN, [100.05, 100.05, 100.05, 100.0, 0], {"ema3_low": None, "vwap": 100.05}
+        )
+        assert len(snapshot) == SNAPSHOT_FRAME.size + 1 + 4 * len(NAMES)
+        assert len(delta) == DELTA_HEAD.size + 4
+        assert delta[0] == DELTA and delta[3] == 1 << 3
+
+    def test_unchanged_bar_sends_nothing(self):
+        encoder = CandleEncoder(1, [])
+        encoder.encode(OPEN, [1.0, 1.0, 1.0, 1.0, 5])
+        assert encoder.encode(OPEN, [1.0, 1.0, 1.0, 1.0, 5]) == b""
+
+    def test_decoded_frames_rebuild_the_bars(self):
+        encoder = CandleEncoder(3, NAMES)
+        sent = [
+            (OPEN, [100.0, 101.5, 99.95, 101.0, 10], {"ema3_low": None, "vwap": 100.5}),
+            (
+                OPEN,
+                [100.0, 102.0, 99.95, 101.9, 25],
+                {"ema3_low": 99.5, "vwap": 100.75},
+            ),
+            (
+                OPEN + 180,
+                [101.9, 101.9, 101.9, 101.9, 0],
+                {"ema3_low": 99.5, "vwap": 100.75},
+            ),
+        ]
+        data = b"".join(encoder.encode(*update) for update in sent)
+        updates = decode(data, NAMES)
+        assert [kind for kind, _, _ in updates] == [SNAPSHOT, DELTA, SNAPSHOT]
+        assert updates[1][2] == {
+            "time": OPEN,
+            "open": 100.0,
+            "high": 102.0,
+            "low": 99.95,
+            "close": 101.9,
+            "volume": 25,
+            "indicators": {"ema3_low": 99.5, "vwap": 100.75},
+        }
+        assert len(data) < len(
+            json.dumps([dict(zip("ohlcv", b, strict=True)) for _, b, _ in sent])
+        )
+
+
+class TestMarketSession:
+    def test_channels_share_one_connection(self):
+        hub = CandleHub()
+        engine = live_engine(hub)
+        feed = OrderFeed()
+        messages = []
+
+        async def send_bytes(data):
+            messages.append(data)
+
+        async def send_text(text):
+            messages.append(json.loads(text))
+
+        async def main():
+            session = MarketSession(
+                send_bytes, send_text, hub, feed, {SYMBOL: KEY}.get, NAMES, default_tf=3
+            )
+            writer = asyncio.create_task(session.writer())
+            await session.handle(
+                json.dumps({"op": "subscribe", "symbol": SYMBOL, "tf": 3})
+            )
+            await session.handle(json.dumps({"op": "subscribe", "channel": "orders"}))
+            await session.handle(json.dumps({"op": "subscribe", "symbol": "NOPE"}))
+            await asyncio.sleep(0)
+            engine.on_tick(KEY, 100.0)
+            engine.on_tick(KEY, 101.0)
+            feed.on_order_update({"order_id": "9", "status": "OPEN"})
+            await asyncio.sleep(0.05)
+            session.close()
+            writer.cancel()
+            return session
+
+        session = asyncio.run(main())
+        texts = [m for m in messages if isinstance(m, dict)]
+        assert texts[0] == {
+            "op": "subscribed",
+            "id": 1,
+            "channel": "candles",
+            "symbol": SYMBOL,
+            "tf": 3,
+            "indicators": NAMES,
+        }
+        assert texts[1] == {"op": "subscribed", "id": 2, "channel": "orders"}
+        assert texts[2]["op"] == "error"
+        assert {"op": "order", "data": {"order_id": "9", "status": "OPEN"}} in texts
+        frames = b"".join(m for m in messages if isinstance(m, bytes))
+        bar = decode(frames, NAMES)[-1][2]
+        assert (bar["open"], bar["high"], bar["close"]) == (100.0, 101.0, 101.0)
+        assert session.sent_bytes == len(frames)
+        assert hub.stats()["live"] == {f"{KEY}@180s": 0}
+
+    def test_slow_client_gets_conflated_frames(self):
+        hub = CandleHub()
+        engine = live_engine(hub)
+        release = asyncio.Event()
+        sent = []
+
+        async def send_bytes(data):
+            await release.wait()
+            sent.append(data)
+
+        async def send_text(text):
+            sent.append(json.loads(text))
+
+        async def main():
+            session = MarketSession(
+                send_bytes, send_text, hub, OrderFeed(), {SYMBOL: KEY}.get, []
+            )
+            writer = asyncio.create_task(session.writer())
+            session.subscribe({"symbol": SYMBOL, "tf": 3})
+            await asyncio.sleep(0)
+            for i in range(200):
+                engine.on_tick(KEY, 100.0 + i)
+                await asyncio.sleep(0)
+            queued = session._outbox.qsize()
+            release.set()
+            await asyncio.sleep(0.05)
+            session.close()
+            writer.cancel()
+            return queued
+
+        queued = asyncio.run(main())
+        frames = b"".join(m for m in sent if isinstance(m, bytes))
+        updates = decode(frames, [])
+        assert queued <= 1
+        assert len(updates) < 5
+        assert updates[-1][2]["close"] == 299.0
+
+    def test_unsent_orders_beyond_the_limit_drop_the_client(self, monkeypatch):
+        monkeypatch.setattr(market, "MAX_PENDING", 3)
+        feed = OrderFeed()
+
+        async def never(data):
+            await asyncio.Event().wait()
+
+        async def main():
+            session = MarketSession(never, never, CandleHub(), feed, {}.get, [])
+            writer = asyncio.create_task(session.writer())
+            session.subscribe({"channel": "orders"})
+            for i in range(10):
+                feed.on_order_update({"order_id": str(i)})
+            await asyncio.sleep(0.01)
+            session.close()
+            writer.cancel()
+            return session
+
+        session = asyncio.run(main())
+        assert session.overflowed
+        assert session._outbox.qsize() <= 3
+
+
+class TestMarketEndpoint:
+    def test_subscribe_and_receive_a_snapshot(self, monkeypatch):
+        monkeypatch.setattr(_logic_state, "tokens_nearest", {KEY: SYMBOL})
+        engine = live_engine(candle_hub, (1,))
+        client = TestClient(main.app)
+        with client.websocket_connect("/ws/market") as socket:
+            socket.send_text(json.dumps({"op": "subscribe", "symbol": SYMBOL, "tf": 1}))
+            ack = json.loads(socket.receive_text())
+            engine.on_tick(KEY, 250.5)
+            kind, channel, bar = decode(socket.receive_bytes(), ack["indicators"])[0]
+        assert ack["id"] == channel
+        assert kind == SNAPSHOT
+        assert bar["close"] == 250.5
+        candle_hub.clear()
+
+    def test_socket_needs_the_same_auth_as_http(self, monkeypatch):
+        from starlette.websockets import WebSocketDisconnect
+
+        monkeypatch.setenv("HTTP_AUTH", "u:p")
+        client = TestClient(main.app)
+        assert client.get("/api/symbols").status_code == 401
+        with (
+            pytest.raises(WebSocketDisconnect) as refused,
+            client.websocket_connect("/ws/market"),
+        ):
+            pass
+        assert refused.value.code == 1008
+        good = {"Authorization": "Basic " + base64.b64encode(b"u:p").decode()}
+        with (
+            pytest.raises(WebSocketDisconnect),
+            client.websocket_connect(
+                "/ws/market", headers={**good, "Origin": "http://evil.example"}
+            ),
+        ):
+            pass
+        with client.websocket_connect("/ws/market", headers=good) as socket:
+            socket.send_text(json.dumps({"op": "subscribe", "channel": "orders"}))
+            assert json.loads(socket.receive_text())["op"] == "subscribed"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
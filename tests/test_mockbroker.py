@@ -0,0 +1,159 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.brokerclient import AsyncBroker
+from src.mockbroker import Mock, MockBrokerError, serve
+from src.wserver import Wserver
+
+SYMBOL = "NIFTY28APR26C25050"
+
+
+@pytest.fixture
+def mock():
+    broker = Mock(prices={SYMBOL: 100.0})
+    yield broker
+    broker.broker.close_websocket()
+
+
+def buy_stop(mock, trigger=105.0):
+    return mock.order_place(
+        symbol=SYMBOL,
+        exchange="NFO",
+        quantity=75,
+        side="BUY",
+        order_type="SL",
+        price=trigger + 0.05,
+        trigger_price=trigger,
+        product="NRML",
+        tag="no_tag",
+    )
+
+
+def status(mock, order_id):
+    return next(o for o in mock.orders if o["order_id"] == order_id)["status"]
+
+
+class TestEngine:
+    def test_stop_rests_until_price_crosses(self, mock):
+        order_id = buy_stop(mock)
+        assert status(mock, order_id) == "TRIGGER_PENDING"
+        mock.engine.set_price(SYMBOL, 104.0)
+        assert status(mock, order_id) == "TRIGGER_PENDING"
+        mock.engine.set_price(SYMBOL, 106.0)
+        row = next(o for o in mock.orders if o["order_id"] == order_id)
+        assert row["status"] == "COMPLETE"
+        assert row["average_price"] == 105.0
+
+    def test_positions_and_pnl(self, mock):
+        mock.order_place(symbol=SYMBOL, quantity=75, side="BUY", order_type="MKT")
+        mock.engine.set_price(SYMBOL, 110.0)
+        position = mock.positions[0]
+        assert position["quantity"] == 75
+        assert position["urmtom"] == 750.0
+        mock.order_place(
+            symbol=SYMBOL, quantity=75, side="SELL", order_type="LMT", price=109.0
+        )
+        position = mock.positions[0]
+        assert position["quantity"] == 0
+        assert position["rpnl"] == 750.0
+
+    def test_modify_and_cancel(self, mock):
+        order_id = buy_stop(mock)
+        resp = mock.order_modify(
+            order_id=order_id, symbol=SYMBOL, quantity=75, order_type="LMT", price=101.0
+        )
+        assert resp["stat"] == "Ok"
+        mock.engine.set_price(SYMBOL, 100.5)
+        assert status(mock, order_id) == "COMPLETE"
+        assert mock.order_cancel(order_id)["stat"] == "Not_Ok"
+
+        order_id = buy_stop(mock)
+        assert mock.order_cancel(order_id)["stat"] == "Ok"
+        assert status(mock, order_id) == "CANCELED"
+
+    def test_history_from_ticks(self, mock):
+        start = 1_700_000_040
+        for i, price in enumerate([100, 102, 99, 101, 103]):
+            mock.engine.set_price(SYMBOL, price, now=start + i * 20)
+        key = mock.engine.symbols[SYMBOL]
+        exchange, token = key.split("|")
+        rows = mock.broker.get_time_price_series(
+            exchange, token, start, start + 120, interval=1
+        )
+        assert [r["intc"] for r in rows] == ["103.00", "99.00"]
+        assert rows[1]["inth"] == "102.00"
+
+
+class TestInjection:
+    def test_latency(self):
+        broker = Mock(latency=0.05, prices={SYMBOL: 100.0})
+        started = time.monotonic()
+        assert broker.orders == []
+        assert time.monotonic() - started >= 0.05
+
+    def test_errors_and_rejects(self):
+        broker = Mock(error_rate=1.0)
+        with pytest.raises(MockBrokerError):
+            broker.authenticate()
+        broker = Mock(reject_rate=1.0, prices={SYMBOL: 100.0})
+        order_id = buy_stop(broker)
+        assert status(broker, order_id) == "REJECTED"
+
+
+class TestWebsocket:
+    def test_wserver_gets_quotes_and_order_updates(self, mock):
+        ws = Wserver(mock, ["NFO|26000"])
+        updates = []
+        ws.add_order_listener(updates.append)
+        deadline = time.monotonic() + 2
+        while not ws.socket_opened and time.monotonic() < deadline:
+            time.sleep(0.005)
+        key = mock.engine.symbols[SYMBOL]
+        ws.subscribe([key])
+        order_id = buy_stop(mock)
+        mock.engine.set_price(SYMBOL, 106.0)
+        mock.engine.drain()
+        assert ws.ltp[key] == 106.0
+        assert [u["status"] for u in updates] == ["TRIGGER_PENDING", "OPEN", "COMPLETE"]
+        assert updates[-1]["order_id"] == order_id
+        assert updates[-1]["side"] == "B"
+        assert updates[-1]["fill_price"] == 105.0
+
+
+class TestServer:
+    def test_async_client_over_localhost(self, mock):
+        server = serve(mock)
+
+        async def main():
+            client = AsyncBroker(server.url, "MOCK", "token")
+            try:
+                order_id = await client.order_place(
+                    symbol=SYMBOL,
+                    quantity=75,
+                    side="BUY",
+                    order_type="LMT",
+                    price=100.0,
+                )
+                return order_id, await client.orders(), await client.positions()
+            finally:
+                await client.aclose()
+
+        try:
+            order_id, orders, positions = asyncio.run(main())
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert orders[0]["order_id"] == order_id
+        assert orders[0]["status"] == "COMPLETE"
+        assert positions[0]["quantity"] == 75
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
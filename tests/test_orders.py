@@ -0,0 +1,135 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import main
+from src.constants import O_FUTL
+from src.orders import FileWriter, OrderTemplate, build_templates
+from src.paper import Paper
+from src.state import _logic_state
+
+KEY = "NFO|40001"
+SYMBOL = "NIFTY28APR26C25050"
+
+
+class TestOrderTemplate:
+    def test_only_prices_are_filled_in(self):
+        templates = build_templates({KEY: SYMBOL}, {"option_exchange": "NFO"}, 75)
+        template = templates[SYMBOL]
+        order = template.entry(price=100.05, trigger_price=100.0, order_type="SL")
+        assert order == {
+            "symbol": SYMBOL,
+            "quantity": 75,
+            "disclosed_quantity": 0,
+            "exchange": "NFO",
+            "product": "NRML",
+            "tag": "no_tag",
+            "side": "BUY",
+            "price": 100.05,
+            "trigger_price": 100.0,
+            "order_type": "SL",
+        }
+        order["quantity"] = 1
+        assert template.entry(price=1).get("quantity") == 75
+
+    def test_trade_record(self):
+        trade = OrderTemplate(SYMBOL, "NFO", 75, "NRML").trade(
+            "9001", 95.0, 110.0, tag="scalp"
+        )
+        assert trade["entry_id"] == "9001"
+        assert trade["tag"] == "scalp"
+        assert "side" not in trade and "price" not in trade
+
+
+class TestFileWriter:
+    def test_latest_content_wins_and_is_readable_before_disk(
+        self, monkeypatch, tmp_path
+    ):
+        written = []
+        gate = threading.Event()
+
+        def slow_write(filepath, content):
+            gate.wait(2)
+            written.append(content)
+
+        monkeypatch.setattr(O_FUTL, "write_file", slow_write)
+        writer = FileWriter()
+        target = str(tmp_path / "trade.json")
+        writer.write(target, {"entry_id": "1"})
+        writer.write(target, {"entry_id": "2"})
+        assert writer.read(target) == {"entry_id": "2"}
+        gate.set()
+        assert writer.flush()
+        assert written[-1] == {"entry_id": "2"}
+        assert len(written) <= 2
+
+
+class TestBuyEndpoint:
+    def test_entry_from_template_with_latency(self, monkeypatch, tmp_path):
+        paper = Paper()
+        paper.watch({KEY: SYMBOL})
+        paper.on_tick(KEY, 100.0)
+        monkeypatch.setattr(_logic_state, "helper", paper)
+        monkeypatch.setattr(
+            _logic_state, "templates", build_templates({KEY: SYMBOL}, {}, 75)
+        )
+        monkeypatch.setattr(_logic_state, "runner", None)
+        monkeypatch.setattr(main, "TRADE_JSON", str(tmp_path / "trade.json"))
+        monkeypatch.setattr(main.file_writer, "write", lambda path, content: None)
+        client = TestClient(main.app)
+        body = {
+            "symbol": SYMBOL,
+            "ltp": 100.0,
+            "price": 98.0,
+            "trigger_price": 0,
+            "order_type": "LIMIT",
+            "exit_price": 95.0,
+            "target_price": 110.0,
+        }
+        first = client.post("/api/trade/buy", json=body).json()
+        resp = client.post("/api/trade/buy", json=body)
+        data = resp.json()
+        assert data["status"] == "success"
+        assert data["order"]["quantity"] == 75
+        assert data["order"]["exit_price"] == 95.0
+        assert data["latency_ms"] >= 0
+        assert resp.headers["Server-Timing"].startswith("handler;dur=")
+        # the earlier resting entry was cancelled once the response was out
+        assert paper.order_book().get(first["order"]["entry_id"]).status == "CANCELED"
+
+    def test_missing_exit_or_busy_runner_places_nothing(self, monkeypatch, tmp_path):
+        from src.tickrunner import TickRunner
+
+        paper = Paper()
+        paper.watch({KEY: SYMBOL})
+        paper.on_tick(KEY, 100.0)
+        runner = TickRunner.__new__(TickRunner)
+        runner.fn, runner.entry_id = "exit_trade", "9001"
+        monkeypatch.setattr(_logic_state, "helper", paper)
+        monkeypatch.setattr(
+            _logic_state, "templates", build_templates({KEY: SYMBOL}, {}, 75)
+        )
+        monkeypatch.setattr(_logic_state, "runner", None)
+        client = TestClient(main.app)
+        body = {
+            "symbol": SYMBOL,
+            "price": 98.0,
+            "order_type": "LIMIT",
+            "target_price": 110.0,
+        }
+        assert client.post("/api/trade/buy", json=body).json()["status"] == "failed"
+        monkeypatch.setattr(_logic_state, "runner", runner)
+        busy = client.post("/api/trade/buy", json={**body, "exit_price": 95.0})
+        assert busy.status_code == 409
+        assert paper.orders() == []
+        assert runner.entry_id == "9001"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
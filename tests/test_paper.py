@@ -0,0 +1,119 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.api import Helper
+from src.bracket import BracketManager
+from src.paper import Paper
+from src.tickrunner import TickRunner
+
+KEY = "NFO|40001"
+SYMBOL = "NIFTY28APR26C25050"
+
+
+class FakeWs:
+    def __init__(self):
+        self.ltp = {}
+        self.tick_listeners = []
+
+    def add_tick_listener(self, listener):
+        self.tick_listeners.append(listener)
+
+    def tick(self, key, price):
+        self.ltp[key] = price
+        for listener in self.tick_listeners:
+            listener(key, price, {})
+
+
+@pytest.fixture
+def paper():
+    broker = Paper()
+    broker.watch({KEY: SYMBOL})
+    return broker
+
+
+def buy(paper, order_type="LMT", price=100.0, trigger=0.0):
+    return paper.one_side(
+        {
+            "symbol": SYMBOL,
+            "exchange": "NFO",
+            "quantity": 75,
+            "side": "BUY",
+            "order_type": order_type,
+            "price": price,
+            "trigger_price": trigger,
+        }
+    )
+
+
+class TestPaper:
+    def test_fills_on_ticks_into_own_books(self, paper):
+        paper.on_tick(KEY, 101.0)
+        order_id = buy(paper, price=100.0)
+        assert paper.order_book().get(order_id).status == "OPEN"
+        paper.on_tick(KEY, 99.5)
+        record = paper.order_book().get(order_id)
+        assert record.status == "COMPLETE"
+        assert record.average_price == 100.0
+        paper.on_tick(KEY, 104.0)
+        positions, count, m2m, realized = paper.position_summary()
+        assert (count, m2m, realized) == (1, 300.0, 0.0)
+        assert positions[0]["symbol"] == SYMBOL
+
+    def test_cancel_and_close(self, paper):
+        paper.on_tick(KEY, 100.0)
+        buy(paper, order_type="MKT")
+        resting = buy(paper, order_type="SL", price=110.05, trigger=110.0)
+        paper.on_tick(KEY, 103.0)
+        paper.close_all_for_symbol(SYMBOL, ltp=103.0)
+        assert paper.order_book().get(resting).status == "CANCELED"
+        summary = paper.summary()
+        assert summary["position_count"] == 0
+        assert summary["active_orders"] == 0
+        assert summary["realized_pnl"] > 0
+
+    def test_runner_trades_paper_without_broker(self, paper, monkeypatch, tmp_path):
+        calls = []
+        for name in ("one_side", "modify_order", "order_cancel", "order_book"):
+            monkeypatch.setattr(Helper, name, lambda *a, _n=name: calls.append(_n))
+        ws = FakeWs()
+        ws.add_tick_listener(paper.on_tick)
+        runner = TickRunner(
+            ws,
+            {KEY: SYMBOL},
+            helper=paper,
+            bracket_manager=BracketManager(helper=paper),
+            trade_file=str(tmp_path / "paper_trade.json"),
+        )
+        ws.tick(KEY, 100.0)
+        runner.entry_id = buy(paper, order_type="MKT")
+        runner.symbol, runner.quantity, runner.exchange = SYMBOL, 75, "NFO"
+        runner.exit_price, runner.target_price = 95.0, 110.0
+        runner.fn = "is_trade"
+        runner.run_state_machine()
+        assert runner.fn == "exit_trade"
+        stop = paper.order_book().get(runner.exit_id)
+        assert stop.status == "TRIGGER_PENDING"
+        ws.tick(KEY, 94.0)
+        runner.run_state_machine()
+        assert runner.fn == "create"
+        assert paper.mtm() == pytest.approx(75 * (95.0 - 100.0), abs=75 * 0.25)
+        assert calls == []
+
+    def test_ticks_are_cheap(self, paper):
+        paper.on_tick(KEY, 100.0)
+        for i in range(50):
+            buy(paper, price=90.0 - i * 0.05)
+        started = time.perf_counter()
+        for i in range(2000):
+            paper.on_tick(KEY, 100.0 + (i % 10) * 0.05)
+        assert time.perf_counter() - started < 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
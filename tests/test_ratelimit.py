@@ -0,0 +1,82 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.ratelimit import RateLimiter
+
+
+def drain(limiter):
+    while limiter.acquire("exit", timeout=0):
+        pass
+
+
+class TestRateLimiter:
+    def test_burst_is_granted_without_waiting(self):
+        limiter = RateLimiter(rate=5, burst=3)
+        started = time.monotonic()
+        for _ in range(3):
+            assert limiter.acquire("book")
+        assert time.monotonic() - started < 0.05
+        assert limiter.stats()["queues"]["book"]["granted"] == 3
+
+    def test_timeout_gives_up_and_leaves_queue(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        drain(limiter)
+        assert not limiter.acquire("history", timeout=0.05)
+        stats = limiter.stats()
+        assert stats["queues"]["history"]["timeouts"] == 1
+        assert limiter.depth() == 0
+
+    def test_exit_overtakes_queued_ui_calls(self):
+        limiter = RateLimiter(rate=20, burst=1)
+        drain(limiter)
+        order = []
+
+        def call(priority):
+            limiter.acquire(priority)
+            order.append(priority)
+
+        threads = [
+            threading.Thread(target=call, args=(p,))
+            for p in ("history", "history", "book", "entry")
+        ]
+        for t in threads:
+            t.start()
+        while limiter.depth() < 4:
+            time.sleep(0.001)
+        exit_thread = threading.Thread(target=call, args=("exit",))
+        exit_thread.start()
+        for t in [*threads, exit_thread]:
+            t.join(2)
+        assert order[0] == "exit"
+        assert order[1:] == ["entry", "book", "history", "history"]
+
+    def test_async_waiters_share_the_bucket(self):
+        limiter = RateLimiter(rate=50, burst=2)
+
+        async def main():
+            started = time.monotonic()
+            await asyncio.gather(*(limiter.acquire_async("entry") for _ in range(6)))
+            return time.monotonic() - started
+
+        elapsed = asyncio.run(main())
+        # two from the burst, four refilled at 50 per second
+        assert 0.06 <= elapsed < 0.5
+        stats = limiter.stats()["queues"]["entry"]
+        assert stats["granted"] == 6
+        assert stats["max_wait_ms"] >= 60
+
+    def test_unknown_priority_rejected(self):
+        with pytest.raises(ValueError):
+            RateLimiter().acquire("ui")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
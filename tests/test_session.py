@@ -0,0 +1,89 @@
+import os
+import stat
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import session
+
+
+class FakeNoren:
+    def __init__(self, valid=True):
+        self._NorenApi__service_config = {"host": "https://broker.test/NorenWClientTP/"}
+        self._NorenApi__username = None
+        self._NorenApi__susertoken = None
+        self.valid = valid
+        self.limits_calls = 0
+
+    def set_session(self, userid, password, usertoken):
+        self._NorenApi__username = userid
+        self._NorenApi__susertoken = usertoken
+
+    def get_limits(self):
+        self.limits_calls += 1
+        return (
+            {"stat": "Ok"}
+            if self.valid
+            else {"stat": "Not_Ok", "emsg": "Session Expired"}
+        )
+
+
+class FakeSession:
+    def __init__(self, valid=True):
+        self.broker = FakeNoren(valid)
+
+
+@pytest.fixture
+def file(tmp_path):
+    return str(tmp_path / "session.json")
+
+
+def logged_in():
+    api = FakeSession()
+    api.broker.set_session("FT0001", "", "token123")
+    return api
+
+
+class TestSession:
+    def test_saved_owner_only(self, file):
+        assert session.save(logged_in(), "flattrade", 3600, file)
+        assert stat.S_IMODE(os.stat(file).st_mode) == 0o600
+        saved = session.load("flattrade", file)
+        assert saved["token"] == "token123"
+        assert saved["expires_at"] - saved["created_at"] == pytest.approx(3600)
+
+    def test_nothing_saved_without_token(self, file):
+        assert not session.save(FakeSession(), "flattrade", 3600, file)
+        assert session.load("flattrade", file) is None
+
+    def test_expired_or_other_broker_ignored(self, file):
+        session.save(logged_in(), "flattrade", 3600, file)
+        assert session.load("finvasia", file) is None
+        session.save(logged_in(), "flattrade", -1, file)
+        assert session.load("flattrade", file) is None
+
+    def test_restore_validates_with_one_call(self, file):
+        session.save(logged_in(), "flattrade", 3600, file)
+        api = FakeSession()
+        assert session.restore(api, "flattrade", file)
+        assert api.broker._NorenApi__susertoken == "token123"
+        assert api.broker.limits_calls == 1
+        assert session.credentials(api)["uid"] == "FT0001"
+
+    def test_rejected_token_is_forgotten(self, file):
+        session.save(logged_in(), "flattrade", 3600, file)
+        assert not session.restore(FakeSession(valid=False), "flattrade", file)
+        assert not os.path.exists(file)
+
+    def test_created_at_survives_restart(self, file):
+        session.save(logged_in(), "flattrade", 3600, file)
+        assert session.created_at("flattrade", file) <= time.time()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import main
+from src.candles import CandleHub
+from src.market import OrderFeed
+from src.state import _logic_state
+from src.stream import Producer, StreamSession
+from src.timeframes import CandleEngine
+
+KEY = "NFO|40001"
+SYMBOL = "NIFTY28APR26C25050"
+OPEN = 1_776_000_000 // 180 * 180
+
+
+class TestProducer:
+    def test_reads_only_while_listened_and_publishes_changes(self):
+        state = {"value": 1}
+        got = []
+
+        def read():
+            return state["value"], str(state["value"])
+
+        async def run():
+            producer = Producer("summary", read, 0.01)
+
+            def deliver(name, payload):
+                got.append((name, payload))
+
+            producer.subscribe(deliver)
+            await asyncio.sleep(0.035)
+            state["value"] = 2
+            await asyncio.sleep(0.03)
+            producer.unsubscribe(deliver)
+            reads = producer.reads
+            await asyncio.sleep(0.03)
+            return producer, reads
+
+        producer, reads = asyncio.run(run())
+        assert got == [("summary", "1"), ("summary", "2")]
+        assert producer.reads == reads
+
+    def test_late_listener_gets_the_latest_at_once(self):
+        async def run():
+            producer = Producer("status", lambda: ("a", "a"), 0.01)
+            producer.subscribe(lambda *_: None)
+            await asyncio.sleep(0.02)
+            got = []
+            producer.subscribe(lambda name, payload: got.append(payload))
+            return got
+
+        assert asyncio.run(run()) == ["a"]
+
+
+class TestStreamSession:
+    def test_topics_share_one_inbox(self):
+        hub = CandleHub()
+        engine = CandleEngine(lambda *args, **kwargs: [], (3,), now=lambda: OPEN + 10)
+        engine.listener = hub.on_frames
+        engine.load(KEY)
+        feed = OrderFeed()
+        status = {"value": "1"}
+        producers = {
+            "status": Producer(
+                "status", lambda: (status["value"], status["value"]), 0.01
+            )
+        }
+
+        async def run():
+            session = StreamSession(hub, feed, producers, {SYMBOL: KEY}.get)
+            rejected = session.subscribe(
+                [SYMBOL, "NOPE"], ["orders", "status", "bogus"], 3
+            )
+            await asyncio.sleep(0.02)
+            engine.on_tick(KEY, 100.0)
+            engine.on_tick(KEY, 101.0)
+            feed.on_order_update({"order_id": "1"})
+            feed.on_order_update({"order_id": "2"})
+            status["value"] = "2"
+            await asyncio.sleep(0.03)
+            events = await session.get()
+            session.close()
+            return rejected, events
+
+        rejected, events = asyncio.run(run())
+        assert rejected == ["NOPE", "bogus"]
+        candles = [json.loads(data) for event, data in events if event == "candle"]
+        # both ticks of the bar conflate into one payload
+        assert len(candles) == 1
+        assert candles[0]["symbol"] == SYMBOL
+        assert candles[0]["candle"]["close"] == 101.0
+        orders = [
+            json.loads(data)["data"]["order_id"]
+            for event, data in events
+            if event == "order"
+        ]
+        assert orders == ["1", "2"]
+        assert [data for event, data in events if event == "status"] == ["2"]
+        assert hub.stats()["live"] == {f"{KEY}@180s": 0}
+
+
+class TestStreamEndpoint:
+    def test_pause_and_stop_are_pushed_without_ending_the_stream(self, monkeypatch):
+        monkeypatch.setattr(_logic_state, "running", True)
+        monkeypatch.setattr(_logic_state, "paused", True)
+        producers = {"status": Producer("status", main.read_status, 0.01)}
+        monkeypatch.setattr(main, "STREAM_PRODUCERS", producers)
+
+        async def run():
+            response = await main.stream_topics(None, topics="status,nope")
+            events = response.body_iterator
+            got = [await asyncio.wait_for(events.__anext__(), 1) for _ in range(3)]
+            _logic_state.running, _logic_state.paused = False, False
+            got.append(await asyncio.wait_for(events.__anext__(), 1))
+            # still open, a restart is pushed on the same connection
+            _logic_state.running = True
+            got.append(await asyncio.wait_for(events.__anext__(), 1))
+            await events.aclose()
+            return got
+
+        got = asyncio.run(run())
+        assert [event["event"] for event in got] == [
+            "error",
+            "ready",
+            "status",
+            "status",
+            "status",
+        ]
+        states = [json.loads(event["data"]) for event in got[2:]]
+        assert [(s["running"], s["paused"]) for s in states] == [
+            (False, True),
+            (False, False),
+            (True, False),
+        ]
+
+
+class TestBootstrapEndpoint:
+    def test_one_gzipped_response_for_every_chart(self, monkeypatch):
+        from src.api import Helper
+
+        history = b'{"data": [{"time": 1, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 0}]}'
+        monkeypatch.setattr(_logic_state, "tokens_nearest", {KEY: SYMBOL})
+        monkeypatch.setattr(Helper, "candles", lambda key, tf: history)
+        monkeypatch.setattr(main, "chart_settings", lambda: {"ma": [], "timeframe": 3})
+        monkeypatch.setattr(
+            main.candle_hub,
+            "forming",
+            lambda key, minutes: (OPEN, [1.0, 2.0, 0.5, 1.5, 9.0]),
+        )
+        client = TestClient(main.app)
+        response = client.get(
+            "/api/bootstrap?tf=3", headers={"Accept-Encoding": "gzip"}
+        )
+        main.candle_hub.clear()
+        assert response.headers["content-encoding"] == "gzip"
+        boot = response.json()
+        assert boot["symbols"] == [SYMBOL]
+        assert boot["seq"] == main.candle_hub.ticks
+        chart = boot["charts"][SYMBOL]
+        assert chart["history"]["data"][0]["time"] == 1
+        assert (chart["live"]["time"], chart["live"]["high"]) == (OPEN, 2.0)
+        assert boot["settings"]["timeframe"] == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
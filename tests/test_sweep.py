@@ -0,0 +1,135 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.backtest import Backtest, Bars
+from src.sweep import (
+    Leaderboard,
+    apply_params,
+    grid,
+    load_shared,
+    random_search,
+    share_chain,
+)
+
+DAY_START = 1745206200  # 2025-04-21 09:15 IST
+
+
+def make_bars(symbol, rows):
+    times = [DAY_START + 60 * n for n in range(len(rows))]
+    o, h, lo, c = zip(*rows, strict=True)
+    return Bars(symbol, times, o, h, lo, c, [10 * n for n in range(len(rows))])
+
+
+@pytest.fixture
+def chain():
+    return {
+        "NIFTY24APR25C24000": make_bars(
+            "NIFTY24APR25C24000",
+            [
+                (100, 101, 99, 100),
+                (100, 102, 100, 101.5),
+                (102, 106, 102, 105.5),
+                (104, 104, 100, 100.5),
+                (101, 104.5, 101, 102),
+                (102, 102, 98, 98.5),
+            ],
+        ),
+        "NIFTY24APR25P24000": make_bars(
+            "NIFTY24APR25P24000",
+            [(300 - n, 300 - n, 299 - n, 299 - n) for n in range(6)],
+        ),
+    }
+
+
+class TestParams:
+    def test_grid_is_every_combination_in_order(self):
+        combos = list(grid({"profit": [1, 2], "trail.value": [3, 5, 7]}))
+        assert len(combos) == 6
+        assert combos[0] == {"profit": 1, "trail.value": 3}
+        assert combos[-1] == {"profit": 2, "trail.value": 7}
+
+    def test_random_search_is_seeded_and_in_range(self):
+        spec = {"lots": (1, 3), "profit": (1.0, 2.0), "bracket": [True, False]}
+        first = list(random_search(spec, 20, seed=3))
+        assert first == list(random_search(spec, 20, seed=3))
+        for params in first:
+            assert isinstance(params["lots"], int) and 1 <= params["lots"] <= 3
+            assert 1.0 <= params["profit"] <= 2.0
+            assert params["bracket"] in (True, False)
+
+    def test_apply_params_reaches_nested_keys_without_touching_base(self):
+        base = {"profit": 1, "trail": {"type": "atr", "value": 3}}
+        settings = apply_params(
+            base, {"profit": 2, "trail.value": 5, "bracket.on": True}
+        )
+        assert settings == {
+            "profit": 2,
+            "trail": {"type": "atr", "value": 5},
+            "bracket": {"on": True},
+        }
+        assert base == {"profit": 1, "trail": {"type": "atr", "value": 3}}
+
+
+class TestSharedChain:
+    def test_memory_mapped_round_trip(self, chain, tmp_path):
+        shared = load_shared(share_chain(chain, str(tmp_path / "chain")))
+        assert list(shared) == list(chain)
+        for symbol, bars in chain.items():
+            loaded = shared[symbol]
+            assert isinstance(loaded.close.base, np.memmap) or isinstance(
+                loaded.close, np.memmap
+            )
+            for field in ("time", "open", "high", "low", "close", "volume"):
+                assert np.array_equal(getattr(loaded, field), getattr(bars, field))
+
+
+class TestLeaderboard:
+    def test_rows_stay_ranked_best_first(self):
+        board = Leaderboard("pnl")
+        assert board.add({"profit": 1}, {"pnl": 10.0}) == 0
+        assert board.add({"profit": 2}, {"pnl": 30.0}) == 0
+        assert board.add({"profit": 3}, {"pnl": 20.0}) == 1
+        # ties keep arrival order
+        assert board.add({"profit": 4}, {"pnl": 20.0}) == 2
+        assert [row["profit"] for row in board.top(3)] == [2, 3, 4]
+        assert list(board.to_frame()["pnl"]) == [30.0, 20.0, 20.0, 10.0]
+
+
+class TestSweep:
+    def test_two_workers_match_a_serial_run(self, chain, tmp_path):
+        # the pool pickles _run_batch by name, take the module conftest re-imported
+        from src.sweep import sweep
+
+        directory = share_chain(chain, str(tmp_path / "chain"))
+        base = {"premium": 100, "lot_size": 75}
+        combos = list(grid({"profit": [1, 2, 3], "lots": [1, 2]}))
+        rows = []
+        for board, row in sweep(directory, base, combos, workers=2, batch_size=2):
+            assert row in board.rows
+            rows.append(row)
+        assert len(rows) == len(board.rows) == len(combos)
+
+        expected = {
+            (p["profit"], p["lots"]): Backtest(chain, apply_params(base, p))
+            .run()
+            .summary()
+            for p in combos
+        }
+        for row in board.rows:
+            assert {
+                k: row[k] for k in ("trades", "pnl", "max_drawdown", "win_rate")
+            } == expected[(row["profit"], row["lots"])]
+        pnls = [row["pnl"] for row in board.rows]
+        assert len(set(pnls)) > 1
+        assert pnls == sorted(pnls, reverse=True)
+        assert pnls[0] == max(summary["pnl"] for summary in expected.values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,15 +1,17 @@
-import pytest
 import sys
 from pathlib import Path
 from unittest.mock import MagicMock
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 # Must import from project root
-from src.tickrunner import TickRunner
 from src.api import Helper
 from src.constants import O_FUTL
+from src.orders import file_writer
+from src.tickrunner import TickRunner
 
 
 @pytest.fixture(autouse=True)
@@ -45,18 +47,18 @@ def setup_mocks():
     Helper.one_side = MagicMock(return_value="")
     Helper.modify_order = MagicMock(return_value="")
     Helper._api = MagicMock()
-    
+
     # Mock O_FUTL
     O_FUTL.read_file = MagicMock(return_value={})
     O_FUTL.write_file = MagicMock(return_value=None)
-    
+
     yield
 
 
 class TestTickRunner:
     def test_create_clears_when_no_trade(self, mock_wserver, tokens_nearest):
         O_FUTL.read_file.return_value = {}
-        
+
         runner = TickRunner(mock_wserver, tokens_nearest)
         assert runner.entry_id == ""
         assert runner.fn == "create"
@@ -72,7 +74,9 @@ class TestTickRunner:
             "target_price": 56.4,
         }
         O_FUTL.read_file.return_value = trade_data
-        Helper.orders.return_value = [{"order_id": "26042100278879", "status": "REJECTED"}]
+        Helper.orders.return_value = [
+            {"order_id": "26042100278879", "status": "REJECTED"}
+        ]
 
         runner = TickRunner(mock_wserver, tokens_nearest)
         runner.run_state_machine()
@@ -92,7 +96,9 @@ class TestTickRunner:
             "target_price": 56.4,
         }
         O_FUTL.read_file.return_value = trade_data
-        Helper.orders.return_value = [{"order_id": "26042100278880", "status": "COMPLETE"}]
+        Helper.orders.return_value = [
+            {"order_id": "26042100278880", "status": "COMPLETE"}
+        ]
 
         runner = TickRunner(mock_wserver, tokens_nearest)
         runner.exit_id = "26042100278880"
@@ -104,6 +110,48 @@ class TestTickRunner:
         assert runner.exit_id == ""
         assert runner.fn == "create"
 
+    def test_adopt_only_from_create_and_starts_clean(
+        self, mock_wserver, tokens_nearest
+    ):
+        runner = TickRunner(mock_wserver, tokens_nearest)
+        runner.trail, runner.bracket, runner.target_id = MagicMock(), MagicMock(), "77"
+        trade = {
+            "entry_id": "1",
+            "symbol": "NIFTY28APR26P23800",
+            "quantity": 65,
+            "exit_price": 54.4,
+        }
+
+        assert runner.adopt(trade)
+        assert (runner.fn, runner.entry_id) == ("is_trade", "1")
+        assert (runner.trail, runner.bracket, runner.target_id) == (None, None, "")
+
+        runner.fn, runner.exit_id = "exit_trade", "2"
+        assert not runner.adopt({**trade, "entry_id": "3"})
+        assert (runner.fn, runner.entry_id, runner.exit_id) == ("exit_trade", "1", "2")
+
+    def test_running_runner_adopts_on_its_worker(self, mock_wserver, tokens_nearest):
+        import asyncio
+        import threading
+
+        runner = TickRunner(mock_wserver, tokens_nearest)
+        threads = []
+        adopt = runner.adopt
+        runner.adopt = lambda trade: (
+            threads.append(threading.current_thread().name) or adopt(trade)
+        )
+
+        async def main():
+            task = asyncio.create_task(runner.run())
+            await asyncio.sleep(0.01)
+            adopted = await runner.adopt_async({"entry_id": "1", "symbol": "X"})
+            task.cancel()
+            return adopted
+
+        assert asyncio.run(main())
+        assert threads[0].startswith("runner")
+        assert runner.fn == "is_trade"
+
 
 class TestTradeJsonPersistence:
     def test_trade_json_saved_after_entry(self, mock_wserver, tokens_nearest):
@@ -117,14 +165,119 @@ class TestTradeJsonPersistence:
             "target_price": 56.4,
         }
         O_FUTL.read_file.return_value = trade_data
-        Helper.orders.return_value = [{"order_id": "26042100278879", "status": "COMPLETE"}]
+        Helper.orders.return_value = [
+            {"order_id": "26042100278879", "status": "COMPLETE"}
+        ]
         Helper.one_side.return_value = "26042100278880"
 
         runner = TickRunner(mock_wserver, tokens_nearest)
         runner.run_state_machine()
 
+        # trade.json is written in the background
+        assert file_writer.flush()
         O_FUTL.write_file.assert_called_once()
 
 
+def trailing_runner(ws, tokens):
+    runner = TickRunner(ws, tokens, trail={"mode": "points", "value": 5})
+    runner.entry_id = "26042100278879"
+    runner.symbol = "NIFTY28APR26C25050"
+    runner.quantity = 65
+    runner.exchange = "NFO"
+    runner.exit_price = 95.0
+    runner.target_price = 130.0
+    runner.fn = "is_trade"
+    runner.run_state_machine()
+    assert runner.fn == "exit_trade"
+    return runner
+
+
+class TestTrailingExit:
+    def test_trail_modifies_exit_once_per_step(self, mock_wserver):
+        tokens = {"NFO|43210": "NIFTY28APR26C25050"}
+        Helper.orders.return_value = [
+            {"order_id": "26042100278879", "status": "COMPLETE", "price": 100.0}
+        ]
+        Helper.one_side.return_value = "26042100278880"
+        Helper.modify_order.return_value = {"stat": "Ok"}
+        runner = trailing_runner(mock_wserver, tokens)
+
+        runner.on_tick("NFO|43210", 100.04, {})
+        Helper.modify_order.assert_not_called()
+
+        runner.on_tick("NFO|43210", 101.0, {})
+        Helper.modify_order.assert_called_once()
+        kwargs = Helper.modify_order.call_args[0][0]
+        assert kwargs["order_id"] == "26042100278880"
+        assert kwargs["price"] == 96.0
+        assert runner.exit_price == 96.0
+
+        runner.on_tick("NFO|99999", 150.0, {})
+        assert Helper.modify_order.call_count == 1
+
+    def test_rejected_modify_keeps_the_stop_and_retries(self, mock_wserver):
+        tokens = {"NFO|43210": "NIFTY28APR26C25050"}
+        Helper.orders.return_value = [
+            {"order_id": "26042100278879", "status": "COMPLETE", "price": 100.0}
+        ]
+        Helper.one_side.return_value = "26042100278880"
+        Helper.modify_order.return_value = None
+        runner = trailing_runner(mock_wserver, tokens)
+
+        runner.on_tick("NFO|43210", 101.0, {})
+        assert runner.exit_price == 95.0
+        assert runner.trail.stop == 95.0
+
+        Helper.modify_order.return_value = {"stat": "Not_Ok", "emsg": "rejected"}
+        runner.on_tick("NFO|43210", 101.0, {})
+        assert Helper.modify_order.call_count == 2
+        assert runner.exit_price == 95.0
+
+        Helper.modify_order.return_value = {"stat": "Ok"}
+        runner.on_tick("NFO|43210", 101.0, {})
+        assert Helper.modify_order.call_args[0][0]["price"] == 96.0
+        assert runner.exit_price == 96.0
+
+    def test_trail_moves_off_the_event_loop(self, mock_wserver):
+        import asyncio
+        import threading
+
+        tokens = {"NFO|43210": "NIFTY28APR26C25050"}
+        Helper.orders.return_value = [
+            {"order_id": "26042100278879", "status": "COMPLETE", "price": 100.0}
+        ]
+        Helper.one_side.return_value = "26042100278880"
+        runner = trailing_runner(mock_wserver, tokens)
+        threads = []
+        Helper.modify_order.side_effect = lambda kwargs: (
+            threads.append(threading.current_thread().name) or {"stat": "Ok"}
+        )
+
+        async def main():
+            task = asyncio.create_task(runner.run())
+            await asyncio.sleep(0.05)
+            runner.on_tick("NFO|43210", 101.0, {})
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(main())
+        assert threads and threads[0].startswith("runner")
+        assert runner.exit_price == 96.0
+
+    def test_trail_in_bracket_mode_goes_through_the_bracket(
+        self, mock_wserver, tokens_nearest
+    ):
+        runner = TickRunner(mock_wserver, tokens_nearest, bracket=True)
+        runner.bracket = MagicMock()
+        runner.bracket.move_stop.return_value = True
+        runner.trail = MagicMock(stop=97.0)
+        runner.exit_id = "STOP1"
+        runner.fn = "exit_trade"
+        runner._modify_trail()
+        runner.bracket.move_stop.assert_called_once_with(97.0)
+        Helper.modify_order.assert_not_called()
+        assert runner.exit_price == 97.0
+
+
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,143 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.candles import day_start
+from src.timeframes import CandleEngine, Frame
+
+KEY = "NFO|40001"
+DAY = day_start(1_776_000_000)
+OPEN = DAY + 9 * 3600 + 15 * 60
+
+
+def minute(stamp, o, h, lo, c, v=10):
+    return {
+        "ssboe": str(stamp),
+        "into": f"{o:.2f}",
+        "inth": f"{h:.2f}",
+        "intl": f"{lo:.2f}",
+        "intc": f"{c:.2f}",
+        "intv": str(v),
+    }
+
+
+class FakeHistory:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def fetch(self, exchange, token, interval=1, start=None):
+        self.calls.append((interval, start))
+        return list(self.rows)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def setup():
+    # newest first, as the broker sends them
+    rows = [
+        minute(OPEN + 60 * i, 100 + i, 101 + i + (i == 2) * 5, 99 + i, 100.5 + i)
+        for i in range(6)
+    ]
+    history = FakeHistory(rows[::-1])
+    clock = Clock(OPEN + 370)
+    return history, clock, CandleEngine(history.fetch, (1, 3, 5), now=clock)
+
+
+class TestFrame:
+    def test_ticks_update_in_place(self):
+        frame = Frame(3)
+        capacity = len(frame.time)
+        frame.on_tick(100.0, 0, OPEN + 1)
+        frame.on_tick(104.0, 5, OPEN + 20)
+        frame.on_tick(98.0, 5, OPEN + 40)
+        frame.on_tick(101.0, 0, OPEN + 200)
+        stamps, ohlcv = frame.view()
+        assert stamps.tolist() == [OPEN, OPEN + 180]
+        assert ohlcv[0].tolist() == [100.0, 104.0, 98.0, 98.0, 10.0]
+        assert len(frame.time) == capacity
+
+    def test_view_is_not_a_copy(self):
+        frame = Frame(1)
+        frame.on_tick(100.0, 0, OPEN)
+        _, ohlcv = frame.view()
+        frame.on_tick(105.0, 0, OPEN + 5)
+        assert ohlcv[0, 1] == 105.0
+        assert np.shares_memory(ohlcv, frame.ohlcv)
+
+
+class TestCandleEngine:
+    def test_one_history_call_serves_every_timeframe(self, setup):
+        history, clock, engine = setup
+        three = json.loads(engine.payload(KEY, 3))["data"]
+        five = json.loads(engine.payload(KEY, 5))["data"]
+        engine.payload(KEY, 1)
+        assert history.calls == [(1, DAY)]
+        assert [b["time"] for b in three] == [OPEN + 180, OPEN]
+        assert three[1] == {
+            "time": OPEN,
+            "open": 100.0,
+            "high": 108.0,
+            "low": 99.0,
+            "close": 102.5,
+            "volume": 30.0,
+        }
+        assert [b["time"] for b in five] == [OPEN + 300, OPEN]
+
+    def test_ticks_keep_all_timeframes_current(self, setup):
+        history, clock, engine = setup
+        engine.load(KEY)
+        engine.on_tick(KEY, 120.0, {"v": "1000"})
+        clock.now = OPEN + 430
+        engine.on_tick(KEY, 90.0, {"v": "1040"})
+        one = engine.arrays(KEY, 1, bars=2)
+        three = engine.arrays(KEY, 3)
+        assert one["time"].tolist() == [OPEN + 360, OPEN + 420]
+        assert one["open"][-1] == 90.0
+        assert three["high"][-1] == 120.0
+        assert three["low"][-1] == 90.0
+        assert three["volume"][-1] == 40
+        assert len(history.calls) == 1
+
+    def test_unknown_timeframe_is_refused(self, setup):
+        history, clock, engine = setup
+        with pytest.raises(ValueError):
+            engine.frame(KEY, 15)
+
+    def test_empty_history_is_retried_keeping_live_bars(self, setup):
+        history, clock, engine = setup
+        rows, history.rows = history.rows, []
+        engine.load(KEY)
+        engine.on_tick(KEY, 130.0)
+        history.rows = rows
+        engine.load(KEY)
+        assert len(history.calls) == 1
+        clock.now += 60
+        bars = engine.arrays(KEY, 3)
+        assert len(history.calls) == 2
+        assert bars["high"][-1] == 130.0
+        assert bars["close"][-1] == 130.0
+
+    def test_payload_is_cached_until_a_tick(self, setup):
+        history, clock, engine = setup
+        first = engine.payload(KEY, 3)
+        assert engine.payload(KEY, 3) is first
+        engine.on_tick(KEY, 106.0)
+        assert engine.payload(KEY, 3) is not first
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.trailing import TrailingStop, atr_from_bars, floor_to_tick
+
+
+class TestTrailingStop:
+    def test_points_trail_moves_only_on_full_step(self):
+        trail = TrailingStop("points", entry=100, stop=95, value=5, step=2)
+        assert trail.update(100.05) is None
+        assert trail.update(100.09) is None
+        assert trail.update(100.10) == 95.10
+        assert trail.update(100.15) is None
+        assert trail.stop == 95.10
+
+    def test_trail_never_moves_down(self):
+        trail = TrailingStop("points", entry=100, stop=95, value=5)
+        assert trail.update(110) == 105
+        assert trail.update(104) is None
+        assert trail.stop == 105
+
+    def test_percent_trail(self):
+        trail = TrailingStop("percent", entry=100, stop=90, value=5)
+        assert trail.update(120) == 114
+
+    def test_atr_trail_reads_source(self):
+        atr = {"value": None}
+        trail = TrailingStop(
+            "atr", entry=100, stop=90, value=2, atr=lambda: atr["value"]
+        )
+        assert trail.update(110) is None
+        atr["value"] = 3
+        assert trail.update(110) == 104
+
+    def test_breakeven_after_move(self):
+        trail = TrailingStop("breakeven", entry=100, stop=95, value=4, offset=0.5)
+        assert trail.update(103) is None
+        assert trail.update(104) == 100.5
+        assert trail.update(120) is None
+        assert trail.modifications == 1
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            TrailingStop("chandelier", entry=100, stop=95, value=5)
+
+
+def test_floor_to_tick():
+    assert floor_to_tick(100.07) == 100.05
+    assert floor_to_tick(100.1) == 100.1
+
+
+def test_atr_from_bars_newest_first():
+    bars = [
+        {"inth": "12", "intl": "10", "intc": "11"},
+        {"inth": "11", "intl": "9", "intc": "10"},
+        {"inth": "10", "intl": "8", "intc": "9"},
+    ]
+    assert atr_from_bars(bars, period=14) == 2
+    assert atr_from_bars(bars[:1]) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])